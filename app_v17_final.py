@@ -1,27 +1,23 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from datetime import datetime, date
-import hashlib 
-import io 
-import re
 
-from supabase import create_client
-
-@st.cache_resource
-def init_connection():
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
-
-supabase = init_connection()
-# Quick test to see if the bucket is accessible
-try:
-    buckets = supabase.storage.list_buckets()
-    print("Buckets found:", buckets)
-except Exception as e:
-    st.error(f"Storage Error: {e}")
+from tracker_final.core import (
+    CHANGE_FEED_ENABLED, QUERY_METRICS_PORT, attachment_upload_worker, begin_rerun_stats,
+    bootstrap_schema, change_feed_listener, change_feed_notice, check_hashes, load_data,
+    mark_changes_seen, query_metrics_exporter, render_storage_status, set_rerun_page,
+)
 
+# --- APP LAYOUT ---
+st.set_page_config(page_title="TBL R&M Tracker 2026", layout="wide")
+begin_rerun_stats()
+if QUERY_METRICS_PORT:
+    query_metrics_exporter(QUERY_METRICS_PORT)
+# Schema bootstrap runs once per server process, not once per browser session
+with st.spinner("Initializing database connection..."):
+    bootstrap_schema()
+if CHANGE_FEED_ENABLED:
+    change_feed_listener()
+# Resumes attachment uploads left pending by a restart
+attachment_upload_worker()
 
 main_logo = "https://tbl.com.bd/frontend/img/products/3.png"
 icon_logo = "https://tbl.com.bd/frontend/img/products/3.png" 
@@ -138,316 +134,26 @@ div.stRadio > label > div > div {{
 """, unsafe_allow_html=True)
 # --- END CUSTOM CSS ---
 
-
-# --- NEW SUPABASE CONNECTION SETUP ---
-# This replaces the DB_FILE variable and init_db() calls
-conn_db = st.connection("postgresql", type="sql")
-from sqlalchemy import text
-
-# --- SECURITY FUNCTIONS (Basic Hashing) ---
-def make_hashes(password):
-    """Returns a SHA256 hash of the password."""
-    return hashlib.sha256(str.encode(password)).hexdigest()
-
-def check_hashes(password, hashed_text):
-    """Checks if the entered password matches the stored hash."""
-    return make_hashes(password) == hashed_text
-
-def init_db():
-    """Initializes the SQL database with all necessary tables."""
-    
-    # Table 1: Budget Configuration (Cost Center)
-    execute_query('''CREATE TABLE IF NOT EXISTS budget_heads (
-                    id SERIAL PRIMARY KEY,
-                    department TEXT,
-                    cost_area TEXT UNIQUE,
-                    total_budget REAL
-                )''')
-    
-    # Table 2: Maintenance Notifications / Requests 
-    execute_query('''CREATE TABLE IF NOT EXISTS requests (
-                    id SERIAL PRIMARY KEY,
-                    mn_number TEXT UNIQUE, 
-                    mn_issue_date TEXT, 
-                    date_logged TEXT,
-                    requester TEXT,
-                    cost_area TEXT,
-                    estimated_cost REAL,
-                    status TEXT DEFAULT 'Pending',
-                    mn_particulars TEXT,
-                    mn_category TEXT,
-                    department TEXT,
-                    location TEXT,
-                    supplier_vendor TEXT,
-                    supplier_type TEXT,
-                    currency TEXT,
-                    foreign_spare_cost REAL,
-                    freight_fca_charges REAL,
-                    customs_duty_rate REAL, 
-                    local_cost_wo_vat_ait REAL,
-                    vat_ait REAL,
-                    landed_total_cost REAL,
-                    date_sent_ho TEXT,
-                    plant_remarks TEXT,
-                    FOREIGN KEY(cost_area) REFERENCES budget_heads(cost_area),
-                    pdf_file_path TEXT
-                )''')
-                
-    # Table 3: User Management
-    execute_query('''CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    username TEXT UNIQUE,
-                    password_hash TEXT,
-                    role TEXT -- 'administrator' or 'user'
-                )''')
-
-    # Table 4: Message Board
-    execute_query('''CREATE TABLE IF NOT EXISTS messages (
-                    id SERIAL PRIMARY KEY,
-                    username TEXT,
-                    message TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )''')
-
-    # Table 4: Exchange Rate and Duty Configuration
-    execute_query('''CREATE TABLE IF NOT EXISTS exchange_config (
-                    key TEXT PRIMARY KEY,
-                    value REAL
-                )''')
-                
-    # Table 5: Event Log
-    execute_query('''CREATE TABLE IF NOT EXISTS event_log (
-                    id SERIAL PRIMARY KEY,
-                    timestamp TEXT,
-                    username TEXT,
-                    action_type TEXT, -- e.g., 'BUDGET_UPDATE', 'USER_CREATE', 'MN_STATUS_CHANGE'
-                    description TEXT
-                )''')
-                
-    # Table 6: LC/PO and Payment Tracker
-    execute_query('''
-        CREATE TABLE IF NOT EXISTS lc_po_tracker (
-            mn_number TEXT PRIMARY KEY,
-            lc_po_nr TEXT,
-            lc_po_date TEXT,
-            eta_shipment_delivery TEXT,
-            delivery_completed TEXT, -- 'Yes' or 'No'
-            date_of_delivery TEXT,
-            commercial_store_remarks TEXT,
-            delay_days SERIAL,
-            bill_submitted_vendor TEXT, -- Local Supplier Only field
-            bill_tracking_id TEXT,
-            date_bill_submit_acc TEXT,
-            date_bill_submit_ho TEXT,
-            bill_paid TEXT, -- 'Yes' or 'No'
-            actual_lc_costing REAL, -- Foreign Supplier Only field
-            FOREIGN KEY(mn_number) REFERENCES requests(mn_number)
-        )
-    ''')
-
-    # Table 7: Indent Purchase Record (Main Record Header)
-    execute_query('''
-        CREATE TABLE IF NOT EXISTS indent_purchase_record (
-            bill_no TEXT PRIMARY KEY, 
-            indent_no TEXT,
-            grn_no TEXT,
-            supplier TEXT,
-            bill_date TEXT,
-            payment_mode TEXT,
-            total_bill_amount REAL,
-            remarks TEXT
-        )
-    ''')
-
-    # Table 8: Indent Goods Details (Line Items)
-    execute_query('''
-        CREATE TABLE IF NOT EXISTS indent_goods_details (
-            id SERIAL PRIMARY KEY,
-            bill_no TEXT, -- Stores the bill_no from the header table
-            description TEXT,
-            quantity REAL,
-            unit TEXT,
-            rate REAL,
-            amount REAL,
-            FOREIGN KEY(bill_no) REFERENCES indent_purchase_record(bill_no)
-        )
-    ''')
-
-    # Updated Table 9: Independent Indent Records (Standalone)
-    execute_query('''CREATE TABLE IF NOT EXISTS standalone_indents (
-                    indent_id SERIAL PRIMARY KEY,
-                    indent_number TEXT,
-                    item_description TEXT,
-                    quantity REAL,
-                    unit TEXT,
-                    rate REAL,
-                    total_amount REAL,
-                    indent_date TEXT,
-                    supplier TEXT,
-                    status TEXT DEFAULT 'Not Purchased'
-                )''')
-    
-    # 1. Migration: Add status column if it doesn't exist
-    try:
-        # PostgreSQL syntax remains similar, but use execute_query
-        execute_query("ALTER TABLE standalone_indents ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'Not Purchased'")
-    except Exception:
-        pass # Column already exists or table doesn't exist yet
-
-    # Initialize default configuration values if not present
-    default_config = {
-        'USD_rate': 110.00, 'EUR_rate': 120.00, 'GBP_rate': 130.00, 
-        'INR_rate': 1.50, 'OTHER_rate': 100.00, 'CustomsDuty_pct': 0.05
-    }
-
-    # 2. Use named parameters for the configuration loop
-    for k, v in default_config.items():
-        # ON CONFLICT DO NOTHING is the PostgreSQL equivalent of INSERT OR IGNORE
-        query = "INSERT INTO exchange_config (key, value) VALUES (:key, :val) ON CONFLICT (key) DO NOTHING"
-        execute_query(query, {"key": k, "val": v})
-
-    # Create/Update default admin user
-    admin_username = 'admin'
-    admin_hash = make_hashes("admin1024098")
-
-    # 3. Check for existence using named parameters
-    check_query = "SELECT COUNT(*) as count FROM users WHERE username = :user"
-    user_count_df = load_data(check_query, {"user": admin_username})
-    
-    if user_count_df.iloc[0]['count'] == 0:
-        # INSERT using named parameters
-        insert_query = "INSERT INTO users (username, password_hash, role) VALUES (:user, :pw, :role)"
-        execute_query(insert_query, {
-            "user": admin_username, 
-            "pw": admin_hash, 
-            "role": 'administrator'
-        })
-    else:
-        # UPDATE using named parameters
-        update_query = "UPDATE users SET password_hash = :pw WHERE username = :user"
-        execute_query(update_query, {
-            "pw": admin_hash, 
-            "user": admin_username
-        })
-
-# --- DATABASE INTERACTION FUNCTIONS ---
-# --- UPDATED DATABASE INTERACTION FUNCTIONS ---
-def load_data(query, params=None):
-    """Loads data from Supabase using Streamlit SQL connection."""
-    # Note: PostgreSQL uses :name for parameters in SQLAlchemy-based connections
-    return conn_db.query(query, params=params, ttl=0)
-
-
-def execute_query(query, params=None):
-    """Executes Write/Update queries in Supabase."""
-    with conn_db.session as s:
-        s.execute(text(query), params or {})
-        s.commit()
-        
-# --- LOGGING FUNCTIONS ---
-def log_event(action_type, description):
-    username = st.session_state.get('username', 'SYSTEM')
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    query = "INSERT INTO event_log (timestamp, username, action_type, description) VALUES (:ts, :user, :act, :desc)"
-    params = {"ts": timestamp, "user": username, "act": action_type, "desc": description}
-    execute_query(query, params)
-    
-def get_event_logs():
-    return load_data("SELECT * FROM event_log ORDER BY timestamp DESC")
-
-# --- CORE FUNCTION: Budget vs. Cost Status Calculation ---
-@st.cache_data
-def calculate_status():
-    budgets = load_data("SELECT * FROM budget_heads")
-    requests = load_data("SELECT * FROM requests")
-
-    if budgets.empty:
-        return pd.DataFrame(), 0, 0, 0 
-
-    budgets['total_budget'] = pd.to_numeric(budgets['total_budget'], errors='coerce').fillna(0)
-    
-    if not requests.empty:
-        requests['landed_total_cost'] = pd.to_numeric(requests['landed_total_cost'], errors='coerce').fillna(0)
-        
-        # 1. Calculate Total Utilized (MN_issued) - All except Rejected
-        spent_by_area = requests[requests['status'] != 'Rejected'].groupby('cost_area')['landed_total_cost'].sum().reset_index()
-        
-        # 2. NEW: Calculate MN_approved (Criteria: Finance Approved, PO Issued, Completed)
-        approved_statuses = ["Finance Approved", "PO Issued", "Completed"]
-        approved_by_area = requests[requests['status'].isin(approved_statuses)].groupby('cost_area')['landed_total_cost'].sum().reset_index()
-        approved_by_area.rename(columns={'landed_total_cost': 'MN_approved'}, inplace=True)
-        
-        # Merge data
-        merged = pd.merge(budgets, spent_by_area, on='cost_area', how='left').fillna(0)
-        merged = pd.merge(merged, approved_by_area, on='cost_area', how='left').fillna(0)
-    else:
-        merged = budgets.copy()
-        merged['landed_total_cost'] = 0
-        merged['MN_approved'] = 0
-            
-    merged.rename(columns={'landed_total_cost': 'Total Utilized Cost'}, inplace=True)
-    merged['Remaining Balance'] = merged['total_budget'] - merged['Total Utilized Cost']
-    
-    total_budget = merged['total_budget'].sum()
-    total_spent = merged['Total Utilized Cost'].sum()
-    remaining = total_budget - total_spent
-
-    merged['Utilization %'] = merged.apply(
-        lambda row: (row['Total Utilized Cost'] / row['total_budget']) * 100 
-                    if row['total_budget'] > 0 else 0, 
-        axis=1
-    )
-    
-    return merged, total_budget, total_spent, remaining
-
-@st.fragment
-def message_board():
-    st.title("📋 Community Message Board")
-    
-    # Message Input Section
-    with st.form("message_form", clear_on_submit=True):
-        user_msg = st.text_area("Post a message for all users:", placeholder="Type your update here...")
-        submit = st.form_submit_button("Post Message")
-        
-        if submit and user_msg.strip():
-            # 1. Define the query using named placeholders (:key)
-            query = "INSERT INTO messages (username, message) VALUES (:user, :msg)"
-            
-            # 2. Define the parameters in a dictionary
-            params = {
-                "user": st.session_state['username'],
-                "msg": user_msg
-            }
-            
-            # 3. Use the centralized execution function
-            execute_query(query, params)
-            
-            st.success("Message posted!")
-
-    st.markdown("---")
-    # Display Messages Section
-    with st.spinner("Fetching latest messages..."):
-        messages_df = load_data("SELECT username, message, timestamp FROM messages ORDER BY timestamp DESC LIMIT 50")
-    
-    if not messages_df.empty:
-        for index, row in messages_df.iterrows():
-            with st.container(border=True):
-                col1, col2 = st.columns([1, 4])
-                with col1:
-                    st.markdown(f"**{row['username']}**")
-                    st.caption(f"{row['timestamp']}")
-                with col2:
-                    st.write(row['message'])
-    else:
-        st.info("No messages yet. Be the first to post!")
-
-# --- APP LAYOUT ---
-st.set_page_config(page_title="TBL R&M Tracker 2026", layout="wide")
-# Only run init_db once per session to save latency
-if 'db_initialized' not in st.session_state:
-    with st.spinner("Initializing database connection..."):
-        init_db()
-        st.session_state['db_initialized'] = True
+# --- PAGES ---
+# Each page is a script under tracker_final/pages that only runs while it's the active page. Shared
+# DB/config code lives in tracker_final/core, which Python imports once per server process.
+PAGE_FILES = {
+    "🔎 View & Filter Requests": "view_requests.py",
+    "📝 New Request (MN)": "new_request.py",
+    "📊 Budget Balance Sheet": "balance_sheet.py",
+    "📋 Message Board": "message_board.py",
+    "💰 LC/PO & Payment Tracker": "lc_po_tracker.py",
+    "🛒 Indent & Purchase Record": "indent_purchase.py",
+    "📜 Event Log": "event_log.py",
+    "⚙️ Budget Setup & Import": "budget_setup.py",
+    "👥 Users & Access Control": "users_access.py",
+    "📂 View Documents": "view_documents.py",
+    "🩺 Query Diagnostics": "query_diagnostics.py",
+}
+
+def make_page(label):
+    icon, title = label.split(' ', 1)
+    return st.Page(f"tracker_final/pages/{PAGE_FILES[label]}", title=title.strip(), icon=icon)
 
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -496,7 +202,6 @@ def login_page():
                 st.session_state['role'] = role
                 st.session_state['username'] = username
                 st.success(f"Logged in as {role}!")
-                calculate_status.clear()
                 st.rerun() 
             else:
                 st.sidebar.error("Incorrect Password")
@@ -516,6 +221,11 @@ def login_page():
     else:
         st.sidebar.info("No users registered.")
     
+def login_screen():
+    st.markdown(f'<img src="{PEPSI_LOGO_URL}" class="pepsi-logo">', unsafe_allow_html=True)
+    login_page()
+    st.title("TBL R&M Tracker 2026 - Please Log In")
+
 # --- LOGOUT FUNCTION ---
 def logout():
     st.session_state['logged_in'] = False
@@ -530,15 +240,19 @@ def logout():
 
 # --- MAIN APPLICATION LOGIC ---
 if not st.session_state['logged_in']:
-    st.markdown(f'<img src="{PEPSI_LOGO_URL}" class="pepsi-logo">', unsafe_allow_html=True)
-    login_page()
-    st.title("TBL R&M Tracker 2026 - Please Log In")
+    set_rerun_page("Login")
+    st.navigation([st.Page(login_screen, title="Login")], position="hidden").run()
 else:
 # --- MAIN APPLICATION LOGIC ---
     # ... (login check) ...
     st.sidebar.markdown(f"**Logged in as:** **{st.session_state['username']}** ({st.session_state['role'].title()})")
     if st.sidebar.button("Logout"):
         logout()
+    render_storage_status()
+    if CHANGE_FEED_ENABLED:
+        mark_changes_seen()
+        with st.sidebar:
+            change_feed_notice()
         
     # --- NEW DYNAMIC MENU LOGIC ---
     role = st.session_state['role']
@@ -572,1643 +286,12 @@ else:
             "⚙️ Budget Setup & Import",
             "👥 Users & Access Control",
             "📜 Event Log",
-            "📂 View Documents"
+            "📂 View Documents",
+            "🩺 Query Diagnostics"
         ]
         
     st.sidebar.markdown("---")
-    page = st.sidebar.radio("Go to", menu)
-    st.sidebar.markdown("---")
-    page_name = page.split(' ', 1)[-1].strip()
-
-    if page_name == "View & Filter Requests":
-        st.session_state['mn_submission_result'] = None
-        st.session_state['mn_submission_status'] = None
-        st.session_state['show_mn_details'] = False
-        
-        st.title("🔍 Existing Entries & Tracking Status")
-        
-        budgets = load_data("SELECT cost_area, department FROM budget_heads")
-        config_data = load_data("SELECT key, value FROM exchange_config")
-        config_dict = config_data.set_index('key')['value'].to_dict()
-        
-        fx_rates = {
-            "BDT": 1.0, 
-            "USD": config_dict.get('USD_rate', 110.00), 
-            "EUR": config_dict.get('EUR_rate', 120.00),
-            "GBP": config_dict.get('GBP_rate', 130.00),
-            "INR": config_dict.get('INR_rate', 1.50),
-            "Other": config_dict.get('OTHER_rate', 100.00)
-        }
-        customs_duty_pct = config_dict.get('CustomsDuty_pct', 0.05)
-        
-        with st.spinner("Calculating budget status and loading data..."):
-            df_status, total_budget, total_spent, remaining = calculate_status()        
-        if not df_status.empty:
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total Budget 2026 (BDT)", f"{total_budget:,.2f}")
-            col2.metric("Total Utilized Cost", f"{total_spent:,.2f}")
-            col3.metric("Remaining Balance", f"{remaining:,.2f}")
-            st.markdown("---")
-
-        requests_df = load_data("SELECT * FROM requests")
-        
-        if requests_df.empty:
-            st.info("No requests found.")
-        else:
-            st.subheader("🛠️ Admin Tools (Edit & Status Update)")
-            action_df = requests_df.sort_values(by='date_logged', ascending=False)
-            action_options = ['--- Select a Request ID to Action ---'] + [
-                f"ID {row['id']} - MN: {row['mn_number']} ({row['status']})" 
-                for index, row in action_df.iterrows()
-            ]
-
-            col_a1, col_a2 = st.columns(2)
-            selected_action_display = col_a1.selectbox("Select Request for Action", options=action_options, key="admin_action_select")
-            
-            selected_id = None
-            if selected_action_display != '--- Select a Request ID to Action ---':
-                try:
-                    selected_id = int(selected_action_display.split(' - ')[0].replace('ID ', ''))
-                except Exception:
-                    pass
-            
-            if st.session_state['role'] == 'administrator':
-                workflow_statuses = ["Pending", "Approved by SRPM", "Approved by AD", "Finance Approved", "Rejected", "PO Issued", "Completed"]
-                
-                with col_a2.form("status_update_form", clear_on_submit=True):
-                    current_status = action_df[action_df['id'] == selected_id]['status'].iloc[0] if selected_id else "Pending"
-                    new_status = st.selectbox("New Status", workflow_statuses, 
-                                              index=workflow_statuses.index(current_status) if current_status in workflow_statuses else 0,
-                                              key="new_status_select")
-                        
-                    if st.form_submit_button("Apply Status Change"):
-                        if selected_id:
-                            with st.spinner("Updating status in database..."):
-                                # 2. Pass the parameters as a dictionary
-                                query = "UPDATE requests SET status = :status WHERE id = :id"
-                                params = {"status": new_status, "id": selected_id}
-                                
-                                execute_query(query, params)
-                                
-                                log_event("MN_STATUS_CHANGE", f"MN ID {selected_id} status changed from {current_status} to {new_status}.")
-                                calculate_status.clear()
-                                st.success(f"Status for Request ID {selected_id} updated to **{new_status}**.")
-                                st.rerun()
-                        else:
-                            st.warning("Please select a request.")
-                            
-                if selected_id and col_a1.button(f"✏️ Edit ID {selected_id} Details", type="secondary"):
-                    st.session_state['show_admin_edit'] = True
-                    st.session_state['edit_mn_id'] = selected_id
-                    st.rerun()
-            
-            st.markdown("---")
-
-            if st.session_state['show_admin_edit'] and st.session_state['edit_mn_id']:
-                edit_id = st.session_state['edit_mn_id']
-                
-                # 1. Update SQL to use :id (PostgreSQL/SQLAlchemy style)
-                query = "SELECT * FROM requests WHERE id = :id"
-                
-                # 2. Pass the parameter as a dictionary
-                params = {"id": edit_id}
-                
-                # 3. Use the load_data function with named params
-                record_to_edit_df = load_data(query, params=params)
-                
-                if record_to_edit_df.empty:
-                    st.error(f"Could not find request with ID {edit_id}.")
-                    st.session_state['show_admin_edit'] = False
-                    st.session_state['edit_mn_id'] = None
-                    st.stop()
-                
-                original_data = record_to_edit_df.iloc[0].to_dict()
-                original_landed_cost = original_data['landed_total_cost']
-                original_cost_area = original_data['cost_area']
-                st.header(f"✏️ Editing Request ID: {edit_id} (MN: {original_data['mn_number']})")
-                departments = sorted(budgets['department'].unique().tolist())
-                
-                with st.form("admin_edit_form"):
-                    st.subheader("1. General & Categorization")
-                    col1, col2, col3 = st.columns(3)
-                    issue_date_val = datetime.strptime(original_data['mn_issue_date'], "%Y-%m-%d").date()
-                    date_ho_val = datetime.strptime(original_data['date_sent_ho'], "%Y-%m-%d").date()
-                    
-                    with col1:
-                        mn_issue_date = st.date_input("MN Issue Date *", value=issue_date_val)
-                        st.text_input("Requester Name (Read-Only)", value=original_data['requester'], disabled=True)
-                        mn_category = st.selectbox("MN Category *", ["R&M (Repair & Maintenance)", "C&C (Chemicals & Consumables)"], 
-                                                   index=["R&M (Repair & Maintenance)", "C&C (Chemicals & Consumables)"].index(original_data['mn_category']))
-                    with col2:
-                        mn_no_new = st.text_input("MN Number * (e.g., DHK/001/26)", value=original_data['mn_number'])
-                        selected_department = st.selectbox("Department *", departments, 
-                                                           index=departments.index(original_data['department']))
-                    with col3:
-                        # --- ORIGINAL CODE (Lines 696-697) ---
-                        # cost_areas_filtered = budgets[budgets['department'] == selected_department]['cost_area'].unique().tolist()
-                        # area = st.selectbox("Cost Area *", sorted(cost_areas_filtered), 
-                        #                    index=sorted(cost_areas_filtered).index(original_data['cost_area']))
-                        
-                        # --- UPDATED CODE ---
-                        cost_areas_filtered = sorted(budgets[budgets['department'] == selected_department]['cost_area'].unique().tolist())
-                        
-                        # Check if the original cost area is still valid for the selected department
-                        if original_data['cost_area'] in cost_areas_filtered:
-                            default_index = cost_areas_filtered.index(original_data['cost_area'])
-                        else:
-                            default_index = 0  # Default to the first available area if department changed
-                        
-                        area = st.selectbox("Cost Area *", cost_areas_filtered, index=default_index)
-                        location = st.text_input("Location *", value=original_data['location'])
-                    
-                    mn_particulars = st.text_area("MN Particulars/Detailed Description of Work * (Max 200 chars)", 
-                                                  max_chars=200, value=original_data['mn_particulars'])
-
-                    st.subheader("2. Financial & Procurement Details")
-                    col_supp, col_curr, col_cost1, col_cost2 = st.columns(4)
-                    with col_supp:
-                        supplier_vendor = st.text_input("Supplier/Vendor *", value=original_data['supplier_vendor'])
-                        supplier_type = st.selectbox("Supplier Type *", ["Local", "Foreign"], 
-                                                     index=["Local", "Foreign"].index(original_data['supplier_type']))
-                    currency_list = list(fx_rates.keys())
-                    currency = col_curr.selectbox("Currency *", currency_list, index=currency_list.index(original_data['currency']))
-                    col_curr.info(f"Rate: 1 {currency} = **{fx_rates.get(currency):.4f} BDT**")
-                    with col_cost1:
-                        foreign_spare_cost = st.number_input("Foreign Spare Cost *", min_value=0.0, format="%.2f", 
-                                                             value=original_data['foreign_spare_cost'], key="edit_mn_fsc")
-                        freight_fca_charges = st.number_input("Freight & FCA Charges *", min_value=0.0, format="%.2f", 
-                                                              value=original_data['freight_fca_charges'], key="edit_mn_ffc")
-                    with col_cost2:
-                        local_cost_wo_vat_ait = st.number_input("Local Cost without VAT & AIT *", min_value=0.0, format="%.2f", 
-                                                                value=original_data['local_cost_wo_vat_ait'], key="edit_mn_lcwa")
-                        vat_ait = st.number_input("VAT & AIT *", min_value=0.0, format="%.2f", 
-                                                  value=original_data['vat_ait'], key="edit_mn_va")
-                        exchange_rate = fx_rates.get(currency, 1.0)
-                        landed_total_cost_new = (
-                            (foreign_spare_cost * (1 + customs_duty_pct)) + 
-                            freight_fca_charges
-                        ) * exchange_rate + local_cost_wo_vat_ait + vat_ait
-                        st.markdown(f"**New Landed Total Cost (BDT):**")
-                        st.markdown(f"## {landed_total_cost_new:,.2f}")
-                        
-                    st.subheader("3. Timeline & Remarks")
-                    col_date, col_remarks = st.columns([1, 2])
-                    with col_date:
-                        date_sent_ho = st.date_input("Date of Sending To HO *", value=date_ho_val)
-                    with col_remarks:
-                        plant_remarks = st.text_area("Plant Remarks/Notes", value=original_data['plant_remarks'])
-
-                    st.markdown("---")
-                    save_button = st.form_submit_button("💾 Save Edited Request", type="primary")
-                    cancel_button = st.form_submit_button("❌ Cancel Edit")                    
-                    
-                    if cancel_button:
-                        st.session_state['show_admin_edit'] = False
-                        st.session_state['edit_mn_id'] = None
-                        st.rerun()
-
-                    if save_button:
-                        required_fields = [
-                            (mn_no_new, "MN Number"), (mn_category, "MN Category"), (selected_department, "Department"), (area, "Cost Area"), 
-                            (location, "Location"), (supplier_vendor, "Supplier/Vendor"), (supplier_type, "Supplier Type"), (currency, "Currency"),
-                            (mn_particulars, "MN Particulars"), (date_sent_ho, "Date of Sending To HO")
-                        ]
-                        missing_fields = [label for value, label in required_fields if value is None or (isinstance(value, str) and not value.strip())]
-                        if missing_fields or landed_total_cost_new <= 0:
-                            error_msg = "⚠️ Please fill in all mandatory fields (*)."
-                            if missing_fields: error_msg += f" Missing: {', '.join(missing_fields)}."
-                            if landed_total_cost_new <= 0: error_msg += " Landed Total Cost must be greater than 0."
-                            st.error(error_msg)
-                            st.stop() 
-
-                        if mn_no_new != original_data['mn_number']:
-                            # 1. Update SQL to use named parameter :mn
-                            query = "SELECT mn_number FROM requests WHERE mn_number = :mn"
-                            
-                            # 2. Pass parameter as a dictionary
-                            params = {"mn": mn_no_new}
-                            
-                            # 3. Use the centralized load_data function
-                            existing_mn_df = load_data(query, params=params)
-                            
-                            # 4. Check if the DataFrame is not empty
-                            if not existing_mn_df.empty:
-                                st.error(f"❌ Duplicate MN Error: An MN request with number **{mn_no_new}** already exists.")
-                                st.stop()
-                            
-                        df_status, _, _, _ = calculate_status()
-                        old_area_status = df_status[df_status['cost_area'] == original_cost_area]
-                        if area != original_cost_area:
-                            new_area_status = df_status[df_status['cost_area'] == area]
-                            new_area_remaining = new_area_status['Remaining Balance'].iloc[0]
-                            if landed_total_cost_new > new_area_remaining:
-                                st.error(f"⚠️ Budget Exceeded in new Cost Area! '{area}' only has **{new_area_remaining:,.2f} BDT** remaining.")
-                                st.stop()
-                        else:
-                            current_remaining = old_area_status['Remaining Balance'].iloc[0]
-                            available_after_removal = current_remaining + original_landed_cost
-                            if landed_total_cost_new > available_after_removal:
-                                st.error(f"⚠️ Budget Exceeded! '{area}' can only support an updated cost of up to **{available_after_removal:,.2f} BDT**.")
-                                st.stop()
-
-                        date_issue_str = mn_issue_date.strftime("%Y-%m-%d")
-                        date_ho_str = date_sent_ho.strftime("%Y-%m-%d")
-                        update_query = '''UPDATE requests SET
-                            mn_number = :mn_no, 
-                            mn_issue_date = :issue_date, 
-                            cost_area = :area, 
-                            estimated_cost = :est_cost,
-                            mn_particulars = :particulars, 
-                            mn_category = :category, 
-                            department = :dept, 
-                            location = :loc, 
-                            supplier_vendor = :vendor, 
-                            supplier_type = :s_type, 
-                            currency = :curr, 
-                            foreign_spare_cost = :f_cost, 
-                            freight_fca_charges = :freight, 
-                            customs_duty_rate = :customs, 
-                            local_cost_wo_vat_ait = :local_cost, 
-                            vat_ait = :vat, 
-                            landed_total_cost = :landed, 
-                            date_sent_ho = :ho_date, 
-                            plant_remarks = :remarks
-                        WHERE id = :id'''
-                        
-                        params = {
-                            "mn_no": mn_no_new,
-                            "issue_date": date_issue_str,
-                            "area": area,
-                            "est_cost": landed_total_cost_new, # mapping to estimated_cost
-                            "particulars": mn_particulars,
-                            "category": mn_category,
-                            "dept": selected_department,
-                            "loc": location,
-                            "vendor": supplier_vendor,
-                            "s_type": supplier_type,
-                            "curr": currency,
-                            "f_cost": foreign_spare_cost,
-                            "freight": freight_fca_charges,
-                            "customs": customs_duty_pct,
-                            "local_cost": local_cost_wo_vat_ait,
-                            "vat": vat_ait,
-                            "landed": landed_total_cost_new,
-                            "ho_date": date_ho_str,
-                            "remarks": plant_remarks,
-                            "id": edit_id
-                        }
-                        
-                        execute_query(update_query, params)
-                        calculate_status.clear()
-                        log_event("MN_ADMIN_EDIT", f"Request ID {edit_id} (MN: {mn_no_new}) was edited by admin.")
-                        st.success(f"✅ Request ID **{edit_id}** (MN: {mn_no_new}) updated successfully!")
-                        st.session_state['show_admin_edit'] = False
-                        st.session_state['edit_mn_id'] = None
-                        st.rerun()
-
-            st.subheader("Filter Requests")
-            col_filter_1, col_filter_2, col_filter_3 = st.columns(3)
-            with col_filter_1:
-                selected_status = st.multiselect("Filter by Status", requests_df['status'].unique(), default=[])
-                selected_category = st.multiselect("Filter By MN Category", requests_df['mn_category'].unique(), default=[])
-            with col_filter_2:
-                selected_area = st.multiselect("Filter by Cost Center", requests_df['cost_area'].unique(), default=[])
-            with col_filter_3:
-                selected_supplier_type = st.multiselect("Filter by Supplier Type", requests_df['supplier_type'].unique(), default=[])
-
-            filtered_df = requests_df.copy()
-            if selected_status: filtered_df = filtered_df[filtered_df['status'].isin(selected_status)]
-            if selected_category: filtered_df = filtered_df[filtered_df['mn_category'].isin(selected_category)]
-            if selected_area: filtered_df = filtered_df[filtered_df['cost_area'].isin(selected_area)]
-            if selected_supplier_type: filtered_df = filtered_df[filtered_df['supplier_type'].isin(selected_supplier_type)]
-            
-            st.markdown("---")
-            st.subheader("All Request Fields")
-            st.dataframe(filtered_df, width='stretch')
-            st.download_button(
-                label="Download Filtered Requests CSV",
-                data=filtered_df.to_csv(index=False).encode('utf-8'),
-                file_name='filtered_requests.csv',
-                mime='text/csv',
-                key='download_requests'
-            )
-
-    # --- TAB 2: NEW REQUEST (MN) ---
-    elif page_name == "New Request (MN)":
-
-        st.session_state['show_mn_details'] = False
-        st.session_state['show_admin_edit'] = False
-        st.session_state['edit_mn_id'] = None
-        st.title("📝 Create New Management Notification")
-
-        budgets = load_data("SELECT cost_area, department FROM budget_heads")
-        config_data = load_data("SELECT key, value FROM exchange_config")
-        config_dict = config_data.set_index('key')['value'].to_dict()
-        
-        fx_rates = {
-            "BDT": 1.0, 
-            "USD": config_dict.get('USD_rate', 110.00), 
-            "EUR": config_dict.get('EUR_rate', 120.00),
-            "GBP": config_dict.get('GBP_rate', 130.00),
-            "INR": config_dict.get('INR_rate', 1.50),
-            "Other": config_dict.get('OTHER_rate', 100.00)
-        }
-        customs_duty_pct = config_dict.get('CustomsDuty_pct', 0.05)
-
-        if budgets.empty:
-            st.warning("No Department or Cost Area data found. Please set up budgets first.")
-            st.stop()
-        
-        departments = sorted(budgets['department'].unique().tolist())
-
-        # Display persistent success/error message
-        if st.session_state['mn_submission_result']:
-            if st.session_state['mn_submission_status'] == 'success':
-                st.success(st.session_state['mn_submission_result'])
-            elif st.session_state['mn_submission_status'] == 'error':
-                st.error(st.session_state['mn_submission_result'])
-            # We no longer clear it immediately here to allow it to be visible after the rerun
-        
-        st.subheader("1. General & Categorization")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            mn_issue_date = st.date_input("MN Issue Date *", value=datetime.now())
-            requester = st.text_input("Requester Name", value=st.session_state['username'], disabled=True)
-            mn_category = st.selectbox("MN Category *", ["R&M (Repair & Maintenance)", "C&C (Chemicals & Consumables)"], index=None)
-        with col2:
-            mn_no = st.text_input("MN Number * (Format: DHK/001/2026)")
-            selected_department = st.selectbox("Department *", departments, index=None, key="mn_dept_select")
-        with col3:
-            cost_areas_filtered = []
-            if selected_department:
-                cost_areas_filtered = budgets[budgets['department'] == selected_department]['cost_area'].unique().tolist()
-            area = st.selectbox("Cost Area *", sorted(cost_areas_filtered), index=None, key="mn_area_select")
-            location = st.text_input("Location *")
-        mn_particulars = st.text_area("MN Particulars/Detailed Description of Work * (Max 200 chars)", max_chars=200)
-
-        st.subheader("2. Financial & Procurement Details")
-        col_supp, col_curr, col_cost1, col_cost2 = st.columns(4)
-        with col_supp:
-            supplier_vendor = st.text_input("Supplier/Vendor *")
-            supplier_type = st.selectbox("Supplier Type *", ["Local", "Foreign"], index=None)
-        with col_curr:
-            currency = st.selectbox("Currency *", list(fx_rates.keys()), index=0)
-            st.info(f"Rate: 1 {currency} = **{fx_rates.get(currency):.4f} BDT**")
-        with col_cost1:
-            foreign_spare_cost = st.number_input("Foreign Spare Cost *", min_value=0.0, format="%.2f", value=0.0, key="mn_fsc")
-            freight_fca_charges = st.number_input("Freight & FCA Charges *", min_value=0.0, format="%.2f", value=0.0, key="mn_ffc")
-        with col_cost2:
-            local_cost_wo_vat_ait = st.number_input("Local Cost without VAT & AIT *", min_value=0.0, format="%.2f", value=0.0, key="mn_lcwa")
-            vat_ait = st.number_input("VAT & AIT *", min_value=0.0, format="%.2f", value=0.0, key="mn_va")
-            exchange_rate = fx_rates.get(currency, 1.0)
-            landed_total_cost = (
-                (foreign_spare_cost * (1 + customs_duty_pct)) + 
-                freight_fca_charges
-            ) * exchange_rate + local_cost_wo_vat_ait + vat_ait
-            st.markdown(f"**Calculated Landed Total Cost (BDT):**")
-            st.markdown(f"## {landed_total_cost:,.2f}")
-            st.caption(f"*(Duty Rate: {customs_duty_pct:.2%} | {currency} Rate: {exchange_rate:.4f} BDT)*")
-
-        st.subheader("3. Timeline & Remarks")
-        col_date, col_remarks = st.columns([1, 2])
-        with col_date:
-            date_sent_ho = st.date_input("Date of Sending To HO *", value=datetime.now())
-        with col_remarks:
-            plant_remarks = st.text_area("Plant Remarks/Notes")
-        
-        st.subheader("4. Document Attachment")
-        uploaded_file = st.file_uploader("Upload PDF Copy * (Max 1MB)", type=["pdf"])
-        
-        # 2. Size Validation logic (1MB = 1,048,576 bytes)
-        MAX_FILE_SIZE = 1 * 1024 * 1024 
-        
-        if uploaded_file:
-            if uploaded_file.size > MAX_FILE_SIZE:
-                st.error("⚠️ File is too large! Please upload a PDF smaller than 1MB.")
-                uploaded_file = None # Reset the file variable
-        
-        with st.form("mn_submission_form"):
-            st.markdown("*Fields marked with a * or ** are mandatory.")
-            st.markdown("---")
-            submitted = st.form_submit_button("Submit New Request", type="primary")
-            if st.session_state['mn_submission_result']:
-                if st.session_state['mn_submission_status'] == 'success':
-                    st.success(st.session_state['mn_submission_result'])
-                elif st.session_state['mn_submission_status'] == 'error':
-                    st.error(st.session_state['mn_submission_result'])   
-                    # Ensure validation:
-            if submitted:
-                # 1. MN Number Regex Validation
-                # Pattern explains: 3 uppercase letters / 3 digits / 4 digits
-                mn_pattern = r"^[A-Z]{3}/\d{3}/\d{4}$"
-                
-                if not mn_no:
-                    st.error("MN Number is required.")
-                elif not re.match(mn_pattern, mn_no):
-                    st.error("❌ Invalid MN Number format! Please use 'AAA/000/0000' (e.g., DHK/001/2026).")
-                else:
-                    # 2. Existing validation for other fields
-                    required_fields = [
-                        (mn_no, "MN Number"), (mn_category, "MN Category"), (selected_department, "Department"), 
-                        (area, "Cost Area"), (location, "Location"), (supplier_vendor, "Supplier/Vendor"), 
-                        (supplier_type, "Supplier Type"), (currency, "Currency"), (mn_particulars, "MN Particulars"), 
-                        (date_sent_ho, "Date of Sending To HO")
-                    ]
-                missing_fields = [label for value, label in required_fields if value is None or (isinstance(value, str) and not value.strip())]
-                
-                # Reset previous result on new attempt
-                st.session_state['mn_submission_result'] = None
-                st.session_state['mn_submission_status'] = None
-
-                if missing_fields or landed_total_cost <= 0:
-                    error_msg = "⚠️ Please fill in all mandatory fields (*)."
-                    if missing_fields: error_msg += f" Missing: {', '.join(missing_fields)}."
-                    if landed_total_cost <= 0: error_msg += " Landed Total Cost must be greater than 0."
-                    st.session_state['mn_submission_result'] = error_msg
-                    st.session_state['mn_submission_status'] = 'error'
-                    st.rerun()
-                
-                # Check for Duplicate MN Request
-                # 1. Update query to use named parameter :mn
-                query = "SELECT mn_number FROM requests WHERE mn_number = :mn"
-                
-                # 2. Define the parameter in a dictionary
-                params = {"mn": mn_no}
-                
-                # 3. Use the centralized load_data function (which returns a DataFrame)
-                existing_mn_df = load_data(query, params=params)
-                
-                # 4. Check if the DataFrame contains any rows
-                if not existing_mn_df.empty:
-                    st.session_state['mn_submission_result'] = f"❌ Duplicate Submission Error: MN {mn_no} already exists."
-                    st.session_state['mn_submission_status'] = 'error'
-                    st.rerun()
-                    
-                df_status, _, _, _ = calculate_status()
-                target_area = df_status[df_status['cost_area'] == area]
-                curr_remaining = target_area['Remaining Balance'].iloc[0]
-                if landed_total_cost > curr_remaining:
-                    st.session_state['mn_submission_result'] = f"⚠️ Budget Exceeded! '{area}' only has **{curr_remaining:,.2f} BDT** remaining."
-                    st.session_state['mn_submission_status'] = 'error'
-                    st.rerun()
-                    
-                if uploaded_file:
-                    pdf_file_path = None
-                    # Construct a unique file path
-                    file_path_in_bucket = f"mn_attachments/{mn_no}_{datetime.now().strftime('%Y%m%d%H%M')}.pdf"
-                    
-                    try:
-                        supabase.storage.from_("mn_files").upload(
-                            path=file_path_in_bucket, 
-                            file=uploaded_file.getvalue(),
-                            file_options={"content-type": "application/pdf"}
-                        )  
-                        # Add file_path to your params for the INSERT query
-                        
-                        pdf_file_path = file_path_in_bucket
-                    except Exception as e:
-                        st.error(f"Failed to upload document: {e}")
-                        st.stop()            
-                        
-                date_issue_str = mn_issue_date.strftime("%Y-%m-%d")
-                date_ho_str = date_sent_ho.strftime("%Y-%m-%d")
-                
-                # 1. Update Query with named placeholders
-                query = '''INSERT INTO requests (
-                            mn_number, mn_issue_date, date_logged, requester, cost_area, estimated_cost, 
-                            status, mn_particulars, mn_category, department, location, 
-                            supplier_vendor, supplier_type, currency, foreign_spare_cost, 
-                            freight_fca_charges, customs_duty_rate, local_cost_wo_vat_ait, 
-                            vat_ait, landed_total_cost, date_sent_ho, plant_remarks, pdf_file_path
-                        ) VALUES (
-                            :mn_no, :issue_date, :logged, :req, :area, :est_cost, 
-                            :status, :particulars, :cat, :dept, :loc, 
-                            :vendor, :s_type, :curr, :f_spare, 
-                            :freight, :customs, :local_cost, 
-                            :vat, :landed, :ho_date, :remarks, :pdf_path
-                        )'''
-                
-                # 2. Convert params to a Dictionary
-                params = {
-                    "mn_no": mn_no,
-                    "issue_date": date_issue_str,
-                    "logged": datetime.now().strftime("%Y-%m-%d"),
-                    "req": requester,
-                    "area": area,
-                    "est_cost": landed_total_cost,
-                    "status": "Pending",
-                    "particulars": mn_particulars,
-                    "cat": mn_category,
-                    "dept": selected_department,
-                    "loc": location,
-                    "vendor": supplier_vendor,
-                    "s_type": supplier_type,
-                    "curr": currency,
-                    "f_spare": foreign_spare_cost,
-                    "freight": freight_fca_charges,
-                    "customs": customs_duty_pct,
-                    "local_cost": local_cost_wo_vat_ait,
-                    "vat": vat_ait,
-                    "landed": landed_total_cost,
-                    "ho_date": date_ho_str,
-                    "remarks": plant_remarks,
-                    "pdf_path": pdf_file_path,
-                }
-
-                # 3. Execute with dictionary
-                execute_query(query, params)
-                log_event("MN_SUBMISSION", f"New MN {params['mn_no']} submitted with PDF attachment.")
-                calculate_status.clear()
-                st.session_state['mn_submission_result'] = f"✅ MN Request Successful: Request **{mn_no}** submitted successfully!"
-                st.session_state['mn_submission_status'] = 'success'
-                st.rerun()
-
-    # --- TAB 3: BUDGET BALANCE SHEET ---
-    elif page_name == "Budget Balance Sheet":
-        # Reset unrelated session states
-        st.session_state['mn_submission_result'] = None
-        st.session_state['mn_submission_status'] = None
-        st.session_state['show_mn_details'] = False
-        st.session_state['show_admin_edit'] = False
-        st.session_state['edit_mn_id'] = None
-
-        # Initialize local session states for drill-down
-        if 'bb_selected_status' not in st.session_state:
-            st.session_state.bb_selected_status = None
-        if 'bb_selected_mn' not in st.session_state:
-            st.session_state.bb_selected_mn = None
-
-        st.title("📊 Budget Balance Sheet (Departmental Subtotals)")
-        
-        # Fetch data
-        df_status, total_budget, total_spent, remaining = calculate_status()
-    
-        if df_status.empty:
-            st.info("No budget data found.")
-            st.stop()
-
-        # --- 1. FINANCIAL BAR CHART ---
-        st.subheader("Budget vs. Expenditure Overview")
-        total_approved = df_status['MN_approved'].sum()
-        chart_df = pd.DataFrame({
-            "Metric": ["Total Budget", "MN Issued (Utilized)", "MN Approved", "Remaining Budget"],
-            "Amount (BDT)": [total_budget, total_spent, total_approved, remaining]
-        })
-        
-        fig_bar = px.bar(
-            chart_df, 
-            x="Metric", 
-            y="Amount (BDT)", 
-            color="Metric",
-            text="Amount (BDT)",
-            color_discrete_map={
-                "Total Budget": "#008080", 
-                "MN Issued (Utilized)": "#FFA500", 
-                "MN Approved": "#2ECC71", 
-                "Remaining Budget": "#E74C3C"
-            }
-        )
-        fig_bar.update_traces(texttemplate='%{text:,.2s}', textposition='outside')
-        fig_bar.update_layout(showlegend=False, height=450, margin=dict(t=30))
-        st.plotly_chart(fig_bar, use_container_width=True)
-
-        st.markdown("---")
-
-        # --- 2. MN REQUEST STATUS SUMMARY & DRILL-DOWN ---
-        st.subheader("MN Request Status Summary")
-        status_raw = load_data("SELECT status, mn_number FROM requests ORDER BY mn_number ASC")
-        
-        if not status_raw.empty:
-            counts = status_raw['status'].value_counts().reset_index()
-            counts.columns = ['Status', 'Count']
-            
-            sc1, sc2 = st.columns([1, 1])
-            
-            with sc1:
-                # Pie Chart
-                fig_pie = px.pie(
-                    counts, 
-                    values='Count', 
-                    names='Status', 
-                    hole=0.4,
-                    color_discrete_sequence=px.colors.qualitative.Pastel
-                )
-                fig_pie.update_layout(margin=dict(t=0, b=0, l=0, r=0), height=300)
-                st.plotly_chart(fig_pie, use_container_width=True)
-
-            with sc2:
-                # Metrics with "link-like" buttons
-                st.write("**Click a number to view MNs:**")
-                for _, row in counts.iterrows():
-                    # Display metric and a button for drill-down
-                    col_m, col_b = st.columns([2, 3])
-                    col_m.metric(row['Status'], row['Count'])
-                    if col_b.button(f"List {row['Status']} MNs", key=f"drill_{row['Status']}"):
-                        st.session_state.bb_selected_status = row['Status']
-                        st.session_state.bb_selected_mn = None # Reset MN choice
-
-            # Drill-down view
-            if st.session_state.bb_selected_status:
-                st.markdown(f"### MNs for Status: `{st.session_state.bb_selected_status}`")
-                mn_list = status_raw[status_raw['status'] == st.session_state.bb_selected_status]['mn_number'].tolist()
-                
-                sel_mn = st.selectbox("Select an MN number for overview", ["-- Select --"] + mn_list)
-                if sel_mn != "-- Select --":
-                    mn_full = load_data(f"SELECT * FROM requests WHERE mn_number = '{sel_mn}'")
-                    if not mn_full.empty:
-                        d = mn_full.iloc[0]
-                        with st.container(border=True):
-                            st.markdown(f"#### Overview: {sel_mn}")
-                            c_a, c_b = st.columns(2)
-                            c_a.write(f"**Requester:** {d['requester']}")
-                            c_a.write(f"**Dept:** {d['department']}")
-                            c_a.write(f"**Cost Area:** {d['cost_area']}")
-                            c_b.write(f"**Est. Cost:** BDT {d['estimated_cost']:,.2f}")
-                            c_b.write(f"**Date Logged:** {d['date_logged']}")
-                            c_b.write(f"**Category:** {d['mn_category']}")
-                            st.write(f"**Particulars:** {d['mn_particulars']}")
-                
-                if st.button("Close Drill-down"):
-                    st.session_state.bb_selected_status = None
-                    st.rerun()
-
-        else:
-            st.info("No MN requests recorded yet.")
-
-        st.markdown("---")
-
-        # --- 3. DETAILED BREAKDOWN TABLE ---
-        st.subheader("Detailed Departmental Breakdown")
-        df_status = df_status.rename(columns={
-            'total_budget': 'Total Budget',
-            'Total Utilized Cost': 'MN_issued',
-            'Remaining Balance': 'Remaining Budget'
-        })
-
-        display_cols = ['department', 'cost_area', 'Total Budget', 'MN_issued', 'MN_approved', 'Remaining Budget']
-        df_display = df_status[display_cols].copy()
-
-        val_cols = ['Total Budget', 'MN_issued', 'MN_approved', 'Remaining Budget']
-        df_subtotal = df_display.groupby('department', as_index=False)[val_cols].sum()
-        df_subtotal['cost_area'] = '--- SUBTOTAL ---'
-
-        final_df = pd.concat([df_display, df_subtotal], ignore_index=True)
-        final_df = final_df.sort_values(by=['department', 'cost_area'], ascending=[True, True])
-        final_df = final_df.rename(columns={'department': 'Department'})
-
-        def style_balance_sheet(row):
-            if row['cost_area'] == '--- SUBTOTAL ---':
-                return ['font-weight: bold; background-color: #f0f2f6'] * len(row)
-            return [''] * len(row)
-
-        styled_df = final_df.style.apply(style_balance_sheet, axis=1).format({
-            'Total Budget': 'BDT {:,.2f}',
-            'MN_issued': 'BDT {:,.2f}',
-            'MN_approved': 'BDT {:,.2f}',
-            'Remaining Budget': 'BDT {:,.2f}'
-        })
-
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-
-        st.download_button(
-            label="Download Balance Sheet CSV",
-            data=final_df.to_csv(index=False).encode('utf-8'),
-            file_name='budget_balance_sheet.csv',
-            mime='text/csv'
-        )
-    elif page_name == "Message Board":
-        message_board()
-    elif page_name == "LC/PO & Payment Tracker":
-        st.session_state['mn_submission_result'] = None
-        st.session_state['mn_submission_status'] = None
-        st.session_state['show_admin_edit'] = False
-        st.session_state['edit_mn_id'] = None
-            
-        st.title("💰 LC/PO & Payment Tracker")
-        st.markdown("Track the procurement and payment progress for **Finance Approved** MN Requests.")
-        
-        # 1. Fetch Finance Approved Requests
-        approved_requests = load_data("""
-            SELECT mn_number, mn_particulars, cost_area, supplier_vendor, date_sent_ho, supplier_type
-            FROM requests 
-            WHERE status IN ('Finance Approved', 'PO Issued') 
-            ORDER BY date_sent_ho DESC
-        """)
-        
-        if approved_requests.empty:
-            st.info("No MN requests are currently at the 'Finance Approved' or 'PO Issued' stage for tracking.")
-            st.session_state['show_mn_details'] = False # Ensure details are hidden if no data exists
-            st.stop()
-            
-        # Add a blank option to force selection
-        mn_options = ['--- Select an MN Reference ID ---'] + approved_requests['mn_number'].tolist()
-        
-        # 2. MN Selection Form
-        with st.form("mn_tracker_select_form"):
-            col_select, col_button = st.columns([3, 1])
-            selected_mn = col_select.selectbox("Select MN Reference ID to Track/Update *", mn_options, index=0, key="tracker_mn_select")
-            
-            is_mn_selected = selected_mn != '--- Select an MN Reference ID ---'
-            
-            # Button to trigger details visibility
-            if col_button.form_submit_button("Show Details", type="primary"):
-                if is_mn_selected:
-                    st.session_state['show_mn_details'] = True
-                else:
-                    st.session_state['show_mn_details'] = False
-                    st.error("Please select a valid MN Reference ID.")
-            
-            # Only proceed with complex fetching and rendering if the MN is selected AND the details flag is set
-            if st.session_state['show_mn_details'] and is_mn_selected:
-                
-                # 1. Update SQL to use :mn (PostgreSQL/SQLAlchemy style)
-                query = "SELECT * FROM lc_po_tracker WHERE mn_number = :mn"
-                
-                # 2. Pass the parameter as a dictionary
-                params = {"mn": selected_mn}
-                
-                # 3. Use the load_data function with the dictionary
-                tracker_df = load_data(query, params=params)
-                
-                tracker_data = {}
-                if not tracker_df.empty:
-                    tracker_data = tracker_df.iloc[0].to_dict()
-                
-                request_data = approved_requests[approved_requests['mn_number'] == selected_mn].iloc[0].to_dict()
-                
-                # Helper function to safely convert DB string date to date object
-                def safe_date_input(key, default_date_str=None):
-                    if tracker_data.get(key):
-                        try:
-                            # Use default value if parsing fails
-                            return datetime.strptime(tracker_data[key], "%Y-%m-%d").date()
-                        except ValueError:
-                            pass
-                    
-                    # Use today's date if no default string is provided and conversion failed
-                    if default_date_str == str(date.today()):
-                        return date.today()
-                        
-                    return None
-                    
-                # --- START DISPLAYING DETAILS AND INPUT FIELDS ---
-                st.markdown("---")
-                st.subheader("Selected MN Details")
-                
-                col_d1, col_d2, col_d3 = st.columns(3)
-                col_d1.info(f"**Cost Area:** {request_data.get('cost_area')}")
-                col_d2.info(f"**Supplier:** {request_data.get('supplier_vendor')}")
-                col_d3.info(f"**Supplier Type:** {request_data.get('supplier_type')}")
-                st.markdown(f"**MN Particulars:** *{request_data.get('mn_particulars')}*")
-
-                st.markdown("---")
-                st.subheader("Procurement & Payment Inputs")
-                
-                # --- INPUT FIELDS ---
-                col1, col2 = st.columns(2)
-                
-                # Procurement/LC Details
-                lc_po_nr = col1.text_input("LC Nr. / PO Nr.", value=tracker_data.get('lc_po_nr', ''))
-                lc_po_date_val = safe_date_input('lc_po_date')
-                lc_po_date = col2.date_input("Date of LC/PO", value=lc_po_date_val, key="lc_po_date", disabled=not is_mn_selected)
-                
-                col3, col4 = st.columns(2)
-                eta_shipment_val = safe_date_input('eta_shipment_delivery')
-                eta_shipment = col3.date_input("ETA Shipment/Delivery Date", value=eta_shipment_val, key="mn_eta", disabled=not is_mn_selected)
-                
-                delivery_completed = col4.selectbox("Delivery Completed?", 
-                                                    options=['No', 'Yes'], 
-                                                    index=['No', 'Yes'].index(tracker_data.get('delivery_completed', 'No')),
-                                                    key="delivery_completed_select", disabled=not is_mn_selected)
-                
-                date_of_delivery_val = safe_date_input('date_of_delivery')
-                date_of_delivery = st.date_input("Date of Delivery", value=date_of_delivery_val, key="mn_delivery_date", disabled=not is_mn_selected)
-                
-                commercial_remarks = st.text_area("Commercial / Store Remarks", value=tracker_data.get('commercial_store_remarks', ''), disabled=not is_mn_selected)
-                
-                st.markdown("---")
-                
-                # Delay Calculation (LC/PO Date - Date Sent HO)
-                delay_days = 0
-                date_ho = datetime.strptime(request_data['date_sent_ho'], "%Y-%m-%d").date()
-                if lc_po_date:
-                    delay_days = (lc_po_date - date_ho).days
-                    st.info(f"Calculated Delay: **{delay_days} days** (LC/PO Date to Date Sent HO)")
-                else:
-                    st.info("Delay will be calculated once the LC/PO Date is entered.")
-
-                st.markdown("---")
-                
-                # Payment Details
-                st.subheader("Bill & Payment Tracking")
-                
-                col5, col6 = st.columns(2)
-                
-                # Local Supplier Specific Field
-                # CHANGED: "Bill Submitted by Vendor" is now a Yes/No option for Local Suppliers
-                bill_submitted_vendor = tracker_data.get('bill_submitted_vendor', 'No')
-                if request_data.get('supplier_type') == 'Local':
-                    bill_submitted_vendor = col5.selectbox("Bill Submitted by Vendor (Local Supplier)?", ["No", "Yes"], 
-                                                           index=["No", "Yes"].index(bill_submitted_vendor) if bill_submitted_vendor in ["No", "Yes"] else 0,
-                                                           disabled=not is_mn_selected)
-                else:
-                    bill_submitted_vendor = col5.text_input("Bill Submitted by Vendor (Foreign Supplier)", 
-                                                           value=bill_submitted_vendor, disabled=not is_mn_selected)
-                
-                bill_tracking_id = col6.text_input("Bill Tracking ID", value=tracker_data.get('bill_tracking_id', ''), disabled=not is_mn_selected)
-                
-                col7, col8, col9 = st.columns(3)
-                date_bill_acc_val = safe_date_input('date_bill_submit_acc')
-                date_bill_acc = col7.date_input("Date of Bill Submit to Acc.", value=date_bill_acc_val, key="mn_bill_acc_date", disabled=not is_mn_selected)
-                
-                date_bill_ho_val = safe_date_input('date_bill_submit_ho')
-                date_bill_ho = col8.date_input("Date of Bill Submit to HO", value=date_bill_ho_val, key="mn_bill_ho_date", disabled=not is_mn_selected)
-                
-                bill_paid = col9.selectbox("Bill Paid?", 
-                                           options=['No', 'Yes'], 
-                                           index=['No', 'Yes'].index(tracker_data.get('bill_paid', 'No')),
-                                           key="bill_paid_select", disabled=not is_mn_selected)
-                
-                # Foreign Supplier Specific Field
-                actual_lc_costing = tracker_data.get('actual_lc_costing', 0.0)
-                if request_data.get('supplier_type') == 'Foreign':
-                    actual_lc_costing = st.number_input("Actual LC Costing (Foreign Supplier)", min_value=0.0, format="%.2f", value=float(actual_lc_costing), disabled=not is_mn_selected)
-                
-                st.markdown("---")
-            
-            # --- SUBMIT BUTTON ---
-            submitted = st.form_submit_button("Update LC/PO & Payment Data")
-            
-            if submitted:
-                if not is_mn_selected:
-                    st.error("Please select an MN Reference ID before submitting.")
-                elif not st.session_state['show_mn_details']:
-                    st.error("Please click 'Show Details' first to load the data for the selected MN.")
-                else:
-                    # Logic runs only if MN is selected and details were shown/updated
-                    # Ensure date fields are formatted as strings for storage
-                    # Check if date inputs are not None before calling strftime
-                    lc_po_date_str = lc_po_date.strftime("%Y-%m-%d") if lc_po_date else None
-                    eta_shipment_str = eta_shipment.strftime("%Y-%m-%d") if eta_shipment else None
-                    date_of_delivery_str = date_of_delivery.strftime("%Y-%m-%d") if date_of_delivery else None
-                    date_bill_acc_str = date_bill_acc.strftime("%Y-%m-%d") if date_bill_acc else None
-                    date_bill_ho_str = date_bill_ho.strftime("%Y-%m-%d") if date_bill_ho else None
-                    
-                    # Update requests table status if PO number is entered and status is 'Finance Approved'
-                    # 1. Update load_data to use named parameter :mn
-                    status_df = load_data(
-                        "SELECT status FROM requests WHERE mn_number = :mn", 
-                        params={"mn": selected_mn}
-                    )
-                    current_mn_status = status_df.iloc[0]['status'] if not status_df.empty else None
-
-                    if lc_po_nr and current_mn_status == 'Finance Approved':
-                        # 2. Update using named parameters (already dictionary-based)
-                        execute_query(
-                            "UPDATE requests SET status = 'PO Issued' WHERE mn_number = :mn", 
-                            {"mn": selected_mn}
-                        )
-                        log_event("MN_STATUS_CHANGE", f"MN {selected_mn} status changed to 'PO Issued' by LC/PO entry.")
-                    
-                    # UPSERT (Insert or Update) logic for PostgreSQL
-                    query = """
-                        INSERT INTO lc_po_tracker (
-                            mn_number, lc_po_nr, lc_po_date, eta_shipment_delivery, delivery_completed, date_of_delivery, 
-                            commercial_store_remarks, delay_days, bill_submitted_vendor, bill_tracking_id, 
-                            date_bill_submit_acc, date_bill_submit_ho, bill_paid, actual_lc_costing
-                        ) VALUES (
-                            :mn, :po_nr, :po_date, :eta, :delivered, :delivery_date, 
-                            :remarks, :delay, :bill_vendor, :bill_id, 
-                            :bill_acc, :bill_ho, :paid, :costing
-                        )
-                        ON CONFLICT(mn_number) DO UPDATE SET
-                            lc_po_nr=EXCLUDED.lc_po_nr, 
-                            lc_po_date=EXCLUDED.lc_po_date, 
-                            eta_shipment_delivery=EXCLUDED.eta_shipment_delivery, 
-                            delivery_completed=EXCLUDED.delivery_completed, 
-                            date_of_delivery=EXCLUDED.date_of_delivery, 
-                            commercial_store_remarks=EXCLUDED.commercial_store_remarks, 
-                            delay_days=EXCLUDED.delay_days, 
-                            bill_submitted_vendor=EXCLUDED.bill_submitted_vendor, 
-                            bill_tracking_id=EXCLUDED.bill_tracking_id, 
-                            date_bill_submit_acc=EXCLUDED.date_bill_submit_acc, 
-                            date_bill_submit_ho=EXCLUDED.date_bill_submit_ho, 
-                            bill_paid=EXCLUDED.bill_paid, 
-                            actual_lc_costing=EXCLUDED.actual_lc_costing
-                    """
-                    
-                    # Parameters as a Dictionary
-                    params = {
-                        "mn": selected_mn,
-                        "po_nr": lc_po_nr,
-                        "po_date": lc_po_date_str,
-                        "eta": eta_shipment_str,
-                        "delivered": delivery_completed,
-                        "delivery_date": date_of_delivery_str,
-                        "remarks": commercial_remarks,
-                        "delay": delay_days,
-                        "bill_vendor": bill_submitted_vendor,
-                        "bill_id": bill_tracking_id,
-                        "bill_acc": date_bill_acc_str,
-                        "bill_ho": date_bill_ho_str,
-                        "paid": bill_paid,
-                        "costing": actual_lc_costing
-                    }
-                    
-                    execute_query(query, params)
-                    
-                    log_event("LC_PO_UPDATE", f"Updated LC/PO tracker for MN {selected_mn}. LC/PO: {lc_po_nr}.")
-                    st.success(f"Successfully updated tracking data for MN **{selected_mn}**.")
-                    st.session_state['show_mn_details'] = False # Hide details after update
-                    st.rerun()                    
-
-        st.markdown("---")
-        # 3. Display Updated Tracking Table
-        st.header("LC/PO Tracking Data")
-        
-        # Join requests and lc_po_tracker for a complete view
-        tracker_display_df = load_data("""
-            SELECT
-                r.mn_number,
-                r.mn_particulars,
-                r.cost_area,
-                r.supplier_vendor,
-                r.supplier_type,
-                r.status,
-                t.lc_po_nr,
-                t.lc_po_date,
-                t.eta_shipment_delivery,
-                t.delivery_completed,
-                t.date_of_delivery,
-                t.delay_days,
-                t.bill_tracking_id,
-                t.bill_paid
-            FROM requests r
-            INNER JOIN lc_po_tracker t ON r.mn_number = t.mn_number
-        """)
-        
-        if tracker_display_df.empty:
-            st.info("No tracking entries have been created yet.")
-        else:
-            # Smart Filtering for the Display Table
-            st.subheader("Filter Tracking Table")
-            
-            # CHANGED: Added supplier_type to the filtering options
-            col_t1, col_t2, col_t3, col_t4 = st.columns(4)
-            
-            filter_po = col_t1.text_input("Filter by LC/PO Number")
-            filter_supp_type = col_t2.multiselect("Filter by Supplier Type", tracker_display_df['supplier_type'].unique(), default=[])
-            filter_delivery = col_t3.multiselect("Filter by Delivery Status", tracker_display_df['delivery_completed'].unique(), default=[])
-            filter_paid = col_t4.multiselect("Filter by Bill Paid Status", tracker_display_df['bill_paid'].unique(), default=[])
-            
-            filtered_tracker = tracker_display_df.copy()
-            if filter_po:
-                filtered_tracker = filtered_tracker[filtered_tracker['lc_po_nr'].str.contains(filter_po, case=False, na=False)]
-            if filter_supp_type:
-                filtered_tracker = filtered_tracker[filtered_tracker['supplier_type'].isin(filter_supp_type)]
-            if filter_delivery:
-                filtered_tracker = filtered_tracker[filtered_tracker['delivery_completed'].isin(filter_delivery)]
-            if filter_paid:
-                filtered_tracker = filtered_tracker[filtered_tracker['bill_paid'].isin(filter_paid)]
-                
-            st.dataframe(filtered_tracker, width='stretch')
-            
-            st.download_button(
-                label="Download Tracking Data CSV",
-                data=filtered_tracker.to_csv(index=False).encode('utf-8'),
-                file_name='lc_po_tracker_data.csv',
-                mime='text/csv',
-                key='download_tracker_data'
-            )
-
-
-    # --- TAB 5: BUDGET SETUP & IMPORT ---
-    elif page_name == "Budget Setup & Import":
-        st.session_state['mn_submission_result'] = None
-        st.session_state['mn_submission_status'] = None
-        st.session_state['show_mn_details'] = False
-        st.session_state['show_admin_edit'] = False
-        st.session_state['edit_mn_id'] = None
-
-        if st.session_state['role'] != 'administrator':
-            st.error("🚫 Access Denied: Only Administrators can access Budget Setup.")
-            st.stop()
-
-        st.title("⚙️ Budget Configuration & Import 2026")
-        
-        st.header("1. Import Budget from File")
-        st.markdown("**Expected Columns:** `Department`, `Cost Area`, `Total Budget`")
-        
-        uploaded_file = st.file_uploader("Upload Budget File (CSV or XLSX)", type=['csv', 'xlsx'])
-        
-        if uploaded_file is not None:
-            try:
-                if uploaded_file.name.endswith('.csv'):
-                    budget_df = pd.read_csv(uploaded_file)
-                else:
-                    budget_df = pd.read_excel(uploaded_file, engine='openpyxl')
-                    
-                budget_df.columns = [col.strip().replace(' ', '_').replace('.', '_').lower() for col in budget_df.columns]
-                required_cols = ['department', 'cost_area', 'total_budget']
-
-                if not all(col in budget_df.columns for col in required_cols):
-                    st.error(f"Error: Missing required columns: {', '.join([col for col in required_cols if col not in budget_df.columns])}.")
-                else:
-                    st.subheader("Preview of Data to Import:")
-                    st.dataframe(budget_df[required_cols])
-                    
-                    if st.button("Confirm and Import/Update Budgets"):
-                        rows_imported = 0
-                        for index, row in budget_df.iterrows():
-                            # 1. Update to PostgreSQL UPSERT syntax with named parameters (:key)
-                            query = """
-                                INSERT INTO budget_heads (cost_area, department, total_budget) 
-                                VALUES (:area, :dept, :total)
-                                ON CONFLICT (cost_area) 
-                                DO UPDATE SET 
-                                    department = EXCLUDED.department, 
-                                    total_budget = EXCLUDED.total_budget
-                            """
-                            
-                            # 2. Create the dictionary for the current row
-                            params = {
-                                "area": row['cost_area'],
-                                "dept": row['department'],
-                                "total": row['total_budget']
-                            }
-                            
-                            # 3. Execute using the centralized helper function
-                            execute_query(query, params)
-                            rows_imported += 1
-                        
-                        log_event("BUDGET_IMPORT", f"Bulk imported/updated {rows_imported} budget heads.")
-                        calculate_status.clear()
-                        st.success(f"Successfully imported/updated {rows_imported} budget heads.")
-                        st.rerun()
-
-            except Exception as e:
-                st.error(f"An unexpected error occurred during file processing: {e}")
-            st.markdown("---") # Adds a nice divider 
-            
-        # --- MANUAL ENTRY OPTION ---
-        st.header("2. Manual Budget Entry")
-        st.markdown("Use this form to add a new budget or quickly adjust an existing one.")
-        
-        # Manual Entry Form 
-        with st.form("manual_budget_form"):
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                dept = st.text_input("Department (e.g., Production)")
-            with col2:
-                area = st.text_input("Cost Area Name (e.g., Line-1, Generator)")
-            with col3:
-                amount = st.number_input("Approved Budget 2026 (BDT)", min_value=0.0, format="%.2f")
-            
-            submit_budget = st.form_submit_button("Manually Add/Update Budget Head")
-            if submit_budget:
-                if dept and area and amount > 0:
-                    try:
-                        # 1. Update to PostgreSQL UPSERT syntax with named parameters
-                        query = """
-                            INSERT INTO budget_heads (cost_area, department, total_budget) 
-                            VALUES (:area, :dept, :amount)
-                            ON CONFLICT (cost_area) 
-                            DO UPDATE SET 
-                                department = EXCLUDED.department, 
-                                total_budget = EXCLUDED.total_budget
-                        """
-                        
-                        # 2. Use a dictionary for parameters
-                        params = {
-                            "area": area,
-                            "dept": dept,
-                            "amount": amount
-                        }
-                        
-                        execute_query(query, params)
-                        
-                        # LOGGING MANUAL BUDGET UPDATE
-                        log_event("BUDGET_UPDATE", f"Manually updated/added budget for {area} to {amount:,.2f} BDT.")
-                        calculate_status.clear()
-                        st.success(f"Added/Updated {area} with budget {amount:,.2f}")
-                        st.rerun()
-                        
-                    except Exception as e:
-                        # Generic exception handling for Supabase/Postgres
-                        st.error(f"Database error: {e}")
-                else:
-                    st.warning("Please fill all manual entry fields.")            
-
-        # Display current budget allocations
-        st.subheader("Current Master Budget Data")
-        current_budget_df = load_data("SELECT * FROM budget_heads")
-        st.dataframe(current_budget_df, width='stretch')
-        
-        # Download CSV option
-        st.download_button(
-            label="Download Budget Data CSV",
-            data=current_budget_df.to_csv(index=False).encode('utf-8'),
-            file_name='master_budget_data.csv',
-            mime='text/csv',
-            key='download_budget_data'
-        )
-
-        # --- CLEAR BUDGET DATA OPTION ---
-        st.markdown("---")
-        st.header("3. Danger Zone (Clear Data)")
-        st.markdown("Use this to clear all existing budget allocations to start fresh for a new fiscal year. **This does NOT delete request history.**")
-        
-        if st.button("🔴 CLEAR ALL BUDGET DATA", help="This action cannot be undone!", type="secondary"):
-            execute_query("DELETE FROM budget_heads")
-            # LOGGING BUDGET CLEAR
-            log_event("BUDGET_CLEAR", "Cleared ALL data from the budget_heads table.")
-            calculate_status.clear()
-            st.warning("🗑️ All budget data has been cleared!")
-            st.rerun()
-
-
-    # --- TAB 6: USERS & ACCESS CONTROL ---
-    elif page_name == "Users & Access Control":
-        st.session_state['mn_submission_result'] = None
-        st.session_state['mn_submission_status'] = None
-        st.session_state['show_mn_details'] = False
-        st.session_state['show_admin_edit'] = False
-        st.session_state['edit_mn_id'] = None
-
-        if st.session_state['role'] != 'administrator':
-            st.error("🚫 Access Denied: Only Administrators can access User and Configuration settings.")
-            st.stop()
-            
-        st.title("👥 User Creation & Access Management")
-        
-        # --- CONFIGURATION FORM ---
-        st.header("1. Financial Configuration (Admin Only)")
-        config_data = load_data("SELECT key, value FROM exchange_config")
-        config_dict = config_data.set_index('key')['value'].to_dict()
-        
-        with st.form("financial_config_form"):
-            st.subheader("Currency Exchange Rates (1 Unit = BDT)")
-            col_rates = st.columns(5)
-            # Fetch existing rates or use defaults
-            usd = col_rates[0].number_input("USD Rate", value=config_dict.get('USD_rate', 110.00), min_value=0.01)
-            eur = col_rates[1].number_input("EUR Rate", value=config_dict.get('EUR_rate', 120.00), min_value=0.01)
-            gbp = col_rates[2].number_input("GBP Rate", value=config_dict.get('GBP_rate', 130.00), min_value=0.01)
-            inr = col_rates[3].number_input("INR Rate", value=config_dict.get('INR_rate', 1.50), min_value=0.01)
-            other = col_rates[4].number_input("Other Currency Rate", value=config_dict.get('OTHER_rate', 100.00), min_value=0.01)
-
-            st.subheader("Customs Duty")
-            # Customs Duty is in percentage (0.05 for 5%)
-            duty = st.number_input("Customs Duty % (e.g., input 0.05 for 5%)", 
-                                   value=config_dict.get('CustomsDuty_pct', 0.05), 
-                                   min_value=0.00, 
-                                   max_value=1.0,
-                                   format="%.4f")
-            
-            if st.form_submit_button("Save Configuration"):
-                updates = [
-                    {'k': 'USD_rate', 'v': usd}, 
-                    {'k': 'EUR_rate', 'v': eur}, 
-                    {'k': 'GBP_rate', 'v': gbp}, 
-                    {'k': 'INR_rate', 'v': inr}, 
-                    {'k': 'OTHER_rate', 'v': other}, 
-                    {'k': 'CustomsDuty_pct', 'v': duty}
-                ]
-                
-                # 1. Update to PostgreSQL UPSERT syntax with named parameters (:k, :v)
-                query = """
-                    INSERT INTO exchange_config (key, value) 
-                    VALUES (:k, :v)
-                    ON CONFLICT (key) 
-                    DO UPDATE SET value = EXCLUDED.value
-                """
-                
-                # 2. Iterate through the dictionaries and use the centralized execute_query
-                for params in updates:
-                    execute_query(query, params)
-                
-                # LOGGING CONFIG UPDATE
-                log_event("CONFIG_UPDATE", f"Updated Financial Config: Duty={duty:.2%}, Rates=USD:{usd}, EUR:{eur}, GBP:{gbp}, INR:{inr}, OTHER:{other}.")
-                st.success("Financial configuration updated successfully!")
-                st.rerun()
-
-        st.markdown("---")
-        st.header("2. Create New User")
-        with st.form("new_user_form"):
-            col1, col2 = st.columns(2)
-            with col1:
-                new_username = st.text_input("Username")
-                new_password = st.text_input("Password", type='password')
-            with col2:
-                new_role = st.selectbox("Role", ["user", "super", "administrator"])
- 
-            if st.form_submit_button("Create User"):
-                if new_username and new_password:
-                    try:
-                        hashed_pwd = make_hashes(new_password)
-                        
-                        # 1. Update to named parameters (:username, etc.)
-                        query = "INSERT INTO users (username, password_hash, role) VALUES (:user, :pw, :role)"
-                        
-                        # 2. Pass parameters as a dictionary
-                        params = {
-                            "user": new_username,
-                            "pw": hashed_pwd,
-                            "role": new_role
-                        }
-                        
-                        execute_query(query, params)
-                        
-                        # LOGGING USER CREATION
-                        log_event("USER_CREATE", f"Created new user '{new_username}' with role '{new_role}'.")
-                        st.success(f"User **{new_username}** created with role **{new_role}**.")
-                        st.rerun() 
-                        
-                    except Exception as e:
-                        # 3. Use a generic exception or check for 'UniqueViolation' 
-                        # to replace sqlite3.IntegrityError
-                        if "unique constraint" in str(e).lower() or "already exists" in str(e).lower():
-                            st.error("Username already exists. Please choose a different name.")
-                        else:
-                            st.error(f"Database error: {e}")
-                else:
-                    st.warning("Username and Password cannot be empty.")
-        
-        st.subheader("3. Existing Users")
-        users_df = load_data("SELECT id, username, role FROM users")
-        st.dataframe(users_df, width='stretch')
-        st.subheader("Manage Registered Users")
-    
-        # Load users from the database
-        users_df = load_data("SELECT id, username, role FROM users ORDER BY username")
-    
-        if not users_df.empty:
-            # Create a selection box to choose a user to delete
-            # Exclude the currently logged-in admin to prevent self-deletion
-            other_users = users_df[users_df['username'] != st.session_state['username']]
-        
-            if not other_users.empty:
-                user_to_delete = st.selectbox(
-                    "Select User to Remove", 
-                    options=other_users['username'].tolist(),
-                    help="Warning: This action cannot be undone."
-                )
-                if st.button("❌ Delete Selected User", type="primary"):
-                    # 1. Update SQL to use :username (PostgreSQL/SQLAlchemy style)
-                    # 2. Pass the parameter as a dictionary
-                    query = "DELETE FROM users WHERE username = :user"
-                    params = {"user": user_to_delete}
-                    
-                    execute_query(query, params)
-                
-                    # Log the event
-                    log_event("USER_DELETE", f"Admin deleted user: {user_to_delete}")
-                
-                    st.success(f"User '{user_to_delete}' has been permanently removed.")
-                    st.rerun() # Refresh the page to update the user list
-            else:
-                st.info("No other users available to delete.")
-            
-            # Display the current user table for reference
-            st.dataframe(users_df[['username', 'role']], width='stretch', hide_index=True)
-        else:
-            st.warning("No users found in the database.")
-        
-        # Download CSV option
-        st.download_button(
-            label="Download User List CSV",
-            data=users_df.to_csv(index=False).encode('utf-8'),
-            file_name='user_list.csv',
-            mime='text/csv',
-            key='download_users'
-        )
-    # --- VIEW DOCUMENTS PAGE LOGIC ---
-    elif page_name == "View Documents":
-        st.title("MN Document Viewer")
-
-        # 1. Fetch records that have an attachment
-        try:
-            # We filter for paths that aren't empty
-            docs_df = load_data("SELECT mn_number, pdf_file_path FROM requests WHERE pdf_file_path IS NOT NULL AND pdf_file_path != ''")
-            
-            if docs_df.empty:
-                st.info("No documents found in the database. Please ensure you have uploaded a PDF during the MN Request process.")
-            else:
-                st.success(f"Found {len(docs_df)} documents.")
-                mn_list = docs_df['mn_number'].tolist()
-                selected_mn = st.selectbox("Select MN Number to View PDF", ["---"] + mn_list)
-                
-                if selected_mn != "---":
-                    # Get the raw path from the database (e.g., "/mn_files/mn_attachments/file.pdf")
-                    db_path = docs_df[docs_df['mn_number'] == selected_mn]['pdf_file_path'].iloc[0]
-                    
-                    # CLEAN THE PATH: Remove the bucket prefix so Supabase can find it
-                    # This changes "/mn_files/mn_attachments/..." to "mn_attachments/..."
-                    clean_path = db_path.replace("/mn_files/", "").lstrip("/")
-                    
-                    try:
-                        # 2. Create a signed URL
-                        # Note: In most recent supabase-py versions, this returns the URL string directly.
-                        # We use a check to handle both old (dict) and new (string) response formats.
-                        response = supabase.storage.from_("mn_files").create_signed_url(clean_path, 60)
-                        
-                        signed_url = None
-                        if isinstance(response, dict) and 'signedURL' in response:
-                            signed_url = response['signedURL']
-                        elif isinstance(response, str):
-                            signed_url = response
-                            
-                        if signed_url:
-                            # 3. Embed the PDF using an iframe
-                            # Added 'type="application/pdf"' to help browsers recognize the content
-                            pdf_display = f'<iframe src="{signed_url}" width="100%" height="800px" style="border:none;" type="application/pdf"></iframe>'
-                            st.markdown(pdf_display, unsafe_allow_html=True)
-                            
-                            # Provide a fallback link
-                            st.markdown(f"**[🔗 Open Document in New Tab]({signed_url})**")
-                        else:
-                            st.error(f"Could not generate access link. Check if file exists at: {clean_path}")
-                            
-                    except Exception as e:
-                        st.error(f"Error retrieving file from Supabase Storage: {e}")
-                        
-        except Exception as e:
-            st.error(f"Database Error: Could not fetch document list. Error: {e}")
-
-    # --- TAB 7: EVENT LOG ---
-    elif page_name == "Event Log":
-        # Guard: Super & Admin can access
-        if st.session_state['role'] not in ['administrator', 'super']:
-            st.error("🚫 Access Denied.")
-            st.stop()
-        st.session_state['mn_submission_result'] = None
-        st.session_state['mn_submission_status'] = None
-        st.session_state['show_mn_details'] = False
-        st.session_state['show_admin_edit'] = False
-        st.session_state['edit_mn_id'] = None
-            
-        st.title("📜 Application Event Log (Admin Audit)")
-        st.markdown("Displays critical actions performed by users and the system.")
-        
-        df_logs = get_event_logs()
-        
-        if df_logs.empty:
-            st.info("No events have been logged yet.")
-        else:
-            # Reorder and rename columns for display
-            df_logs = df_logs[['timestamp', 'username', 'action_type', 'description']]
-            df_logs.rename(columns={
-                'timestamp': 'Time',
-                'username': 'User',
-                'action_type': 'Action Type',
-                'description': 'Details'
-            }, inplace=True)
-            
-            st.dataframe(df_logs, width='stretch', hide_index=True)
-            
-            # Download CSV option
-            st.download_button(
-                label="Download Event Log CSV",
-                data=df_logs.to_csv(index=False).encode('utf-8'),
-                file_name='application_event_log.csv',
-                mime='text/csv',
-                key='download_event_log'
-            )
-
-    elif page_name == "Indent & Purchase Record":
-
-        st.title("🛒 Indent & Purchase Management")
-
-        # Initialize Session States for Billing
-        if 'temp_bill_items' not in st.session_state:
-            st.session_state['temp_bill_items'] = []
-
-        # 1. Add Items to Indent Registry
-        st.header("1. Add Items to Indent Registry")
-        with st.form("add_indent_registry_form", clear_on_submit=True):
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                reg_indent_no = st.text_input("Indent Number *")
-                reg_date = st.date_input("Indent Date", value=date.today())
-            with col2:
-                reg_desc = st.text_input("Goods Description *")
-                reg_unit = st.selectbox("Unit", ["Nos", "Sets", "Kg", "Ltr", "Mtr", "Pkt", "Roll", "Box"])
-            with col3:
-                reg_qty = st.number_input("Quantity *", min_value=0.0, step=1.0)
-                reg_rate = st.number_input("Rate (Optional)", min_value=0.0, step=0.01)
-
-            if st.form_submit_button("Add to Indent Registry", type="primary"):
-                if reg_indent_no and reg_desc and reg_qty > 0:
-                    # 1. Update SQL to use named placeholders
-                    query = '''INSERT INTO standalone_indents 
-                                   (indent_number, indent_date, item_description, quantity, unit, rate, total_amount, status) 
-                                   VALUES (:no, :date, :desc, :qty, :unit, :rate, :total, :status)'''
-                    
-                    # 2. Map variables to a dictionary
-                    params = {
-                        "no": reg_indent_no,
-                        "date": reg_date.strftime("%Y-%m-%d"),
-                        "desc": reg_desc,
-                        "qty": reg_qty,
-                        "unit": reg_unit,
-                        "rate": reg_rate,
-                        "total": reg_qty * reg_rate,
-                        "status": "Not Purchased"
-                    }
-                    
-                    execute_query(query, params)
-                    
-                    st.success(f"Added item '{reg_desc}' to Indent {reg_indent_no}")
-                    st.rerun()            
-
-        # 4. Indent Registry Status
-        st.header("4. Indent Registry Status")
-        registry_df = load_data("SELECT indent_id, indent_number, indent_date, item_description, quantity, unit, rate, status FROM standalone_indents ORDER BY indent_id DESC")
-        st.dataframe(registry_df, width='stretch', hide_index=True)
-
-        st.markdown("---")
-
-        # 3. Generate Bill from Indent Registry
-        st.header("3. Generate Bill from Indent Registry")
-        
-        # 4.1 Select Multiple Indents from Registry
-        # Fetch only 'Not Purchased' items to avoid double billing
-        indent_list_query = "SELECT DISTINCT indent_number, indent_date FROM standalone_indents WHERE status = 'Not Purchased' ORDER BY indent_date DESC"
-        indent_list_df = load_data(indent_list_query)
-        
-        if not indent_list_df.empty:
-            selected_indents = st.multiselect("Select Indent Number(s)", indent_list_df['indent_number'].tolist())
-            
-            if selected_indents:
-                # 1. Use a single named parameter :indents for the list
-                items_query = """
-                    SELECT indent_id, indent_number, item_description, quantity, unit, rate 
-                    FROM standalone_indents 
-                    WHERE indent_number IN :indents AND status = 'Not Purchased'
-                """
-                
-                # 2. Define the parameter as a dictionary containing the list/tuple
-                params = {"indents": tuple(selected_indents)}
-                
-                # 3. Use the centralized load_data function (which uses st.connection)
-                available_items_df = load_data(items_query, params=params)
-
-                if not available_items_df.empty:
-                    st.write("Select specific items to include in this bill:")
-                    
-                    # Add selection column for checkbox
-                    available_items_df.insert(0, "Select", True)
-                    
-                    # Use data_editor to allow checkbox selection and quantity/rate adjustments
-                    edited_items_df = st.data_editor(
-                        available_items_df,
-                        column_config={
-                            "Select": st.column_config.CheckboxColumn("Select", default=True),
-                            "indent_id": None, # Hide ID from user
-                            "indent_number": st.column_config.TextColumn("Indent No", disabled=True),
-                            "item_description": "Item Name",
-                            "quantity": st.column_config.NumberColumn("Qty", min_value=0.0),
-                            "rate": st.column_config.NumberColumn("Rate", min_value=0.0),
-                        },
-                        disabled=["indent_number"],
-                        hide_index=True,
-                        key="multi_bill_editor"
-                    )
-
-                    # Filter for only selected items
-                    selected_items_to_bill = edited_items_df[edited_items_df["Select"] == True].copy()
-                    
-                    if not selected_items_to_bill.empty:
-                        # Calculate totals
-                        selected_items_to_bill['amount'] = selected_items_to_bill['quantity'] * selected_items_to_bill['rate']
-                        total_bill_val = selected_items_to_bill['amount'].sum()
-                        total_bill_amt = float(total_bill_val)
-                        st.info(f"Total Amount for Selected Items: {total_bill_amt:,.2f} BDT")
-                        
-                        # 4.3 Bill Header Information Form
-                        with st.form("multi_indent_bill_form"):
-                            c1, c2, c3 = st.columns(3)
-                            new_bill_no = c1.text_input("Bill No *")
-                            new_bill_date = c2.date_input("Bill Date", value=date.today())
-                            new_supplier = c3.text_input("Supplier Name *")
-                            
-                            c4, c5 = st.columns(2)
-                            new_grn = c4.text_input("GRN No (Optional)")
-                            new_pay_mode = c5.selectbox("Payment Mode", ["Cash", "Bank Transfer", "Cheque", "Credit"])
-                            new_remarks = st.text_area("Remarks")
-
-                            submit_bill = st.form_submit_button("Generate & Save Bill")
-
-                        if submit_bill:
-                            if not new_bill_no or not new_supplier:
-                                st.error("Bill No and Supplier Name are required.")
-                            else:
-                                try:
-                                    # Create a summary string of indents for the header
-                                    indents_summary = ", ".join(selected_indents)
-                                    
-                                    # 1. Insert into indent_purchase_record (Header)
-                                    header_query = """
-                                        INSERT INTO indent_purchase_record 
-                                        (bill_no, indent_no, grn_no, supplier, bill_date, payment_mode, total_bill_amount, remarks)
-                                        VALUES (:bill, :indents, :grn, :supp, :b_date, :pay_mode, :total, :rem)
-                                    """
-                                    header_params = {
-                                        "bill": new_bill_no,
-                                        "indents": indents_summary,
-                                        "grn": new_grn,
-                                        "supp": new_supplier,
-                                        "b_date": str(new_bill_date),
-                                        "pay_mode": new_pay_mode,
-                                        "total": total_bill_amt,
-                                        "rem": new_remarks
-                                    }
-                                    execute_query(header_query, header_params)
-                                    
-                                    # 2. Insert Line Items and Update Registry Status
-                                    for _, row in selected_items_to_bill.iterrows():
-                                        # Line Item Insert
-                                        line_query = """
-                                            INSERT INTO indent_goods_details 
-                                            (bill_no, description, quantity, unit, rate, amount)
-                                            VALUES (:bill, :desc, :qty, :unit, :rate, :amt)
-                                        """
-                                        line_params = {
-                                            "bill": new_bill_no,
-                                            "desc": row['item_description'],
-                                            "qty": row['quantity'],
-                                            "unit": row['unit'],
-                                            "rate": row['rate'],
-                                            "amt": row['amount']
-                                        }
-                                        execute_query(line_query, line_params)
-                                        
-                                        # Update Registry Status
-                                        update_query = "UPDATE standalone_indents SET status = 'Purchased' WHERE indent_id = :id"
-                                        execute_query(update_query, {"id": row['indent_id']})
-                                    
-                                    st.success(f"Bill {new_bill_no} successfully generated for Indents: {indents_summary}")
-                                    st.rerun()
-
-                                except Exception as e:
-                                    # Postgres/SQLAlchemy error handling
-                                    if "unique constraint" in str(e).lower() or "already exists" in str(e).lower():
-                                        st.error("Error: This Bill No already exists.")
-                                    else:
-                                        st.error(f"Unexpected Error: {e}")
-                    else:
-                        st.warning("Please select at least one item from the table above to generate a bill.")
-            else:
-                st.info("Please select one or more Indent Numbers from the list.")
-        else:
-            st.warning("No pending (Not Purchased) indents found in the registry.")
-        # C. Temporary Display Section
-        if st.session_state['temp_bill_items']:
-            st.subheader("📋 Temporary Display (Items to be Billed)")
-            temp_df = pd.DataFrame(st.session_state['temp_bill_items'])
-            st.table(temp_df[['desc', 'qty', 'unit', 'rate', 'amount']])
-            total_val = temp_df['amount'].sum()
-            st.metric("Calculated Bill Total", f"{total_val:,.2f} BDT")
-
-        st.markdown("---")
-
-        # 5. View Saved Bills
-        st.header("5. View Saved Bills")
-        view_query = """
-            SELECT r.bill_no, r.bill_date, r.supplier, r.total_bill_amount, 
-                   d.description, d.quantity, d.unit, d.rate, d.amount as item_amount, 
-                   r.indent_no, r.grn_no, r.payment_mode, r.remarks
-            FROM indent_purchase_record r
-            JOIN indent_goods_details d ON r.bill_no = d.bill_no
-            ORDER BY r.bill_date DESC
-        """
-        bills_df = load_data(view_query)
-        if not bills_df.empty:
-            # Filters
-            f1, f2, f3 = st.columns(3)
-            with f1: search = st.text_input("Search Bill/Indent No")
-            with f2: sel_sup = st.multiselect("Filter Supplier", bills_df['supplier'].unique())
-            with f3: sel_pay = st.multiselect("Filter Payment Mode", bills_df['payment_mode'].unique())
-            
-            # Apply Filters
-            filtered = bills_df.copy()
-            if search: filtered = filtered[filtered['bill_no'].astype(str).str.contains(search) | filtered['indent_no'].astype(str).str.contains(search)]
-            if sel_sup: filtered = filtered[filtered['supplier'].isin(sel_sup)]
-            if sel_pay: filtered = filtered[filtered['payment_mode'].isin(sel_pay)]
-            
-            st.dataframe(filtered, width='stretch', hide_index=True)
-            
-            # --- ADDED: TOTALS SECTION ---
-            st.markdown("### 📊 Summary of Filtered Bills")
-            
-            # Since the JOIN creates duplicate rows for the header amount (one per item), 
-            # we must group by bill_no to get the unique bill totals.
-            unique_bills = filtered.drop_duplicates(subset=['bill_no'])
-            
-            total_recorded = unique_bills['total_bill_amount'].sum()
-            cash_total = unique_bills[unique_bills['payment_mode'] == 'Cash']['total_bill_amount'].sum()
-            cheque_total = unique_bills[unique_bills['payment_mode'] == 'Cheque']['total_bill_amount'].sum()
-
-            c1, c2, c3 = st.columns(3)
-            c1.metric("Total Recorded Amount", f"{total_recorded:,.2f} BDT")
-            c2.metric("Total Cash Amount", f"{cash_total:,.2f} BDT")
-            c3.metric("Total Cheque Amount", f"{cheque_total:,.2f} BDT")
+    # Only the selected page's script runs on a rerun; pages left out of `menu` can't be opened by URL either
+    nav = st.navigation([make_page(label) for label in menu])
+    set_rerun_page(nav.title, st.session_state['username'])
+    nav.run()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# The apps and tracker_sync.py are run from the repository root, not installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FINAL_SECRETS = """\
+SUPABASE_URL = "http://127.0.0.1:9"
+SUPABASE_KEY = "test.test.test"
+STORAGE_PROBE_INTERVAL_SEC = 3600
+
+[connections.postgresql]
+url = "sqlite:///{db}"
+"""
+
+
+@pytest.fixture(scope="session")
+def final_core(tmp_path_factory):
+    """tracker_final.core imported against a SQLite stand-in for Supabase and an unreachable storage URL.
+
+    Only code that sticks to SQL both databases accept can run against it (no migrations).
+    """
+    st = pytest.importorskip("streamlit")
+    pytest.importorskip("supabase")
+    home = tmp_path_factory.mktemp("final")
+    (home / ".streamlit").mkdir()
+    (home / ".streamlit" / "secrets.toml").write_text(FINAL_SECRETS.format(db=home / "tracker.db"))
+    cwd = os.getcwd()
+    os.chdir(home)
+    try:
+        st.secrets._reset()
+        return pytest.importorskip("tracker_final.core")
+    finally:
+        os.chdir(cwd)
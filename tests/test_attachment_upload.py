@@ -0,0 +1,144 @@
+"""The final build's attachment upload worker against the local storage backend."""
+import io
+import os
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+
+@pytest.fixture
+def core(final_core, tmp_path, monkeypatch):
+    """final_core with the local backend in a fresh store/spool and an empty requests table."""
+    with final_core.conn_db.session as s:
+        for ddl in (
+            "CREATE TABLE IF NOT EXISTS requests (id INTEGER PRIMARY KEY, mn_number TEXT, pdf_file_path TEXT, pdf_upload_status TEXT)",
+            "CREATE TABLE IF NOT EXISTS data_versions (table_name TEXT PRIMARY KEY, version INTEGER)",
+            """CREATE TABLE IF NOT EXISTS mn_documents (pdf_file_path TEXT PRIMARY KEY, page_count INTEGER,
+                   thumbnail BLOB, content TEXT, error TEXT, indexed_at TEXT)""",
+            "DELETE FROM requests",
+        ):
+            s.execute(final_core.text(ddl))
+        s.commit()
+    monkeypatch.setattr(final_core, "ATTACHMENT_STORAGE_BACKEND", "local")
+    monkeypatch.setattr(final_core, "ATTACHMENT_LOCAL_ROOT", str(tmp_path / "store"))
+    monkeypatch.setattr(final_core, "ATTACHMENT_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(final_core, "ATTACHMENT_RETRY_BASE_SEC", 0.05)
+    final_core.attachment_upload_worker()
+    yield final_core
+    _wait(lambda: final_core.pending_attachment_uploads() == 0)
+
+
+def _wait(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _pdf(content):
+    return io.BytesIO(b"%PDF-1.4\n" + content)
+
+
+def _insert_request(core, mn_number, path):
+    """What submit_mn_request() writes for an accepted MN with an attachment."""
+    core.execute_query("INSERT INTO requests (mn_number, pdf_file_path, pdf_upload_status) VALUES (:mn, :path, 'pending')",
+                       {"mn": mn_number, "path": path})
+
+
+def _status(core, mn_number):
+    with core.conn_db.session as s:
+        return s.execute(core.text("SELECT pdf_upload_status FROM requests WHERE mn_number = :mn"),
+                         {"mn": mn_number}).scalar()
+
+
+def _settled(core, mn_number):
+    _wait(lambda: _status(core, mn_number) != 'pending')
+    return _status(core, mn_number)
+
+
+def _stored(core, path):
+    return os.path.join(core.ATTACHMENT_LOCAL_ROOT, path)
+
+
+def test_accepted_attachment_is_uploaded_and_unspooled(core):
+    path = core.spool_attachment(_pdf(b"one"))
+    _insert_request(core, "MN/1", path)
+    core.enqueue_attachment_upload(path)
+
+    assert _settled(core, "MN/1") == 'complete'
+    with open(_stored(core, path), "rb") as f:
+        assert f.read() == b"%PDF-1.4\none"
+    _wait(lambda: not os.path.exists(core._spool_file(path)))
+
+
+def test_failed_upload_is_retried(core, monkeypatch):
+    real_upload = core.ATTACHMENT_BACKENDS["local"]["upload"]
+    calls = []
+
+    def flaky_upload(path, spool_file):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError("storage unavailable")
+        real_upload(path, spool_file)
+
+    monkeypatch.setitem(core.ATTACHMENT_BACKENDS["local"], "upload", flaky_upload)
+    path = core.spool_attachment(_pdf(b"two"))
+    _insert_request(core, "MN/2", path)
+    core.enqueue_attachment_upload(path)
+
+    assert _settled(core, "MN/2") == 'complete'
+    assert len(calls) == 2
+    assert os.path.exists(_stored(core, path))
+
+
+def test_upload_failing_every_attempt_is_marked_failed(core, monkeypatch):
+    def broken_upload(path, spool_file):
+        raise OSError("storage unavailable")
+
+    monkeypatch.setitem(core.ATTACHMENT_BACKENDS["local"], "upload", broken_upload)
+    monkeypatch.setattr(core, "ATTACHMENT_UPLOAD_MAX_ATTEMPTS", 2)
+    path = core.spool_attachment(_pdf(b"three"))
+    _insert_request(core, "MN/3", path)
+    core.enqueue_attachment_upload(path)
+
+    assert _settled(core, "MN/3") == 'failed'
+
+
+def test_rejected_submission_keeps_a_spool_file_another_one_holds(core):
+    # Two sessions submit the same PDF; the second is rejected before the first is queued
+    accepted = core.spool_attachment(_pdf(b"shared"))
+    rejected = core.spool_attachment(_pdf(b"shared"))
+    assert accepted == rejected
+    core.discard_spooled_attachment(rejected)
+    assert os.path.exists(core._spool_file(accepted))
+
+    _insert_request(core, "MN/4", accepted)
+    core.enqueue_attachment_upload(accepted)
+    assert _settled(core, "MN/4") == 'complete'
+    assert os.path.exists(_stored(core, accepted))
+
+
+def test_rejected_submission_alone_drops_the_spool_file(core):
+    path = core.spool_attachment(_pdf(b"rejected"))
+    core.discard_spooled_attachment(path)
+    assert not os.path.exists(core._spool_file(path))
+
+
+def test_missing_spool_file_completes_only_if_already_stored(core):
+    stored = core.spool_attachment(_pdf(b"stored"))
+    _insert_request(core, "MN/5", stored)
+    core.enqueue_attachment_upload(stored)
+    assert _settled(core, "MN/5") == 'complete'
+
+    # Spool files that vanished before their job ran: one of content already in storage
+    # (another job stored it), one of content that never got there
+    for content, mn_number in ((b"stored", "MN/6"), (b"lost", "MN/7")):
+        path = core.spool_attachment(_pdf(content))
+        os.remove(core._spool_file(path))
+        _insert_request(core, mn_number, path)
+        core.enqueue_attachment_upload(path)
+
+    assert _settled(core, "MN/6") == 'complete'
+    assert _settled(core, "MN/7") == 'failed'
@@ -0,0 +1,161 @@
+"""The final build's change feed listener, driven by a fake psycopg2 connection instead of Postgres."""
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+
+class _Notify:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class _Cursor:
+    def __init__(self, pg):
+        self.pg = pg
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.pg.executed.append(sql)
+
+
+class FakePg:
+    """Enough of a psycopg2 connection for the listener: select()-able, poll() fills notifies."""
+
+    def __init__(self):
+        self._read, self._write = os.pipe()
+        self._pending = queue.Queue()
+        self.notifies = []
+        self.executed = []
+        self.autocommit = True
+
+    def fileno(self):
+        return self._read
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def send(self, payload):
+        """Queues a notification (or an exception poll() raises) and wakes up select()."""
+        self._pending.put(payload)
+        os.write(self._write, b"x")
+
+    def poll(self):
+        os.read(self._read, 4096)
+        while not self._pending.empty():
+            item = self._pending.get()
+            if isinstance(item, Exception):
+                raise item
+            self.notifies.append(_Notify(item))
+
+    def close(self):
+        os.close(self._read)
+        os.close(self._write)
+
+
+class _FakeRecord:
+    def __init__(self, pg):
+        self.pg = pg
+
+    def close(self):
+        self.pg.close()
+
+
+@pytest.fixture(scope="module")
+def core(final_core):
+    return final_core
+
+
+@pytest.fixture(scope="module")
+def feed(core):
+    """The process's listener thread, connected to a FakePg; yields a list of connections it has opened."""
+    connections = []
+    opened = threading.Condition()
+
+    def open_fake():
+        pg = FakePg()
+        with opened:
+            connections.append(pg)
+            opened.notify_all()
+        return _FakeRecord(pg), pg
+
+    def wait_for(count):
+        with opened:
+            assert opened.wait_for(lambda: len(connections) >= count, timeout=10)
+        # LISTEN is the first thing sent on a new connection
+        _wait(lambda: connections[count - 1].executed)
+        return connections[count - 1]
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(core, "_open_change_feed_connection", open_fake)
+        core.change_feed_listener()
+        wait_for(1)
+        yield wait_for
+
+
+def _wait(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _seq(core):
+    return core._change_feed_state()['seq']
+
+
+def test_listener_subscribes_to_the_channel(core, feed):
+    pg = feed(1)
+    assert pg.executed[0] == f"LISTEN {core.CHANGE_FEED_CHANNEL}"
+    assert core.get_change_feed_status()['listening'] is True
+
+
+def test_writer_is_not_told_about_its_own_change(core, feed):
+    pg = feed(1)
+    seen = _seq(core)
+    pg.send("requests|sessA")
+    _wait(lambda: _seq(core) > seen)
+
+    assert "requests" not in core.changes_since(seen, "sessA")
+    assert "requests" in core.changes_since(seen, "sessB")
+
+
+def test_others_still_see_a_change_followed_by_the_sessions_own(core, feed):
+    pg = feed(1)
+    seen = _seq(core)
+    pg.send("budget_heads|sessB")
+    pg.send("budget_heads|sessA")
+    pg.send("budget_heads|sessA")
+    _wait(lambda: _seq(core) >= seen + 3)
+
+    assert "budget_heads" in core.changes_since(seen, "sessA")
+    assert "budget_heads" in core.changes_since(seen, "sessB")
+    assert "budget_heads" not in core.changes_since(_seq(core) - 2, "sessA")
+
+
+def test_payload_without_a_session_reaches_everyone(core, feed):
+    pg = feed(1)
+    seen = _seq(core)
+    pg.send("messages")
+    _wait(lambda: _seq(core) > seen)
+
+    assert "messages" in core.changes_since(seen, "sessA")
+
+
+def test_reconnect_marks_every_table_changed(core, feed):
+    pg = feed(1)
+    seen = _seq(core)
+    pg.send(OSError("server closed the connection unexpectedly"))
+
+    feed(2) # reopened after a one second backoff
+    _wait(lambda: _seq(core) >= seen + len(core.CHANGE_FEED_TABLES))
+    assert core.changes_since(seen, "sessA") == set(core.CHANGE_FEED_TABLES)
@@ -0,0 +1,55 @@
+"""Keyset pagination of the request list (offline build), including requests without a date_logged."""
+import pytest
+
+pytest.importorskip("streamlit")
+core = pytest.importorskip("tracker_offlinedb.core")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A migrated offline database, used by this thread's connection for the test."""
+    monkeypatch.setattr(core, "DB_FILE", str(tmp_path / "tracker.db"))
+    conn = core._open_connection()
+    core._thread_conn.conn = conn
+    core.init_db()
+    yield conn
+    core._thread_conn.conn = None
+    conn.close()
+
+
+def _add_requests(conn, rows):
+    conn.executemany("INSERT INTO requests (mn_number, date_logged, status) VALUES (?, ?, ?)", rows)
+    conn.commit()
+
+
+def _all_pages(filters, version, limit):
+    """Pages the way view_requests does: the cursor is the last row's (date_logged, id)."""
+    seen, after = [], None
+    while True:
+        page = core.load_requests_page(filters, after, version, limit=limit)
+        seen += page['mn_number'].tolist()
+        if len(page) < limit:
+            return seen
+        last_row = page.iloc[-1]
+        after = (last_row['date_logged'], int(last_row['id']))
+
+
+def test_undated_requests_are_paged_after_the_dated_ones(store):
+    _add_requests(store, [
+        ("MN/1", "2026-01-05", "Pending"),
+        ("MN/2", None, "Pending"),
+        ("MN/3", "2026-02-01", "Pending"),
+        ("MN/4", None, "Pending"),
+        ("MN/5", "2026-01-05", "Pending"),
+        ("MN/6", None, "Pending"),
+    ])
+
+    assert _all_pages((), ("undated", 1), limit=2) == ["MN/3", "MN/5", "MN/1", "MN/6", "MN/4", "MN/2"]
+    assert core.count_requests((), ("undated", 1)) == 6
+
+
+def test_page_ending_on_an_undated_request_continues(store):
+    # All-NULL pages come back from pandas with NaN in date_logged
+    _add_requests(store, [(f"MN/{n}", None, "Pending") for n in range(5)])
+
+    assert _all_pages((('status', ('Pending',)),), ("all-undated", 1), limit=2) == [f"MN/{n}" for n in range(4, -1, -1)]
@@ -0,0 +1,78 @@
+"""get_signed_urls() caching and batching, signed by the local storage backend."""
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+
+@pytest.fixture
+def core(final_core, tmp_path, monkeypatch):
+    """final_core on the local backend with five stored attachments and an empty URL cache."""
+    monkeypatch.setattr(final_core, "ATTACHMENT_STORAGE_BACKEND", "local")
+    monkeypatch.setattr(final_core, "ATTACHMENT_LOCAL_ROOT", str(tmp_path))
+    (tmp_path / "mn_attachments").mkdir()
+    for n in range(5):
+        (tmp_path / "mn_attachments" / f"{n}.pdf").write_bytes(b"%PDF-1.4\n")
+    final_core._signed_url_cache()["urls"].clear()
+    yield final_core
+    final_core._signed_url_cache()["urls"].clear()
+
+
+@pytest.fixture
+def sign_calls(core, monkeypatch):
+    """The paths of every sign() call, one list per storage call."""
+    calls = []
+
+    def recording_sign(paths, expires_in):
+        calls.append(list(paths))
+        return core._sign_local(paths, expires_in)
+
+    monkeypatch.setitem(core.ATTACHMENT_BACKENDS["local"], "sign", recording_sign)
+    return calls
+
+
+def _paths(*numbers):
+    return [f"mn_attachments/{n}.pdf" for n in numbers]
+
+
+def test_local_urls_point_at_the_stored_file_and_carry_the_expiry(core):
+    before = time.time()
+    url = core.get_signed_urls(_paths(0))[_paths(0)[0]]
+
+    file_url, _, expires = url.partition("?expires=")
+    assert file_url.startswith("file://") and file_url.endswith("mn_attachments/0.pdf")
+    assert before + core.SIGNED_URL_TTL_SEC - 1 <= int(expires) <= time.time() + core.SIGNED_URL_TTL_SEC
+
+
+def test_cached_url_is_reused_until_the_expiry_margin(core, sign_calls, monkeypatch):
+    monkeypatch.setattr(core, "SIGNED_URL_TTL_SEC", 0.6)
+    monkeypatch.setattr(core, "SIGNED_URL_MIN_REMAINING_SEC", 0.3)
+    first = core.get_signed_urls(_paths(0))
+
+    assert core.get_signed_urls(_paths(0)) == first
+    assert sign_calls == [_paths(0)]
+
+    # Still valid for a little while, but too close to expiry to hand out again
+    time.sleep(0.35)
+    core.get_signed_urls(_paths(0))
+    assert sign_calls == [_paths(0), _paths(0)]
+
+
+def test_batch_signs_only_the_uncached_paths(core, sign_calls, monkeypatch):
+    monkeypatch.setattr(core, "SIGNED_URL_BATCH_SIZE", 2)
+    core.get_signed_urls(_paths(0, 1))
+    assert sign_calls == [_paths(0, 1)]
+
+    urls = core.get_signed_urls(_paths(0, 1, 2, 3, 4))
+    assert set(urls) == set(_paths(0, 1, 2, 3, 4))
+    # The three misses, in batches of SIGNED_URL_BATCH_SIZE
+    assert sign_calls[1:] == [_paths(2, 3), _paths(4)]
+
+
+def test_paths_the_backend_cannot_sign_are_left_out_and_retried(core, sign_calls):
+    urls = core.get_signed_urls(_paths(0, 9))
+    assert set(urls) == set(_paths(0))
+
+    core.get_signed_urls(_paths(0, 9))
+    assert sign_calls == [_paths(0, 9), _paths(9)]
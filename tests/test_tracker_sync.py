@@ -0,0 +1,196 @@
+"""tracker_sync.py against two offline-build SQLite stores (the documented stand-in for Supabase)."""
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+core = pytest.importorskip("tracker_offlinedb.core")
+import tracker_sync
+
+
+def _make_store(path, monkeypatch):
+    """A migrated offline database at `path`; returns (SQLAlchemy URL, autocommit sqlite3 connection)."""
+    monkeypatch.setattr(core, "DB_FILE", str(path))
+    conn = core._open_connection()
+    core._thread_conn.conn = conn
+    try:
+        core.init_db()
+    finally:
+        core._thread_conn.conn = None
+        conn.close()
+    return f"sqlite:///{path}", sqlite3.connect(str(path), isolation_level=None)
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    local_url, local = _make_store(tmp_path / "local.db", monkeypatch)
+    remote_url, remote = _make_store(tmp_path / "remote.db", monkeypatch)
+    yield local_url, local, remote_url, remote
+    local.close()
+    remote.close()
+
+
+def _site(db):
+    return db.execute("SELECT site_id FROM sync_site WHERE id = 1").fetchone()[0]
+
+
+def _add_request(db, mn_number, status="Pending", cost=100.0):
+    db.execute("INSERT INTO requests (mn_number, cost_area, landed_total_cost, status) VALUES (?, 'Area 1', ?, ?)",
+               (mn_number, cost, status))
+
+
+def _requests(db):
+    return sorted(db.execute("SELECT sync_key, mn_number, status, updated_at, origin FROM requests").fetchall())
+
+
+def _sync(local_url, remote_url, **kwargs):
+    return tracker_sync.sync_stores(local_url, remote_url, tables=['requests'], **kwargs)['tables']['requests']
+
+
+def test_changes_flow_both_ways(stores):
+    local_url, local, remote_url, remote = stores
+    _add_request(local, "MN/L/1")
+    _add_request(remote, "MN/R/1")
+
+    report = _sync(local_url, remote_url)
+
+    assert report['push']['inserted'] == 1
+    assert report['pull']['inserted'] == 1
+    assert _requests(local) == _requests(remote)
+    assert {row[1] for row in _requests(local)} == {"MN/L/1", "MN/R/1"}
+
+
+def test_own_changes_coming_back_are_echoes(stores):
+    local_url, local, remote_url, remote = stores
+    _add_request(local, "MN/L/1")
+    _sync(local_url, remote_url)
+
+    # The remote re-stamped the row on apply (new row_version), but its origin is still local
+    report = _sync(local_url, remote_url)
+    assert report['pull'] == {"scanned": 0, "inserted": 0, "updated": 0, "kept_local": 0, "conflicts": 0, "echoes": 0}
+
+    local.execute("UPDATE requests SET status = 'Completed' WHERE mn_number = 'MN/L/1'")
+    report = _sync(local_url, remote_url)
+    assert report['push']['updated'] == 1
+    assert report['pull']['echoes'] == 1
+    assert report['pull']['updated'] == 0
+    assert _requests(local) == _requests(remote)
+
+
+def test_mn_number_edit_updates_the_same_request(stores):
+    local_url, local, remote_url, remote = stores
+    _add_request(local, "MN/L/1")
+    _sync(local_url, remote_url)
+
+    local.execute("UPDATE requests SET mn_number = 'MN/L/1-A' WHERE mn_number = 'MN/L/1'")
+    report = _sync(local_url, remote_url)
+
+    assert report['push']['updated'] == 1
+    assert [row[1] for row in _requests(remote)] == ["MN/L/1-A"]
+
+
+def test_same_mn_number_entered_in_both_stores_merges(stores):
+    local_url, local, remote_url, remote = stores
+    _add_request(local, "MN/X/1", status="Rejected")
+    time.sleep(0.01) # updated_at has millisecond precision
+    _add_request(remote, "MN/X/1", status="Completed")
+    _add_request(local, "MN/L/2")
+
+    report = _sync(local_url, remote_url)
+
+    # The remote copy is newer: it keeps its row, and the local one takes it over, sync_key included
+    assert report['push'] == {"scanned": 2, "inserted": 1, "updated": 0, "kept_local": 1, "conflicts": 0, "echoes": 0}
+    assert report['pull']['updated'] == 1
+    assert _requests(local) == _requests(remote)
+    assert {row[1]: row[2] for row in _requests(local)} == {"MN/X/1": "Completed", "MN/L/2": "Pending"}
+
+    # Later MNs still cross over, and the merged request syncs as one
+    _add_request(remote, "MN/R/3")
+    remote.execute("UPDATE requests SET status = 'Approved by AD' WHERE mn_number = 'MN/X/1'")
+    report = _sync(local_url, remote_url)
+    assert report['pull']['inserted'] == 1
+    assert report['pull']['updated'] == 1
+    assert _requests(local) == _requests(remote)
+
+
+def test_rename_onto_a_taken_mn_number_is_recorded_and_skipped(stores):
+    local_url, local, remote_url, remote = stores
+    _add_request(local, "MN/L/1")
+    _sync(local_url, remote_url)
+
+    _add_request(remote, "MN/R/9")
+    local.execute("UPDATE requests SET mn_number = 'MN/R/9' WHERE mn_number = 'MN/L/1'")
+    _add_request(local, "MN/L/2")
+    report = _sync(local_url, remote_url)
+
+    # Neither side's MN/R/9 is merged into the other: they are different requests
+    assert report['push']['conflicts'] == 1
+    assert report['push']['inserted'] == 1
+    assert report['pull']['conflicts'] == 1
+    sync_key, detail = remote.execute("SELECT row_key, detail FROM sync_conflicts").fetchone()
+    assert sync_key == local.execute("SELECT sync_key FROM requests WHERE mn_number = 'MN/R/9'").fetchone()[0]
+    assert '"MN/R/9"' in detail
+    assert local.execute("SELECT COUNT(*) FROM sync_conflicts").fetchone()[0] == 1
+    # The watermarks moved past them: the next run is clean
+    report = _sync(local_url, remote_url)
+    assert report['push']['scanned'] == 0
+    assert report['pull']['scanned'] == 0
+
+
+def test_last_writer_wins_and_origin_breaks_ties(stores):
+    local_url, local, remote_url, remote = stores
+    _add_request(local, "MN/L/1")
+    _sync(local_url, remote_url)
+
+    # Concurrent edits: the later updated_at wins in both stores
+    local.execute("UPDATE requests SET status = 'Rejected' WHERE mn_number = 'MN/L/1'")
+    time.sleep(0.01) # updated_at has millisecond precision
+    remote.execute("UPDATE requests SET status = 'Completed' WHERE mn_number = 'MN/L/1'")
+    _sync(local_url, remote_url)
+    assert _requests(local) == _requests(remote)
+    assert _requests(local)[0][2] == "Completed"
+
+    # Same updated_at on both sides: the greater origin site id wins
+    for db, status in ((local, "Approved by AD"), (remote, "Approved by SRPM")):
+        db.execute("UPDATE sync_site SET applying = 1 WHERE id = 1")
+        db.execute("UPDATE requests SET status = ?, updated_at = '2030-01-01T00:00:00.000Z', origin = ? "
+                   "WHERE mn_number = 'MN/L/1'", (status, _site(db)))
+        db.execute("UPDATE sync_site SET applying = 0 WHERE id = 1")
+    winner = "Approved by AD" if _site(local) > _site(remote) else "Approved by SRPM"
+
+    _sync(local_url, remote_url)
+    assert _requests(local) == _requests(remote)
+    assert _requests(local)[0][2] == winner
+
+
+def test_interrupted_run_resumes_from_the_last_applied_batch(stores, monkeypatch):
+    local_url, local, remote_url, remote = stores
+    for n in range(5):
+        _add_request(local, f"MN/L/{n}")
+
+    real_apply = tracker_sync._apply_batch
+    calls = []
+
+    def failing_apply(conn, table, key, columns, rows, source):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return real_apply(conn, table, key, columns, rows, source)
+
+    monkeypatch.setattr(tracker_sync, "_apply_batch", failing_apply)
+    with pytest.raises(RuntimeError):
+        _sync(local_url, remote_url, batch_size=2)
+
+    # The first batch committed with its watermark; the failed one rolled back entirely
+    assert remote.execute("SELECT COUNT(*) FROM requests").fetchone()[0] == 2
+    last_xid, last_version = remote.execute(
+        "SELECT last_xid, last_version FROM sync_state WHERE peer_site_id = ? AND table_name = 'requests'",
+        (_site(local),)).fetchone()
+    assert (last_xid, last_version) == (0, 2)
+
+    monkeypatch.setattr(tracker_sync, "_apply_batch", real_apply)
+    report = _sync(local_url, remote_url, batch_size=2)
+    assert report['push']['scanned'] == 3
+    assert report['push']['inserted'] == 3
+    assert _requests(local) == _requests(remote)
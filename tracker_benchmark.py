@@ -0,0 +1,477 @@
+"""Synthetic-load benchmark for the tracker's data paths.
+
+Generates realistic budget heads, requests (every workflow status), LC/PO entries, indents,
+bills and event log rows with Faker at several scales, then times the queries and pandas
+transforms the pages actually run. The SQL below mirrors tracker_final/ and tracker_offlinedb/
+(core.py and pages/); keep it in step when a page query changes.
+
+Usage:
+    python tracker_benchmark.py                               # SQLite, 1k/10k/100k requests
+    python tracker_benchmark.py --scales 1000 10000 --pg-url postgresql+psycopg2://user:pw@localhost/bench
+    python tracker_benchmark.py --output bench.json --compare previous_bench.json
+
+The Postgres run works in its own `tracker_bench` schema and drops it afterwards.
+Results are JSON (per backend/scale/case: runs, min/median/p95 ms, rows) so two versions
+can be diffed; --compare prints the cases that got slower than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from faker import Faker
+from sqlalchemy import bindparam, create_engine, event, text
+
+WORKFLOW_STATUSES = ["Pending", "Approved by SRPM", "Approved by AD", "Finance Approved", "Rejected", "PO Issued", "Completed"]
+# Rough shape of a live year: most MNs finish, a few are stuck early or rejected
+STATUS_WEIGHTS = [12, 6, 6, 10, 6, 20, 40]
+MN_CATEGORIES = ["R&M (Repair & Maintenance)", "C&C (Chemicals & Consumables)"]
+CURRENCIES = ["BDT", "USD", "EUR", "GBP", "INR"]
+DEFAULT_SCALES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 7
+BENCH_SCHEMA = "tracker_bench"
+
+# Same tables as init_db() in both builds (types that differ per dialect are substituted)
+SCHEMA = [
+    """CREATE TABLE budget_heads (id {pk}, department TEXT, cost_area TEXT UNIQUE, total_budget REAL)""",
+    """CREATE TABLE requests (
+        id {pk}, mn_number TEXT UNIQUE, mn_issue_date TEXT, date_logged TEXT, requester TEXT, cost_area TEXT,
+        estimated_cost REAL, status TEXT DEFAULT 'Pending', mn_particulars TEXT, mn_category TEXT, department TEXT,
+        location TEXT, supplier_vendor TEXT, supplier_type TEXT, currency TEXT, foreign_spare_cost REAL,
+        freight_fca_charges REAL, customs_duty_rate REAL, local_cost_wo_vat_ait REAL, vat_ait REAL,
+        landed_total_cost REAL, date_sent_ho TEXT, plant_remarks TEXT)""",
+    """CREATE TABLE lc_po_tracker (
+        mn_number TEXT PRIMARY KEY, lc_po_nr TEXT, lc_po_date TEXT, eta_shipment_delivery TEXT,
+        delivery_completed TEXT, date_of_delivery TEXT, commercial_store_remarks TEXT, delay_days INTEGER,
+        bill_submitted_vendor TEXT, bill_tracking_id TEXT, date_bill_submit_acc TEXT, date_bill_submit_ho TEXT,
+        bill_paid TEXT, actual_lc_costing REAL)""",
+    """CREATE TABLE standalone_indents (
+        indent_id {pk}, indent_number TEXT, item_description TEXT, quantity REAL, unit TEXT, rate REAL,
+        total_amount REAL, indent_date TEXT, supplier TEXT, status TEXT DEFAULT 'Not Purchased')""",
+    """CREATE TABLE indent_purchase_record (
+        bill_no TEXT PRIMARY KEY, indent_no TEXT, grn_no TEXT, supplier TEXT, bill_date TEXT,
+        payment_mode TEXT, total_bill_amount REAL, remarks TEXT)""",
+    """CREATE TABLE indent_goods_details (
+        id {pk}, bill_no TEXT, description TEXT, quantity REAL, unit TEXT, rate REAL, amount REAL)""",
+    """CREATE TABLE event_log (id {pk}, timestamp TEXT, username TEXT, action_type TEXT, description TEXT)""",
+]
+# Schema migration 2 of the apps, with the request list index that replaced one of them
+# (migration 15 of the Supabase build, 9 of the offline build)
+INDEXES = [
+    "CREATE INDEX idx_requests_status ON requests (status)",
+    "CREATE INDEX idx_requests_cost_area_status ON requests (cost_area, status, landed_total_cost)",
+    "CREATE INDEX idx_requests_date_logged_key_id ON requests ((COALESCE(date_logged, '')) DESC, id DESC)",
+    "CREATE INDEX idx_standalone_indents_status_number ON standalone_indents (status, indent_number)",
+    "CREATE INDEX idx_indent_goods_details_bill_no ON indent_goods_details (bill_no)",
+    "CREATE INDEX idx_event_log_timestamp ON event_log (timestamp DESC)",
+]
+PG_ONLY_INDEXES = ["CREATE INDEX idx_requests_mn_number_prefix ON requests (mn_number text_pattern_ops)"]
+
+
+# --- DATA GENERATION ---
+def generate_dataset(n_requests, seed=2026):
+    """Returns {table_name: DataFrame} for one scale. Deterministic for a given seed."""
+    fake = Faker()
+    Faker.seed(seed)
+    rng = random.Random(seed)
+    start = date(2026, 1, 1)
+
+    n_heads = max(20, n_requests // 50)
+    departments = [fake.unique.job().split(',')[0][:30] for _ in range(max(5, n_heads // 8))]
+    budget_heads = pd.DataFrame({
+        "department": [rng.choice(departments) for _ in range(n_heads)],
+        "cost_area": [f"{fake.city()} {i}" for i in range(n_heads)],
+        "total_budget": [round(rng.uniform(5e5, 5e7), 2) for _ in range(n_heads)],
+    })
+
+    plants = ["DHK", "CTG", "KHL", "SYL", "RAJ"]
+    areas = budget_heads['cost_area'].tolist()
+    requesters = [fake.name() for _ in range(200)]
+    vendors = [fake.company() for _ in range(500)]
+    rows = []
+    for i in range(n_requests):
+        issued = start + timedelta(days=rng.randrange(365))
+        supplier_type = rng.choice(["Local", "Foreign"])
+        spare, freight = round(rng.uniform(100, 50000), 2), round(rng.uniform(0, 5000), 2)
+        landed = round((spare + freight) * rng.uniform(90, 130), 2)
+        rows.append({
+            "mn_number": f"{plants[i % len(plants)]}/{i // len(plants):03d}/2026",
+            "mn_issue_date": issued.isoformat(),
+            "date_logged": (issued + timedelta(days=rng.randrange(10))).isoformat(),
+            "requester": rng.choice(requesters),
+            "cost_area": rng.choice(areas),
+            "estimated_cost": landed,
+            "status": rng.choices(WORKFLOW_STATUSES, STATUS_WEIGHTS)[0],
+            "mn_particulars": fake.sentence(nb_words=12),
+            "mn_category": rng.choice(MN_CATEGORIES),
+            "department": rng.choice(departments),
+            "location": fake.street_name(),
+            "supplier_vendor": rng.choice(vendors),
+            "supplier_type": supplier_type,
+            "currency": "BDT" if supplier_type == "Local" else rng.choice(CURRENCIES[1:]),
+            "foreign_spare_cost": spare,
+            "freight_fca_charges": freight,
+            "customs_duty_rate": 0.05,
+            "local_cost_wo_vat_ait": round(landed * 0.9, 2),
+            "vat_ait": round(landed * 0.1, 2),
+            "landed_total_cost": landed,
+            "date_sent_ho": (issued + timedelta(days=rng.randrange(20))).isoformat(),
+            "plant_remarks": fake.sentence(nb_words=6),
+        })
+    requests = pd.DataFrame(rows)
+
+    ordered = requests[requests['status'].isin(["PO Issued", "Completed"])]
+    lc_po_tracker = pd.DataFrame({
+        "mn_number": ordered['mn_number'].values,
+        "lc_po_nr": [f"PO-{rng.randrange(10**6):06d}" for _ in range(len(ordered))],
+        "lc_po_date": ordered['date_logged'].values,
+        "eta_shipment_delivery": ordered['date_sent_ho'].values,
+        "delivery_completed": [rng.choice(["Yes", "No"]) for _ in range(len(ordered))],
+        "date_of_delivery": ordered['date_sent_ho'].values,
+        "commercial_store_remarks": [fake.sentence(nb_words=5) for _ in range(len(ordered))],
+        "delay_days": [rng.randrange(0, 60) for _ in range(len(ordered))],
+        "bill_submitted_vendor": [rng.choice(["Yes", "No"]) for _ in range(len(ordered))],
+        "bill_tracking_id": [fake.bothify("BT-####-??") for _ in range(len(ordered))],
+        "date_bill_submit_acc": ordered['date_sent_ho'].values,
+        "date_bill_submit_ho": ordered['date_sent_ho'].values,
+        "bill_paid": [rng.choice(["Yes", "No"]) for _ in range(len(ordered))],
+        "actual_lc_costing": ordered['landed_total_cost'].values,
+    })
+
+    n_indents = max(100, n_requests // 2)
+    units = ["pcs", "kg", "ltr", "set", "m"]
+    indents = pd.DataFrame({
+        "indent_number": [f"IND-{i // 4:05d}" for i in range(n_indents)],
+        "item_description": [fake.catch_phrase() for _ in range(n_indents)],
+        "quantity": [float(rng.randrange(1, 50)) for _ in range(n_indents)],
+        "unit": [rng.choice(units) for _ in range(n_indents)],
+        "rate": [round(rng.uniform(10, 5000), 2) for _ in range(n_indents)],
+        "indent_date": [(start + timedelta(days=rng.randrange(365))).isoformat() for _ in range(n_indents)],
+        "supplier": [rng.choice(vendors) for _ in range(n_indents)],
+    })
+    indents['total_amount'] = indents['quantity'] * indents['rate']
+    # Roughly a third of the registry has been billed, in bills of up to 8 lines
+    billed = indents.sample(frac=0.33, random_state=seed).sort_index()
+    indents['status'] = 'Not Purchased'
+    indents.loc[billed.index, 'status'] = 'Purchased'
+    bill_numbers = [f"BILL-{i // 8:06d}" for i in range(len(billed))]
+    goods = pd.DataFrame({
+        "bill_no": bill_numbers,
+        "description": billed['item_description'].values,
+        "quantity": billed['quantity'].values,
+        "unit": billed['unit'].values,
+        "rate": billed['rate'].values,
+        "amount": billed['total_amount'].values,
+    })
+    bill_headers = goods.groupby('bill_no', as_index=False)['amount'].sum().rename(columns={'amount': 'total_bill_amount'})
+    bill_headers['indent_no'] = billed.groupby(bill_numbers)['indent_number'].agg(lambda s: ", ".join(sorted(set(s)))).values
+    bill_headers['grn_no'] = [fake.bothify("GRN-#####") for _ in range(len(bill_headers))]
+    bill_headers['supplier'] = [rng.choice(vendors) for _ in range(len(bill_headers))]
+    bill_headers['bill_date'] = [(start + timedelta(days=rng.randrange(365))).isoformat() for _ in range(len(bill_headers))]
+    bill_headers['payment_mode'] = [rng.choice(["Cash", "Bank Transfer", "Cheque", "Credit"]) for _ in range(len(bill_headers))]
+    bill_headers['remarks'] = ""
+
+    actions = ["MN_SUBMISSION", "MN_STATUS_CHANGE", "LC_PO_UPDATE", "BUDGET_UPDATE", "CONFIG_UPDATE", "USER_CREATE"]
+    event_log = pd.DataFrame({
+        "timestamp": [(datetime(2026, 1, 1) + timedelta(seconds=rng.randrange(365 * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+                      for _ in range(n_requests)],
+        "username": [rng.choice(requesters) for _ in range(n_requests)],
+        "action_type": [rng.choice(actions) for _ in range(n_requests)],
+        "description": [fake.sentence(nb_words=10) for _ in range(n_requests)],
+    })
+
+    return {
+        "budget_heads": budget_heads,
+        "requests": requests,
+        "lc_po_tracker": lc_po_tracker,
+        "standalone_indents": indents,
+        "indent_purchase_record": bill_headers,
+        "indent_goods_details": goods,
+        "event_log": event_log,
+    }
+
+
+# --- BACKENDS ---
+def sqlite_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _record):
+        # Same pragmas as the offline build's connection manager
+        for pragma in ("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL", "PRAGMA cache_size = -20000",
+                       "PRAGMA mmap_size = 268435456", "PRAGMA temp_store = MEMORY"):
+            dbapi_conn.execute(pragma)
+    return engine
+
+
+def postgres_engine(url):
+    admin = create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    admin.dispose()
+    return create_engine(url, connect_args={"options": f"-csearch_path={BENCH_SCHEMA}"})
+
+
+def drop_postgres_schema(url):
+    admin = create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+    admin.dispose()
+
+
+def load_dataset(engine, dataset):
+    pg = engine.dialect.name == "postgresql"
+    pk = "SERIAL PRIMARY KEY" if pg else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    with engine.begin() as conn:
+        for table in reversed(list(dataset)):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        for ddl in SCHEMA:
+            conn.execute(text(ddl.format(pk=pk)))
+        for table, df in dataset.items():
+            conn.execute(text(f"INSERT INTO {table} ({', '.join(df.columns)}) VALUES ({', '.join(':' + c for c in df.columns)})"),
+                         df.to_dict('records'))
+        for ddl in INDEXES + (PG_ONLY_INDEXES if pg else []):
+            conn.execute(text(ddl))
+        conn.execute(text("ANALYZE"))
+
+
+# --- CASES (mirror the pages) ---
+def read(conn, sql, params=None):
+    return pd.read_sql(sql, conn, params=params)
+
+
+BUDGET_STATUS_SQL = text("""
+    SELECT b.id, b.department, b.cost_area, b.total_budget,
+           COALESCE(s.utilized, 0) AS utilized,
+           COALESCE(s.approved, 0) AS approved
+    FROM budget_heads b
+    LEFT JOIN (
+        SELECT cost_area,
+               SUM(CASE WHEN COALESCE(status, '') <> 'Rejected' THEN landed_total_cost ELSE 0 END) AS utilized,
+               SUM(CASE WHEN status IN ('Finance Approved', 'PO Issued', 'Completed') THEN landed_total_cost ELSE 0 END) AS approved
+        FROM requests
+        GROUP BY cost_area
+    ) s ON s.cost_area = b.cost_area
+    ORDER BY b.id
+""")
+
+
+def case_calculate_status(conn, _ctx):
+    """_compute_budget_status() + _with_balance_columns()"""
+    merged = read(conn, BUDGET_STATUS_SQL)
+    merged.rename(columns={'utilized': 'Total Utilized Cost', 'approved': 'MN_approved'}, inplace=True)
+    for col in ['total_budget', 'Total Utilized Cost', 'MN_approved']:
+        merged[col] = pd.to_numeric(merged[col], errors='coerce').fillna(0)
+    merged['Remaining Balance'] = merged['total_budget'] - merged['Total Utilized Cost']
+    merged['Utilization %'] = (
+        merged['Total Utilized Cost'] / merged['total_budget'].where(merged['total_budget'] > 0) * 100
+    ).fillna(0)
+    return merged
+
+
+def case_balance_sheet(conn, ctx):
+    """Budget Balance Sheet: status summary + departmental subtotal table"""
+    df_status = case_calculate_status(conn, ctx)
+    status_raw = read(conn, "SELECT status, mn_number FROM requests")
+    status_raw['status'].value_counts().reset_index()
+
+    df_status = df_status.rename(columns={
+        'total_budget': 'Total Budget', 'Total Utilized Cost': 'MN_issued', 'Remaining Balance': 'Remaining Budget'
+    })
+    df_display = df_status[['department', 'cost_area', 'Total Budget', 'MN_issued', 'MN_approved', 'Remaining Budget']].copy()
+    val_cols = ['Total Budget', 'MN_issued', 'MN_approved', 'Remaining Budget']
+    df_subtotal = df_display.groupby('department', as_index=False)[val_cols].sum()
+    df_subtotal['cost_area'] = '--- SUBTOTAL ---'
+    final_df = pd.concat([df_display, df_subtotal], ignore_index=True)
+    return final_df.sort_values(by=['department', 'cost_area'], ascending=[True, True])
+
+
+def _filter_where(filters, after=None):
+    conditions, params, binds = [], {}, []
+    for column, values in filters:
+        conditions.append(f"{column} IN :{column}")
+        params[column] = list(values)
+        binds.append(bindparam(column, expanding=True))
+    if after is not None:
+        conditions.append("COALESCE(date_logged, '') <= :after_date AND (COALESCE(date_logged, ''), id) < (:after_date, :after_id)")
+        params.update(after_date=after[0] if isinstance(after[0], str) else '', after_id=after[1])
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params, binds
+
+
+def case_request_filters(conn, ctx):
+    """View & Filter Requests: filter options, count, first page, next page (keyset)"""
+    for column in ['status', 'mn_category', 'cost_area', 'supplier_type']:
+        read(conn, f"SELECT DISTINCT {column} FROM requests WHERE {column} IS NOT NULL ORDER BY {column}")
+    filters = (('status', ("Pending", "Finance Approved")), ('cost_area', tuple(ctx['areas'][:5])))
+    where, params, binds = _filter_where(filters)
+    conn.execute(text(f"SELECT COUNT(*) AS count FROM requests {where}").bindparams(*binds), params).scalar()
+    page = read(conn, text(f"SELECT * FROM requests {where} ORDER BY COALESCE(date_logged, '') DESC, id DESC LIMIT :limit").bindparams(*binds),
+                {**params, "limit": 50})
+    if not page.empty:
+        last = page.iloc[-1]
+        where, params, binds = _filter_where(filters, (last['date_logged'], int(last['id'])))
+        page = read(conn, text(f"SELECT * FROM requests {where} ORDER BY COALESCE(date_logged, '') DESC, id DESC LIMIT :limit").bindparams(*binds),
+                    {**params, "limit": 50})
+    return page
+
+
+def case_admin_picker(conn, ctx):
+    """Admin typeahead: MN number prefix search"""
+    op = "LIKE" if conn.dialect.name == "postgresql" else "GLOB"
+    pattern = "CTG/01%" if op == "LIKE" else "CTG/01*"
+    return read(conn, text(f"""SELECT id, mn_number, status, cost_area, landed_total_cost FROM requests
+                               WHERE mn_number {op} :pattern ORDER BY COALESCE(date_logged, '') DESC, id DESC LIMIT 25"""),
+                {"pattern": pattern})
+
+
+def case_lc_po_join(conn, _ctx):
+    """LC/PO & Payment Tracker: tracking table join"""
+    return read(conn, """
+        SELECT r.mn_number, r.mn_particulars, r.cost_area, r.supplier_vendor, r.supplier_type, r.status,
+               t.lc_po_nr, t.lc_po_date, t.eta_shipment_delivery, t.delivery_completed, t.date_of_delivery,
+               t.delay_days, t.bill_tracking_id, t.bill_paid
+        FROM requests r
+        INNER JOIN lc_po_tracker t ON r.mn_number = t.mn_number
+    """)
+
+
+def case_bills_join(conn, _ctx):
+    """Indent & Purchase Record: saved bills view"""
+    return read(conn, """
+        SELECT r.bill_no, r.bill_date, r.supplier, r.total_bill_amount,
+               d.description, d.quantity, d.unit, d.rate, d.amount as item_amount,
+               r.indent_no, r.grn_no, r.payment_mode, r.remarks
+        FROM indent_purchase_record r
+        JOIN indent_goods_details d ON r.bill_no = d.bill_no
+        ORDER BY r.bill_date DESC
+    """)
+
+
+CASES = {
+    "calculate_status": case_calculate_status,
+    "balance_sheet_subtotals": case_balance_sheet,
+    "request_filters": case_request_filters,
+    "admin_picker": case_admin_picker,
+    "lc_po_join": case_lc_po_join,
+    "bills_join": case_bills_join,
+}
+
+
+def time_case(engine, fn, ctx, repeat):
+    timings, rows = [], 0
+    with engine.connect() as conn:
+        fn(conn, ctx) # warm-up: page cache, plan cache
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn(conn, ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+            rows = len(result)
+    timings.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))], 3),
+        "rows": rows,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(scales, pg_url=None, repeat=DEFAULT_REPEAT, cases=None, seed=2026):
+    report = {
+        "meta": {
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": [],
+    }
+    selected = {name: fn for name, fn in CASES.items() if not cases or name in cases}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            dataset = generate_dataset(scale, seed)
+            ctx = {"areas": dataset['budget_heads']['cost_area'].tolist()}
+            backends = [("sqlite", lambda: sqlite_engine(os.path.join(tmp, f"bench_{scale}.db")))]
+            if pg_url:
+                backends.append(("postgresql", lambda: postgres_engine(pg_url)))
+            for backend, make_engine in backends:
+                engine = make_engine()
+                started = time.perf_counter()
+                load_dataset(engine, dataset)
+                load_ms = (time.perf_counter() - started) * 1000
+                print(f"[{backend} {scale:>7,}] loaded in {load_ms / 1000:.1f}s", file=sys.stderr)
+                for name, fn in selected.items():
+                    result = time_case(engine, fn, ctx, repeat)
+                    report["results"].append({"backend": backend, "scale": scale, "case": name, **result})
+                    print(f"[{backend} {scale:>7,}] {name:<24} median {result['median_ms']:>9.2f} ms", file=sys.stderr)
+                engine.dispose()
+                if backend == "postgresql":
+                    drop_postgres_schema(pg_url)
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Cases whose median got slower than baseline by more than `threshold` (0.2 = 20%)."""
+    previous = {(r["backend"], r["scale"], r["case"]): r for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        old = previous.get((r["backend"], r["scale"], r["case"]))
+        if old and old["median_ms"] > 0 and r["median_ms"] > old["median_ms"] * (1 + threshold):
+            regressions.append({**r, "baseline_median_ms": old["median_ms"],
+                                "ratio": round(r["median_ms"] / old["median_ms"], 2)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the tracker's page queries on synthetic data.")
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES, help="Number of requests per run")
+    parser.add_argument("--pg-url", default=os.environ.get("TRACKER_BENCH_PG_URL"),
+                        help="SQLAlchemy URL of a local Postgres to benchmark as well (default: $TRACKER_BENCH_PG_URL)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--cases", nargs="*", choices=list(CASES))
+    parser.add_argument("--seed", type=int, default=2026)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown before flagging (default 0.2)")
+    args = parser.parse_args(argv)
+
+    report = run(args.scales, args.pg_url, args.repeat, args.cases, args.seed)
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(report, json.load(f), args.threshold)
+        for r in report["regressions"]:
+            print(f"REGRESSION {r['backend']} {r['scale']} {r['case']}: {r['baseline_median_ms']} -> "
+                  f"{r['median_ms']} ms (x{r['ratio']})", file=sys.stderr)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
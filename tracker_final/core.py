@@ -0,0 +1,2002 @@
+# Shared config, DB access and helpers for app_v17_final.py and the scripts in tracker_final/pages.
+# Python imports this once per server process; pages import what they need from here.
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import pandas as pd
+from datetime import datetime, date, timedelta
+import hashlib 
+import io 
+import json
+import os
+import pathlib
+import queue
+import re
+import select
+import threading
+import tempfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import pypdfium2 as pdfium
+from supabase import create_client
+
+@st.cache_resource
+def init_connection():
+    url = st.secrets["SUPABASE_URL"]
+    key = st.secrets["SUPABASE_KEY"]
+    return create_client(url, key)
+
+supabase = init_connection()
+
+# --- STORAGE HEALTH PROBE (background, never blocks a rerun) ---
+def _probe_storage_once(client, timeout_sec):
+    """Calls list_buckets() with a hard timeout. Returns (ok, detail, latency_ms)."""
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        buckets = pool.submit(client.storage.list_buckets).result(timeout=timeout_sec)
+        return True, f"{len(buckets)} bucket(s) visible", (time.monotonic() - started) * 1000
+    except FuturesTimeout:
+        return False, f"No response within {timeout_sec:g}s", timeout_sec * 1000
+    except Exception as e:
+        return False, str(e), (time.monotonic() - started) * 1000
+    finally:
+        pool.shutdown(wait=False) # a hung call must not keep the probe thread waiting
+
+@st.cache_resource
+def storage_health_monitor():
+    """Starts one daemon thread per process that re-probes Supabase storage periodically.
+
+    Interval and timeout come from STORAGE_PROBE_INTERVAL_SEC / STORAGE_PROBE_TIMEOUT_SEC
+    in secrets (defaults 300s / 5s). Pages only ever read the last result.
+    """
+    interval = float(st.secrets.get("STORAGE_PROBE_INTERVAL_SEC", 300))
+    timeout_sec = float(st.secrets.get("STORAGE_PROBE_TIMEOUT_SEC", 5))
+    state = {"lock": threading.Lock(), "ok": None, "detail": "Checking...", "latency_ms": None, "checked_at": None}
+
+    def _loop():
+        while True:
+            ok, detail, latency_ms = _probe_storage_once(supabase, timeout_sec)
+            with state["lock"]:
+                state.update(ok=ok, detail=detail, latency_ms=latency_ms, checked_at=datetime.now())
+            if not ok:
+                print(f"Storage probe failed: {detail}")
+            time.sleep(interval)
+
+    threading.Thread(target=_loop, name="storage-health-probe", daemon=True).start()
+    return state
+
+def get_storage_health():
+    """Snapshot of the last background probe result (no network call)."""
+    state = storage_health_monitor()
+    with state["lock"]:
+        return {k: v for k, v in state.items() if k != "lock"}
+
+def render_storage_status():
+    """Small sidebar indicator for the storage probe."""
+    health = get_storage_health()
+    if health["ok"] is None:
+        st.sidebar.caption("⏳ Storage: checking...")
+    elif health["ok"]:
+        st.sidebar.caption(f"🟢 Storage OK · {health['latency_ms']:.0f} ms · {health['checked_at']:%H:%M:%S}")
+    else:
+        st.sidebar.caption(f"🔴 Storage unavailable · {health['checked_at']:%H:%M:%S}", help=health["detail"])
+    uploading = pending_attachment_uploads()
+    if uploading:
+        st.sidebar.caption(f"⏫ Uploading {uploading} attachment(s)...")
+
+storage_health_monitor()
+
+
+# --- NEW SUPABASE CONNECTION SETUP ---
+# This replaces the DB_FILE variable and init_db() calls
+# Pool settings are passed through to sqlalchemy.create_engine; tune them in secrets.
+conn_db = st.connection(
+    "postgresql", type="sql",
+    pool_size=int(st.secrets.get("DB_POOL_SIZE", 5)),
+    max_overflow=int(st.secrets.get("DB_MAX_OVERFLOW", 10)),
+    pool_recycle=int(st.secrets.get("DB_POOL_RECYCLE_SEC", 1800)),
+    pool_pre_ping=bool(st.secrets.get("DB_POOL_PRE_PING", True)),
+)
+from sqlalchemy import text
+
+# --- SECURITY FUNCTIONS (Basic Hashing) ---
+def make_hashes(password):
+    """Returns a SHA256 hash of the password."""
+    return hashlib.sha256(str.encode(password)).hexdigest()
+
+def check_hashes(password, hashed_text):
+    """Checks if the entered password matches the stored hash."""
+    return make_hashes(password) == hashed_text
+
+# --- SCHEMA MIGRATIONS ---
+# Tables shipped by tracker_sync.py between this build and the offline SQLite build.
+# Tables without a natural business key get a sync_key instead of their SERIAL id.
+SYNC_TRACKED_TABLES = {
+    'requests': None, # sync_key added by migration 11
+    'lc_po_tracker': None,
+    'standalone_indents': "CAST(indent_id AS text) || '|' || COALESCE(indent_number, '') || '|' || COALESCE(item_description, '') || '|' || COALESCE(indent_date, '')",
+    'event_log': "CAST(id AS text) || '|' || COALESCE(timestamp, '') || '|' || COALESCE(username, '') || '|' || COALESCE(action_type, '')",
+}
+# UTC, millisecond precision; identical text format to the SQLite build so values sort the same.
+# Colons are escaped because migration statements go through sqlalchemy.text().
+SYNC_TIMESTAMP_SQL = "to_char(clock_timestamp() AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24\\:MI\\:SS.MS\"Z\"')"
+
+def _sync_stamp_function_sql(stamp_xid=False):
+    """sync_stamp_row() trigger function. Migration 3 shipped it without stamp_xid; later
+    migrations recreate it so every write also records its transaction id in row_xid."""
+    # row_version comes from nextval() at write time, so transactions can commit out of
+    # row_version order. tracker_sync.py pages on (row_xid, row_version) and only ships rows
+    # whose transaction is older than every one still running, which can't gain rows later.
+    xid_assignment = "NEW.row_xid := pg_current_xact_id();" if stamp_xid else ""
+    return f"""CREATE OR REPLACE FUNCTION sync_stamp_row() RETURNS trigger AS $$
+            DECLARE
+                site sync_site%ROWTYPE;
+            BEGIN
+                SELECT * INTO site FROM sync_site WHERE id = 1;
+                {xid_assignment}
+                NEW.row_version := nextval('sync_row_version_seq');
+                -- tracker_sync.py sets applying while it writes rows received from the other
+                -- build, so their origin/updated_at survive; every local write is stamped here.
+                IF NOT COALESCE(site.applying, FALSE) THEN
+                    NEW.origin := site.site_id;
+                    NEW.updated_at := {SYNC_TIMESTAMP_SQL};
+                END IF;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql"""
+
+def _sync_tracking_statements():
+    """Row-version/origin columns, backfill and stamping trigger for every synced table."""
+    statements = [
+        "CREATE TABLE IF NOT EXISTS sync_site (id INTEGER PRIMARY KEY CHECK (id = 1), site_id TEXT NOT NULL, applying BOOLEAN NOT NULL DEFAULT FALSE)",
+        "INSERT INTO sync_site (id, site_id) VALUES (1, 'pg-' || substr(md5(CAST(random() AS text)), 1, 12)) ON CONFLICT (id) DO NOTHING",
+        "CREATE TABLE IF NOT EXISTS sync_state (peer_site_id TEXT, table_name TEXT, last_version BIGINT NOT NULL DEFAULT 0, synced_at TEXT, PRIMARY KEY (peer_site_id, table_name))",
+        "CREATE SEQUENCE IF NOT EXISTS sync_row_version_seq",
+        _sync_stamp_function_sql(),
+    ]
+    for table, key_expr in SYNC_TRACKED_TABLES.items():
+        statements += [
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS row_version BIGINT",
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TEXT",
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS origin TEXT",
+            f"""UPDATE {table} SET row_version = nextval('sync_row_version_seq'), updated_at = {SYNC_TIMESTAMP_SQL},
+                    origin = (SELECT site_id FROM sync_site WHERE id = 1)
+                WHERE row_version IS NULL""",
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_row_version ON {table} (row_version)",
+        ]
+        if key_expr:
+            # Existing rows get a key derived from their content so two copies of the same
+            # database agree on it; new rows get a random UUID.
+            statements += [
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS sync_key TEXT DEFAULT CAST(gen_random_uuid() AS text)",
+                f"UPDATE {table} SET sync_key = md5({key_expr})",
+                f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_sync_key ON {table} (sync_key)",
+            ]
+        statements += [
+            f"DROP TRIGGER IF EXISTS sync_stamp_{table} ON {table}",
+            f"CREATE TRIGGER sync_stamp_{table} BEFORE INSERT OR UPDATE ON {table} FOR EACH ROW EXECUTE FUNCTION sync_stamp_row()",
+        ]
+    return statements
+
+def _sync_commit_order_statements():
+    """row_xid on every synced table and the sync_state column holding the xid half of a watermark."""
+    statements = ["ALTER TABLE sync_state ADD COLUMN IF NOT EXISTS last_xid BIGINT NOT NULL DEFAULT 0"]
+    for table in SYNC_TRACKED_TABLES:
+        statements += [
+            # Existing rows get xid 0, so a watermark stored before this migration (xid 0,
+            # last_version) resumes exactly where it stopped. The column default doesn't fire
+            # the stamping trigger, so their row_version/updated_at are left alone.
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS row_xid xid8 NOT NULL DEFAULT CAST('0' AS xid8)",
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_row_xid_version ON {table} (row_xid, row_version)",
+        ]
+    return statements + [_sync_stamp_function_sql(stamp_xid=True)]
+
+# Tables whose writes are announced on CHANGE_FEED_CHANNEL. Statement-level triggers, and
+# Postgres folds identical notifications within a transaction, so a bulk write sends one.
+CHANGE_FEED_CHANNEL = 'tracker_changes'
+CHANGE_FEED_TABLES = ['requests', 'budget_heads', 'lc_po_tracker', 'messages', 'exchange_config']
+
+def _change_feed_function_sql(with_session=False):
+    """notify_tracker_change() trigger function. Migration 5 shipped the table-only payload;
+    with_session appends '|' and the writing browser session (see unit_of_work)."""
+    payload = "TG_TABLE_NAME || '|' || COALESCE(current_setting('tracker.session_id', true), '')" if with_session else "TG_TABLE_NAME"
+    return f"""CREATE OR REPLACE FUNCTION notify_tracker_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{CHANGE_FEED_CHANNEL}', {payload});
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql"""
+
+def _change_feed_statements():
+    statements = [_change_feed_function_sql()]
+    for table in CHANGE_FEED_TABLES:
+        statements += [
+            f"DROP TRIGGER IF EXISTS notify_change_{table} ON {table}",
+            f"CREATE TRIGGER notify_change_{table} AFTER INSERT OR UPDATE OR DELETE ON {table} FOR EACH STATEMENT EXECUTE FUNCTION notify_tracker_change()",
+        ]
+    return statements
+
+# Columns of a new MN as passed to submit_mn_request(). The _V6 list is what migration 6
+# shipped; later migrations recreate the function with the current list.
+MN_SUBMIT_COLUMNS_V6 = [
+    'mn_number', 'mn_issue_date', 'date_logged', 'requester', 'cost_area', 'estimated_cost',
+    'status', 'mn_particulars', 'mn_category', 'department', 'location',
+    'supplier_vendor', 'supplier_type', 'currency', 'foreign_spare_cost',
+    'freight_fca_charges', 'customs_duty_rate', 'local_cost_wo_vat_ait',
+    'vat_ait', 'landed_total_cost', 'date_sent_ho', 'plant_remarks', 'pdf_file_path',
+]
+MN_SUBMIT_COLUMNS = MN_SUBMIT_COLUMNS_V6 + ['pdf_upload_status']
+
+# Locks the cost area's budget head row, so concurrent submissions against the same area
+# run one after the other and each sees the ones committed before it. The remaining-balance
+# rule matches _compute_budget_status(): everything except Rejected counts as utilized.
+def _submit_mn_function_sql(columns):
+    return f"""
+CREATE OR REPLACE FUNCTION submit_mn_request(p_request jsonb, p_username text, p_logged_at text)
+RETURNS TABLE (outcome text, remaining double precision, requests_version bigint) AS $$
+DECLARE
+    req requests%ROWTYPE;
+    budget double precision;
+    utilized double precision;
+    new_version bigint;
+BEGIN
+    req := jsonb_populate_record(CAST(NULL AS requests), p_request);
+
+    SELECT total_budget INTO budget FROM budget_heads WHERE cost_area = req.cost_area FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'no_budget', CAST(NULL AS double precision), CAST(NULL AS bigint);
+        RETURN;
+    END IF;
+    IF EXISTS (SELECT 1 FROM requests WHERE mn_number = req.mn_number) THEN
+        RETURN QUERY SELECT 'duplicate', CAST(NULL AS double precision), CAST(NULL AS bigint);
+        RETURN;
+    END IF;
+
+    SELECT COALESCE(SUM(landed_total_cost), 0) INTO utilized
+    FROM requests WHERE cost_area = req.cost_area AND COALESCE(status, '') <> 'Rejected';
+    IF req.landed_total_cost > COALESCE(budget, 0) - utilized THEN
+        RETURN QUERY SELECT 'over_budget', COALESCE(budget, 0) - utilized, CAST(NULL AS bigint);
+        RETURN;
+    END IF;
+
+    BEGIN
+        INSERT INTO requests ({', '.join(columns)})
+        VALUES ({', '.join('req.' + c for c in columns)});
+    EXCEPTION WHEN unique_violation THEN
+        -- Same MN submitted against another cost area in the meantime
+        RETURN QUERY SELECT 'duplicate', CAST(NULL AS double precision), CAST(NULL AS bigint);
+        RETURN;
+    END;
+    INSERT INTO event_log (timestamp, username, action_type, description)
+    VALUES (p_logged_at, p_username, 'MN_SUBMISSION', 'New MN ' || req.mn_number || ' submitted with PDF attachment.');
+    INSERT INTO data_versions (table_name, version) VALUES ('requests', 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = data_versions.version + 1
+    RETURNING version INTO new_version;
+
+    RETURN QUERY SELECT 'submitted', COALESCE(budget, 0) - utilized - req.landed_total_cost, new_version;
+END;
+$$ LANGUAGE plpgsql"""
+
+# Append-only list of (version, description, statements). Never edit an entry that has
+# shipped; add a new version instead. Applied versions are recorded in schema_migrations.
+MIGRATIONS = [
+    (1, "standalone_indents.status column for pre-status databases", [
+        "ALTER TABLE standalone_indents ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'Not Purchased'",
+    ]),
+    (2, "Indexes for request filters, budget aggregation, indent billing and the event log", [
+        # Status filters / LC-PO stage lookup
+        "CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status)",
+        # Per-cost-area budget aggregation without touching the heap
+        "CREATE INDEX IF NOT EXISTS idx_requests_cost_area_status ON requests (cost_area, status) INCLUDE (landed_total_cost)",
+        # Keyset pagination / newest-first listing
+        "CREATE INDEX IF NOT EXISTS idx_requests_date_logged_id ON requests (date_logged DESC, id DESC)",
+        # MN number prefix search (LIKE 'X%') regardless of database collation
+        "CREATE INDEX IF NOT EXISTS idx_requests_mn_number_prefix ON requests (mn_number text_pattern_ops)",
+        # Bill builder: pending indents by number
+        "CREATE INDEX IF NOT EXISTS idx_standalone_indents_status_number ON standalone_indents (status, indent_number)",
+        # Saved bills join on the line items
+        "CREATE INDEX IF NOT EXISTS idx_indent_goods_details_bill_no ON indent_goods_details (bill_no)",
+        "CREATE INDEX IF NOT EXISTS idx_event_log_timestamp ON event_log (timestamp DESC)",
+        # requests.mn_number (UNIQUE) and lc_po_tracker.mn_number (PRIMARY KEY) already
+        # index both sides of the LC/PO join.
+    ]),
+    (3, "Change tracking for offline <-> Supabase sync (see tracker_sync.py)", _sync_tracking_statements()),
+    (4, "Effective-dated exchange rate history for FX revaluation", [
+        """CREATE TABLE IF NOT EXISTS exchange_rate_history (
+            id SERIAL PRIMARY KEY,
+            key TEXT NOT NULL,
+            value REAL NOT NULL,
+            effective_from TEXT NOT NULL,
+            created_by TEXT,
+            created_at TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_exchange_rate_history_key_effective ON exchange_rate_history (key, effective_from, id)",
+        # The rates in force today are the only ones known; treat them as in force since the start
+        """INSERT INTO exchange_rate_history (key, value, effective_from, created_by, created_at)
+           SELECT key, value, '1900-01-01', 'migration', to_char(now(), 'YYYY-MM-DD HH24\\:MI\\:SS')
+           FROM exchange_config""",
+    ]),
+    (5, "NOTIFY on writes to the tables behind the change feed (see change_feed_listener)", _change_feed_statements()),
+    (6, "submit_mn_request(): atomic duplicate + budget check and insert of a new MN", [
+        _submit_mn_function_sql(MN_SUBMIT_COLUMNS_V6),
+    ]),
+    (7, "requests.pdf_upload_status for the background attachment upload queue", [
+        "ALTER TABLE requests ADD COLUMN IF NOT EXISTS pdf_upload_status TEXT",
+        "UPDATE requests SET pdf_upload_status = 'complete' WHERE COALESCE(pdf_file_path, '') <> '' AND pdf_upload_status IS NULL",
+        # The worker's resume scan only ever looks at the (few) pending rows
+        "CREATE INDEX IF NOT EXISTS idx_requests_pdf_upload_pending ON requests (pdf_upload_status) WHERE pdf_upload_status = 'pending'",
+        _submit_mn_function_sql(MN_SUBMIT_COLUMNS),
+    ]),
+    (8, "mn_documents: first-page thumbnails and extracted text of MN attachments", [
+        """CREATE TABLE IF NOT EXISTS mn_documents (
+            pdf_file_path TEXT PRIMARY KEY, -- same value as requests.pdf_file_path
+            page_count INTEGER,
+            thumbnail BYTEA, -- PNG of the first page
+            content TEXT,
+            error TEXT,
+            indexed_at TEXT,
+            search_vector tsvector GENERATED ALWAYS AS (to_tsvector('simple', COALESCE(content, ''))) STORED
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_mn_documents_search ON mn_documents USING GIN (search_vector)",
+        "CREATE INDEX IF NOT EXISTS idx_requests_pdf_file_path ON requests (pdf_file_path) WHERE pdf_file_path IS NOT NULL",
+    ]),
+    (9, "event_log indexes for keyset pagination and server-side filters", [
+        # (timestamp, id) is the page key; the per-user/per-action variants serve the filtered pages
+        "CREATE INDEX IF NOT EXISTS idx_event_log_timestamp_id ON event_log (timestamp DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_event_log_timestamp",
+        "CREATE INDEX IF NOT EXISTS idx_event_log_username_timestamp ON event_log (username, timestamp DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_event_log_action_timestamp ON event_log (action_type, timestamp DESC, id DESC)",
+        # Lets ILIKE '%...%' on the description use an index instead of a full scan
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_event_log_description_trgm ON event_log USING GIN (description gin_trgm_ops)",
+    ]),
+    (10, "Sync watermarks that can't skip rows of transactions committing out of order", _sync_commit_order_statements()),
+    (11, "requests.sync_key: sync requests on an id that survives MN number edits", [
+        "ALTER TABLE requests ADD COLUMN IF NOT EXISTS sync_key TEXT DEFAULT CAST(gen_random_uuid() AS text)",
+        # Same seed as the offline build (md5 of the MN number), without restamping the rows
+        "ALTER TABLE requests DISABLE TRIGGER sync_stamp_requests",
+        "UPDATE requests SET sync_key = md5(mn_number) WHERE mn_number IS NOT NULL",
+        "ALTER TABLE requests ENABLE TRIGGER sync_stamp_requests",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_requests_sync_key ON requests (sync_key)",
+    ]),
+    (12, "Baseline exchange_rate_history rows missed by fresh installs", [
+        # init_db() used to seed exchange_config after the migrations, so on a fresh install
+        # migration 4 found no rates to record; give every key without history its baseline
+        """INSERT INTO exchange_rate_history (key, value, effective_from, created_by, created_at)
+           SELECT c.key, c.value, '1900-01-01', 'migration', to_char(now(), 'YYYY-MM-DD HH24\\:MI\\:SS')
+           FROM exchange_config c
+           WHERE NOT EXISTS (SELECT 1 FROM exchange_rate_history h WHERE h.key = c.key)""",
+    ]),
+    (13, "Change feed notifications name the writing session, so it isn't prompted about its own writes", [
+        _change_feed_function_sql(with_session=True),
+    ]),
+    (14, "sync_conflicts: rows tracker_sync.py could not apply without breaking a UNIQUE column", [
+        """CREATE TABLE IF NOT EXISTS sync_conflicts (
+            peer_site_id TEXT,
+            table_name TEXT,
+            row_key TEXT,
+            detail TEXT,
+            detected_at TEXT,
+            PRIMARY KEY (peer_site_id, table_name, row_key)
+        )""",
+    ]),
+    (15, "Request list index on COALESCE(date_logged, ''), id for keyset pages over undated requests", [
+        # Requests are listed newest first with a NULL date_logged sorting as '', which the
+        # plain (date_logged, id) index can't serve
+        "CREATE INDEX IF NOT EXISTS idx_requests_date_logged_key_id ON requests ((COALESCE(date_logged, '')) DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_requests_date_logged_id",
+    ]),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations():
+    """Applies pending MIGRATIONS in order, one transaction per version."""
+    execute_query('''CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TEXT
+                )''')
+    applied = set(load_data("SELECT version FROM schema_migrations")['version'].tolist())
+
+    for version, description, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        with conn_db.session as s:
+            # Serialize concurrent app instances; re-check once we hold the lock
+            s.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": 2026_0001})
+            already = s.execute(text("SELECT 1 FROM schema_migrations WHERE version = :v"), {"v": version}).first()
+            if already is None:
+                for statement in statements:
+                    s.execute(text(statement))
+                s.execute(text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :ts)"),
+                          {"v": version, "d": description, "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+            s.commit()
+
+def init_db():
+    """Initializes the SQL database with all necessary tables."""
+    
+    # Table 1: Budget Configuration (Cost Center)
+    execute_query('''CREATE TABLE IF NOT EXISTS budget_heads (
+                    id SERIAL PRIMARY KEY,
+                    department TEXT,
+                    cost_area TEXT UNIQUE,
+                    total_budget REAL
+                )''')
+    
+    # Table 2: Maintenance Notifications / Requests 
+    execute_query('''CREATE TABLE IF NOT EXISTS requests (
+                    id SERIAL PRIMARY KEY,
+                    mn_number TEXT UNIQUE, 
+                    mn_issue_date TEXT, 
+                    date_logged TEXT,
+                    requester TEXT,
+                    cost_area TEXT,
+                    estimated_cost REAL,
+                    status TEXT DEFAULT 'Pending',
+                    mn_particulars TEXT,
+                    mn_category TEXT,
+                    department TEXT,
+                    location TEXT,
+                    supplier_vendor TEXT,
+                    supplier_type TEXT,
+                    currency TEXT,
+                    foreign_spare_cost REAL,
+                    freight_fca_charges REAL,
+                    customs_duty_rate REAL, 
+                    local_cost_wo_vat_ait REAL,
+                    vat_ait REAL,
+                    landed_total_cost REAL,
+                    date_sent_ho TEXT,
+                    plant_remarks TEXT,
+                    FOREIGN KEY(cost_area) REFERENCES budget_heads(cost_area),
+                    pdf_file_path TEXT
+                )''')
+                
+    # Table 3: User Management
+    execute_query('''CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    username TEXT UNIQUE,
+                    password_hash TEXT,
+                    role TEXT -- 'administrator' or 'user'
+                )''')
+
+    # Table 4: Message Board
+    execute_query('''CREATE TABLE IF NOT EXISTS messages (
+                    id SERIAL PRIMARY KEY,
+                    username TEXT,
+                    message TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )''')
+
+    # Table 4: Exchange Rate and Duty Configuration
+    execute_query('''CREATE TABLE IF NOT EXISTS exchange_config (
+                    key TEXT PRIMARY KEY,
+                    value REAL
+                )''')
+                
+    # Table 5: Event Log
+    execute_query('''CREATE TABLE IF NOT EXISTS event_log (
+                    id SERIAL PRIMARY KEY,
+                    timestamp TEXT,
+                    username TEXT,
+                    action_type TEXT, -- e.g., 'BUDGET_UPDATE', 'USER_CREATE', 'MN_STATUS_CHANGE'
+                    description TEXT
+                )''')
+                
+    # Table 6: LC/PO and Payment Tracker
+    execute_query('''
+        CREATE TABLE IF NOT EXISTS lc_po_tracker (
+            mn_number TEXT PRIMARY KEY,
+            lc_po_nr TEXT,
+            lc_po_date TEXT,
+            eta_shipment_delivery TEXT,
+            delivery_completed TEXT, -- 'Yes' or 'No'
+            date_of_delivery TEXT,
+            commercial_store_remarks TEXT,
+            delay_days SERIAL,
+            bill_submitted_vendor TEXT, -- Local Supplier Only field
+            bill_tracking_id TEXT,
+            date_bill_submit_acc TEXT,
+            date_bill_submit_ho TEXT,
+            bill_paid TEXT, -- 'Yes' or 'No'
+            actual_lc_costing REAL, -- Foreign Supplier Only field
+            FOREIGN KEY(mn_number) REFERENCES requests(mn_number)
+        )
+    ''')
+
+    # Table 7: Indent Purchase Record (Main Record Header)
+    execute_query('''
+        CREATE TABLE IF NOT EXISTS indent_purchase_record (
+            bill_no TEXT PRIMARY KEY, 
+            indent_no TEXT,
+            grn_no TEXT,
+            supplier TEXT,
+            bill_date TEXT,
+            payment_mode TEXT,
+            total_bill_amount REAL,
+            remarks TEXT
+        )
+    ''')
+
+    # Table 8: Indent Goods Details (Line Items)
+    execute_query('''
+        CREATE TABLE IF NOT EXISTS indent_goods_details (
+            id SERIAL PRIMARY KEY,
+            bill_no TEXT, -- Stores the bill_no from the header table
+            description TEXT,
+            quantity REAL,
+            unit TEXT,
+            rate REAL,
+            amount REAL,
+            FOREIGN KEY(bill_no) REFERENCES indent_purchase_record(bill_no)
+        )
+    ''')
+
+    # Updated Table 9: Independent Indent Records (Standalone)
+    execute_query('''CREATE TABLE IF NOT EXISTS standalone_indents (
+                    indent_id SERIAL PRIMARY KEY,
+                    indent_number TEXT,
+                    item_description TEXT,
+                    quantity REAL,
+                    unit TEXT,
+                    rate REAL,
+                    total_amount REAL,
+                    indent_date TEXT,
+                    supplier TEXT,
+                    status TEXT DEFAULT 'Not Purchased'
+                )''')
+
+    # Table 10: Data Versions (per-table change counters used as cache keys)
+    execute_query('''CREATE TABLE IF NOT EXISTS data_versions (
+                    table_name TEXT PRIMARY KEY,
+                    version BIGINT DEFAULT 0
+                )''')
+    
+    # Initialize default configuration values if not present
+    # 1. Use named parameters for the configuration loop. Seeded before the migrations, so
+    # migration 4 records these rates as the baseline of exchange_rate_history on a fresh install
+    for k, v in DEFAULT_EXCHANGE_CONFIG.items():
+        # ON CONFLICT DO NOTHING is the PostgreSQL equivalent of INSERT OR IGNORE
+        query = "INSERT INTO exchange_config (key, value) VALUES (:key, :val) ON CONFLICT (key) DO NOTHING"
+        execute_query(query, {"key": k, "val": v})
+
+    # 2. Versioned schema changes (columns, indexes) on top of the base tables
+    run_migrations()
+
+    # Create/Update default admin user
+    admin_username = 'admin'
+    admin_hash = make_hashes("admin1024098")
+
+    # 3. Check for existence using named parameters
+    check_query = "SELECT COUNT(*) as count FROM users WHERE username = :user"
+    user_count_df = load_data(check_query, {"user": admin_username})
+    
+    if user_count_df.iloc[0]['count'] == 0:
+        # INSERT using named parameters
+        insert_query = "INSERT INTO users (username, password_hash, role) VALUES (:user, :pw, :role)"
+        execute_query(insert_query, {
+            "user": admin_username, 
+            "pw": admin_hash, 
+            "role": 'administrator'
+        })
+    else:
+        # UPDATE using named parameters
+        update_query = "UPDATE users SET password_hash = :pw WHERE username = :user"
+        execute_query(update_query, {
+            "pw": admin_hash, 
+            "user": admin_username
+        })
+
+# --- QUERY INSTRUMENTATION (per-rerun timings for the Diagnostics page) ---
+QUERY_STATS_MAX_RERUNS = int(st.secrets.get("QUERY_STATS_MAX_RERUNS", 500))
+# Set QUERY_METRICS_PORT in secrets (e.g. 9464) to expose /metrics for Prometheus
+QUERY_METRICS_PORT = st.secrets.get("QUERY_METRICS_PORT")
+N_PLUS_ONE_THRESHOLD = 5 # same statement more than this many times in one rerun
+_SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+def query_fingerprint(query):
+    """Statement text with literals replaced by ?, IN lists collapsed and whitespace squeezed.
+
+    Returns (short_id, normalized_sql); the id is stable across processes.
+    """
+    sql = _SQL_LITERAL_RE.sub('?', query)
+    sql = _SQL_IN_LIST_RE.sub('IN (...)', sql)
+    sql = ' '.join(sql.split())
+    return hashlib.md5(sql.encode()).hexdigest()[:10], sql
+
+def _value_shape(value):
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+def params_shape(params):
+    """Types (not values) of the bound parameters, e.g. "{id:int, tables:tuple[3]}" or "25 x (str, int)"."""
+    if not params:
+        return ""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}:{_value_shape(v)}" for k, v in sorted(params.items())) + "}"
+    if isinstance(params, list) and isinstance(params[0], (dict, list, tuple)):
+        return f"{len(params)} x {params_shape(params[0])}"
+    return "(" + ", ".join(_value_shape(v) for v in params) + ")"
+
+@st.cache_resource
+def _query_stats_store():
+    """Process-wide: the last QUERY_STATS_MAX_RERUNS reruns plus lifetime counters per (page, kind, statement)."""
+    return {"lock": threading.Lock(), "reruns": deque(maxlen=QUERY_STATS_MAX_RERUNS),
+            "totals": {}, "rerun_totals": {}, "statements": {}}
+
+# This module is imported once and shared by every session, but each rerun runs on its own
+# script thread, so the rerun being recorded is tracked per thread
+_rerun_local = threading.local()
+
+def _current_rerun():
+    return getattr(_rerun_local, "rerun", None)
+
+def begin_rerun_stats():
+    """Opens the query record for this rerun. Call once, near the top of the entrypoint."""
+    rerun = {"started_at": datetime.now(), "page": None, "user": None, "queries": []}
+    _rerun_local.rerun = rerun
+    store = _query_stats_store()
+    with store["lock"]:
+        store["reruns"].append(rerun)
+
+def set_rerun_page(page_name, username=None):
+    """Attributes this rerun (and the queries it issues from now on) to a page."""
+    rerun = _current_rerun()
+    if rerun is None:
+        return
+    rerun["page"], rerun["user"] = page_name, username
+    store = _query_stats_store()
+    with store["lock"]:
+        store["rerun_totals"][page_name] = store["rerun_totals"].get(page_name, 0) + 1
+
+def _frame_bytes(df):
+    # Shallow: string columns count their pointers only, which is cheap and enough to compare pages
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+def record_query(query, params, kind, rows, nbytes, elapsed_sec):
+    """Called by load_data/execute_query after every statement."""
+    fp_id, fp_sql = query_fingerprint(query)
+    rerun = _current_rerun()
+    page = (rerun or {}).get("page") or "(startup)"
+    store = _query_stats_store()
+    with store["lock"]:
+        store["statements"].setdefault(fp_id, fp_sql)
+        totals = store["totals"].setdefault((page, kind, fp_id), [0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += elapsed_sec
+        totals[2] += max(rows, 0)
+        totals[3] += nbytes
+    if rerun is not None:
+        rerun["queries"].append({
+            "fingerprint": fp_id, "kind": kind, "params": params_shape(params),
+            "rows": rows, "bytes": nbytes, "ms": elapsed_sec * 1000,
+        })
+
+def get_query_stats():
+    """Flattened copy of the buffered reruns: (reruns_df, queries_df)."""
+    store = _query_stats_store()
+    with store["lock"]:
+        reruns = list(store["reruns"])
+        statements = dict(store["statements"])
+    rerun_rows, query_rows = [], []
+    for n, rerun in enumerate(reruns):
+        queries = list(rerun["queries"])
+        rerun_rows.append({
+            "rerun": n, "started_at": rerun["started_at"], "page": rerun["page"] or "(startup)",
+            "user": rerun["user"], "queries": len(queries),
+            "db_ms": sum(q["ms"] for q in queries), "rows": sum(max(q["rows"], 0) for q in queries),
+            "bytes": sum(q["bytes"] for q in queries),
+        })
+        for q in queries:
+            query_rows.append({"rerun": n, "page": rerun["page"] or "(startup)",
+                               "statement": statements.get(q["fingerprint"], ""), **q})
+    return pd.DataFrame(rerun_rows), pd.DataFrame(query_rows)
+
+def reset_query_stats():
+    """Drops the buffered reruns. Lifetime counters (the Prometheus export) are kept."""
+    store = _query_stats_store()
+    with store["lock"]:
+        store["reruns"].clear()
+
+def _prom_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def render_prometheus_metrics(store=None):
+    """Lifetime query counters in the Prometheus text exposition format."""
+    store = store or _query_stats_store()
+    with store["lock"]:
+        totals = dict((k, list(v)) for k, v in store["totals"].items())
+        rerun_totals = dict(store["rerun_totals"])
+        statements = dict(store["statements"])
+
+    lines = []
+    for i, (name, help_text) in enumerate([
+        ("tracker_queries_total", "Statements run through load_data/execute_query."),
+        ("tracker_query_duration_seconds_total", "Wall time spent in those statements."),
+        ("tracker_query_rows_total", "Rows returned (reads) or affected (writes)."),
+        ("tracker_query_bytes_total", "Shallow in-memory size of the frames returned."),
+    ]):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (page, kind, fp_id), values in sorted(totals.items()):
+            lines.append(f'{name}{{page="{_prom_label(page)}",kind="{kind}",fingerprint="{fp_id}"}} {round(values[i], 6)}')
+    lines += ["# HELP tracker_reruns_total Script reruns per page.", "# TYPE tracker_reruns_total counter"]
+    for page, count in sorted(rerun_totals.items()):
+        lines.append(f'tracker_reruns_total{{page="{_prom_label(page)}"}} {count}')
+    lines += ["# HELP tracker_query_statement_info Normalized statement text for each fingerprint.",
+              "# TYPE tracker_query_statement_info gauge"]
+    for fp_id, sql in sorted(statements.items()):
+        lines.append(f'tracker_query_statement_info{{fingerprint="{fp_id}",statement="{_prom_label(sql[:200])}"}} 1')
+    return "\n".join(lines) + "\n"
+
+@st.cache_resource
+def query_metrics_exporter(port):
+    """Serves render_prometheus_metrics() at http://<host>:<port>/metrics from a daemon thread."""
+    store = _query_stats_store()
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus_metrics(store).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="query-metrics-exporter", daemon=True).start()
+    return server
+
+# --- DATABASE INTERACTION FUNCTIONS ---
+# --- UPDATED DATABASE INTERACTION FUNCTIONS ---
+def load_data(query, params=None):
+    """Loads data from Supabase using Streamlit SQL connection."""
+    # Note: PostgreSQL uses :name for parameters in SQLAlchemy-based connections
+    started = time.perf_counter()
+    df = conn_db.query(query, params=params, ttl=0)
+    record_query(query, params, "read", len(df), _frame_bytes(df), time.perf_counter() - started)
+    return df
+
+
+@contextmanager
+def unit_of_work():
+    """One transaction on one pooled connection for several writes.
+
+    Commits when the block exits normally and rolls back if anything raises:
+
+        with unit_of_work() as uow:
+            execute_query("UPDATE ...", params, uow=uow)
+            log_event("...", "...", uow=uow)
+    """
+    with conn_db.session as s:
+        try:
+            session_id = _change_feed_session_id()
+            if CHANGE_FEED_ENABLED and session_id:
+                # Transaction-local; notify_tracker_change() puts it in the payload
+                s.execute(text("SELECT set_config('tracker.session_id', :sid, true)"), {"sid": session_id})
+            yield s
+            s.commit()
+        except Exception:
+            s.rollback()
+            raise
+
+def execute_query(query, params=None, uow=None):
+    """Executes Write/Update queries in Supabase.
+
+    Runs inside `uow` when given (committed by the unit of work), otherwise in its own
+    transaction. params may be a list of dicts for a batched executemany.
+    """
+    started = time.perf_counter()
+    if uow is not None:
+        result = uow.execute(text(query), params or {})
+    else:
+        with unit_of_work() as s:
+            result = s.execute(text(query), params or {})
+    record_query(query, params, "write", result.rowcount, 0, time.perf_counter() - started)
+    return result
+        
+# --- LOGGING FUNCTIONS ---
+def log_event(action_type, description, uow=None):
+    username = st.session_state.get('username', 'SYSTEM')
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    query = "INSERT INTO event_log (timestamp, username, action_type, description) VALUES (:ts, :user, :act, :desc)"
+    params = {"ts": timestamp, "user": username, "act": action_type, "desc": description}
+    execute_query(query, params, uow=uow)
+    
+# --- EVENT LOG: server-side filters + keyset pagination ---
+EVENT_LOG_FILTER_COLUMNS = ['username', 'action_type']
+EVENT_LOG_PAGE_SIZE = 100
+
+def _event_log_filter_clause(filters):
+    """
+    Turns an event log filter dict into WHERE conditions + named params. Keys (all optional):
+    date_from/date_to (dates, inclusive), username/action_type (tuples of values) and
+    search (substring of the description, case-insensitive).
+    """
+    conditions, params = [], {}
+    if filters.get('date_from'):
+        conditions.append("timestamp >= :date_from")
+        params['date_from'] = str(filters['date_from'])
+    if filters.get('date_to'):
+        # Timestamps are 'YYYY-MM-DD HH:MM:SS' text, so the day after is the exclusive bound
+        conditions.append("timestamp < :date_to")
+        params['date_to'] = str(filters['date_to'] + timedelta(days=1))
+    for column in EVENT_LOG_FILTER_COLUMNS:
+        if filters.get(column):
+            conditions.append(f"{column} IN :{column}")
+            params[column] = tuple(filters[column])
+    if filters.get('search'):
+        # Served by the trigram index; escape LIKE wildcards typed by the user
+        conditions.append("description ILIKE :search ESCAPE '\\'")
+        params['search'] = "%" + re.sub(r"([\\%_])", r"\\\1", filters['search']) + "%"
+    return conditions, params
+
+@st.cache_data(ttl=300)
+def get_event_log_filter_options(column):
+    """DISTINCT values of a filterable event log column (refreshed every 5 minutes)."""
+    if column not in EVENT_LOG_FILTER_COLUMNS:
+        raise ValueError(f"Unsupported event log filter column: {column}")
+    options_df = load_data(f"SELECT DISTINCT {column} FROM event_log WHERE {column} IS NOT NULL ORDER BY {column}")
+    return options_df[column].tolist()
+
+def load_event_log_page(filters, after, limit=EVENT_LOG_PAGE_SIZE):
+    """
+    One page of matching events, newest first, keyset-paginated on (timestamp, id).
+    after is the (timestamp, id) of the last row of the previous page, or None for page 1.
+    Fetches one extra row to tell whether another page follows: returns (page_df, has_more).
+    """
+    conditions, params = _event_log_filter_clause(filters)
+    if after is not None:
+        conditions.append("(timestamp, id) < (:after_ts, :after_id)")
+        params.update({"after_ts": after[0], "after_id": after[1]})
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params["limit"] = limit + 1
+    page_df = load_data(f"""
+        SELECT id, timestamp, username, action_type, description FROM event_log {where}
+        ORDER BY timestamp DESC, id DESC LIMIT :limit
+    """, params)
+    return page_df.head(limit), len(page_df) > limit
+
+def load_filtered_event_logs(filters):
+    """All matching events (for CSV export only; the page itself is paginated)."""
+    conditions, params = _event_log_filter_clause(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return load_data(f"SELECT timestamp, username, action_type, description FROM event_log {where} ORDER BY timestamp DESC, id DESC", params)
+
+# --- DATA VERSIONING (per-table change counters) ---
+def bump_data_version(table_name, uow=None):
+    """Increments the change counter of a table and returns the new version.
+
+    Pass the write's unit of work so the bump commits (or rolls back) with it.
+    """
+    version = execute_query("""
+        INSERT INTO data_versions (table_name, version) VALUES (:t, 1)
+        ON CONFLICT (table_name) DO UPDATE SET version = data_versions.version + 1
+        RETURNING version
+    """, {"t": table_name}, uow=uow).scalar()
+    return int(version)
+
+def get_data_versions(*table_names):
+    """Returns the current change counter of each table (0 if never written)."""
+    versions_df = load_data("SELECT table_name, version FROM data_versions WHERE table_name IN :tables",
+                            {"tables": tuple(table_names)})
+    versions = dict(zip(versions_df['table_name'], versions_df['version']))
+    return tuple(int(versions.get(t, 0)) for t in table_names)
+
+# --- EXCHANGE RATE & DUTY CONFIGURATION (cached, invalidated on save) ---
+DEFAULT_EXCHANGE_CONFIG = {
+    'USD_rate': 110.00, 'EUR_rate': 120.00, 'GBP_rate': 130.00, 
+    'INR_rate': 1.50, 'OTHER_rate': 100.00, 'CustomsDuty_pct': 0.05
+}
+# Currency shown in the MN forms -> exchange_config key of its BDT rate
+FX_RATE_KEYS = {"USD": 'USD_rate', "EUR": 'EUR_rate', "GBP": 'GBP_rate', "INR": 'INR_rate', "Other": 'OTHER_rate'}
+# Saving the config form clears the cache at once; the TTL only bounds how long another server
+# process keeps serving the old rates
+EXCHANGE_CONFIG_TTL_SEC = int(st.secrets.get("EXCHANGE_CONFIG_TTL_SEC", 300))
+
+@st.cache_data(ttl=EXCHANGE_CONFIG_TTL_SEC)
+def get_exchange_config():
+    """Exchange rates and customs duty, with defaults for missing keys.
+
+    Returns {"version", "values", "fx_rates", "customs_duty_pct"}; version is the
+    data_versions stamp of exchange_config the values were read at. Served from the
+    cache on every rerun, so the landed-cost preview never touches the database.
+    Call save_exchange_config() to change the values.
+    """
+    version = get_data_versions('exchange_config')[0]
+    config_df = load_data("SELECT key, value FROM exchange_config")
+    values = {**DEFAULT_EXCHANGE_CONFIG, **{k: float(v) for k, v in zip(config_df['key'], config_df['value'])}}
+    return {
+        "version": version,
+        "values": values,
+        "fx_rates": {"BDT": 1.0, **{currency: values[key] for currency, key in FX_RATE_KEYS.items()}},
+        "customs_duty_pct": values['CustomsDuty_pct'],
+    }
+
+def exchange_config_changed(config):
+    """True if someone saved new rates after `config` was read (one tiny query; use on submit, not per keystroke)."""
+    return get_data_versions('exchange_config')[0] != config["version"]
+
+def save_exchange_config(values, uow, effective_from=None):
+    """Upserts the given keys, records them in exchange_rate_history as in force from
+    `effective_from` (default today) and stamps a new config version inside `uow`.
+
+    Call get_exchange_config.clear() after the unit of work commits.
+    """
+    execute_query("""
+        INSERT INTO exchange_config (key, value) 
+        VALUES (:k, :v)
+        ON CONFLICT (key) 
+        DO UPDATE SET value = EXCLUDED.value
+    """, [{'k': k, 'v': v} for k, v in values.items()], uow=uow)
+    execute_query("""
+        INSERT INTO exchange_rate_history (key, value, effective_from, created_by, created_at)
+        VALUES (:k, :v, :eff, :user, :ts)
+    """, [{'k': k, 'v': v, 'eff': str(effective_from or date.today()),
+           'user': st.session_state.get('username', 'SYSTEM'), 'ts': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+          for k, v in values.items()], uow=uow)
+    return bump_data_version('exchange_config', uow=uow)
+
+# --- CORE FUNCTION: Budget vs. Cost Status Calculation ---
+# Must match the status lists used in the aggregation SQL below
+APPROVED_STATUSES = ["Finance Approved", "PO Issued", "Completed"]
+
+def _compute_budget_status():
+    """
+    Returns ((budget_heads_version, requests_version), (status_df, total_budget, total_spent, remaining)).
+    The change counters are read by the same statement as the sums, so a snapshot that
+    already includes a write is always labelled with that write's version.
+    """
+    # Aggregate in SQL so only one summed row per cost area crosses the wire,
+    # instead of every (wide) request row.
+    # Total Utilized (MN_issued) = all except Rejected
+    # MN_approved = Finance Approved, PO Issued, Completed
+    merged = load_data("""
+        SELECT v.budget_heads_version, v.requests_version,
+               b.id, b.department, b.cost_area, b.total_budget,
+               COALESCE(s.utilized, 0) AS utilized,
+               COALESCE(s.approved, 0) AS approved
+        FROM (
+            SELECT COALESCE((SELECT version FROM data_versions WHERE table_name = 'budget_heads'), 0) AS budget_heads_version,
+                   COALESCE((SELECT version FROM data_versions WHERE table_name = 'requests'), 0) AS requests_version
+        ) v
+        LEFT JOIN (
+            budget_heads b
+            LEFT JOIN (
+                SELECT cost_area,
+                       SUM(CASE WHEN COALESCE(status, '') <> 'Rejected' THEN landed_total_cost ELSE 0 END) AS utilized,
+                       SUM(CASE WHEN status IN ('Finance Approved', 'PO Issued', 'Completed') THEN landed_total_cost ELSE 0 END) AS approved
+                FROM requests
+                GROUP BY cost_area
+            ) s ON s.cost_area = b.cost_area
+        ) ON TRUE
+        ORDER BY b.id
+    """)
+    version = (int(merged['budget_heads_version'].iloc[0]), int(merged['requests_version'].iloc[0]))
+    # No budget heads: the versions row comes back alone, with NULL budget columns
+    merged = merged[merged['id'].notna()].drop(columns=['budget_heads_version', 'requests_version'])
+
+    if merged.empty:
+        return version, (pd.DataFrame(), 0, 0, 0)
+
+    merged.rename(columns={'utilized': 'Total Utilized Cost', 'approved': 'MN_approved'}, inplace=True)
+    for col in ['total_budget', 'Total Utilized Cost', 'MN_approved']:
+        merged[col] = pd.to_numeric(merged[col], errors='coerce').fillna(0)
+
+    return version, _with_balance_columns(merged)
+
+def _with_balance_columns(merged):
+    """Derives Remaining Balance / Utilization % and the grand totals."""
+    merged['Remaining Balance'] = merged['total_budget'] - merged['Total Utilized Cost']
+    
+    total_budget = merged['total_budget'].sum()
+    total_spent = merged['Total Utilized Cost'].sum()
+    remaining = total_budget - total_spent
+
+    # Vectorized: 0 where the budget is not positive
+    merged['Utilization %'] = (
+        merged['Total Utilized Cost'] / merged['total_budget'].where(merged['total_budget'] > 0) * 100
+    ).fillna(0)
+    
+    return merged, total_budget, total_spent, remaining
+
+@st.cache_resource
+def _budget_status_cache():
+    """Process-wide budget status snapshot shared by every session, keyed on data versions."""
+    return {"lock": threading.Lock(), "version": None, "result": None}
+
+def calculate_status():
+    """
+    Returns (status_df, total_budget, total_spent, remaining).
+    Recomputes only when the budget_heads/requests change counters moved past
+    the cached snapshot; single-request writes are folded in by apply_request_delta().
+    """
+    version = get_data_versions('budget_heads', 'requests')
+    cache = _budget_status_cache()
+    with cache['lock']:
+        if cache['version'] == version:
+            df, total_budget, total_spent, remaining = cache['result']
+            return df.copy(), total_budget, total_spent, remaining
+
+    # Cache under the version the aggregate itself saw, not the one read above: a write
+    # committing in between must not be folded in again by its apply_request_delta()
+    version, result = _compute_budget_status()
+    with cache['lock']:
+        # Don't overwrite a snapshot that a concurrent delta already moved ahead
+        if cache['version'] is None or all(new >= old for new, old in zip(version, cache['version'])):
+            cache['version'], cache['result'] = version, result
+    df, total_budget, total_spent, remaining = result
+    return df.copy(), total_budget, total_spent, remaining
+
+def _request_contribution(cost, status):
+    """(utilized, approved) amount a single request adds to its cost area."""
+    cost = 0.0 if pd.isna(cost) else float(cost)
+    utilized = cost if status != 'Rejected' else 0.0
+    approved = cost if status in APPROVED_STATUSES else 0.0
+    return utilized, approved
+
+def read_request_contribution(request_id, uow):
+    """(cost_area, landed_total_cost, status) of a request as of `uow`, or None if it's gone.
+
+    Row-locks the request until `uow` commits, so the old side of apply_request_delta()
+    is the row this write replaces, not what the page showed when it rendered.
+    """
+    row = execute_query("SELECT cost_area, landed_total_cost, status FROM requests WHERE id = :id FOR UPDATE",
+                        {"id": request_id}, uow=uow).first()
+    return tuple(row) if row else None
+
+def apply_request_delta(old, new, requests_version):
+    """
+    Folds one request change into the cached budget status instead of recomputing.
+    old/new are (cost_area, landed_total_cost, status) tuples; None for "no row"
+    (e.g. old=None on insert). requests_version is the value returned by
+    bump_data_version('requests') for this write. If the snapshot missed any other
+    write in between, it is left alone and the next read recomputes it.
+    """
+    cache = _budget_status_cache()
+    with cache['lock']:
+        if cache['version'] is None or cache['version'][1] != requests_version - 1:
+            return
+        df, total_budget, _, _ = cache['result']
+        if df.empty:
+            return
+        df = df.copy()
+        for row, sign in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            area, cost, status = row
+            utilized, approved = _request_contribution(cost, status)
+            mask = df['cost_area'] == area
+            df.loc[mask, 'Total Utilized Cost'] += sign * utilized
+            df.loc[mask, 'MN_approved'] += sign * approved
+        cache['version'] = (cache['version'][0], requests_version)
+        cache['result'] = _with_balance_columns(df)
+
+# --- MN SUBMISSION (duplicate + budget check and insert in one round trip) ---
+def submit_mn_request(request):
+    """Submits a new MN through the submit_mn_request() database function.
+
+    `request` maps MN_SUBMIT_COLUMNS to values. Returns (outcome, remaining, requests_version)
+    where outcome is 'submitted', 'duplicate', 'over_budget' or 'no_budget'; remaining is the
+    cost area's balance (after the insert when submitted) and requests_version is set only
+    when submitted.
+    """
+    row = execute_query(
+        "SELECT outcome, remaining, requests_version FROM submit_mn_request(CAST(:req AS jsonb), :user, :ts)",
+        {"req": json.dumps({c: request.get(c) for c in MN_SUBMIT_COLUMNS}),
+         "user": st.session_state.get('username', 'SYSTEM'),
+         "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")},
+    ).one()
+    return row.outcome, row.remaining, row.requests_version
+
+# --- MN ATTACHMENTS (spooled locally, uploaded by a background worker) ---
+# Submitting an MN only writes the PDF to a local spool and records it as 'pending'; a worker
+# thread uploads it with retries and marks it 'complete' (or 'failed' after the last attempt).
+# Objects are named by content hash, so a retried or repeated upload is harmless.
+ATTACHMENT_BUCKET = "mn_files"
+ATTACHMENT_STORAGE_BACKEND = st.secrets.get("ATTACHMENT_STORAGE_BACKEND", "supabase") # or "local"
+ATTACHMENT_LOCAL_ROOT = st.secrets.get("ATTACHMENT_LOCAL_ROOT", "attachment_store")
+ATTACHMENT_SPOOL_DIR = st.secrets.get("ATTACHMENT_SPOOL_DIR", "attachment_spool")
+ATTACHMENT_UPLOAD_MAX_ATTEMPTS = int(st.secrets.get("ATTACHMENT_UPLOAD_MAX_ATTEMPTS", 6))
+ATTACHMENT_RETRY_BASE_SEC = 5 # doubled after every failed attempt, up to 10 minutes
+
+def _upload_to_supabase(path, spool_file):
+    with open(spool_file, "rb") as f:
+        supabase.storage.from_(ATTACHMENT_BUCKET).upload(
+            path=path, file=f, file_options={"content-type": "application/pdf", "upsert": "true"}
+        )
+
+def _upload_to_local(path, spool_file):
+    target = os.path.join(ATTACHMENT_LOCAL_ROOT, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(spool_file, "rb") as src, tempfile.NamedTemporaryFile(dir=os.path.dirname(target), delete=False) as dst:
+        while chunk := src.read(1 << 20):
+            dst.write(chunk)
+    os.replace(dst.name, target)
+
+def _exists_in_supabase(path):
+    return supabase.storage.from_(ATTACHMENT_BUCKET).exists(path)
+
+def _exists_in_local(path):
+    return os.path.exists(os.path.join(ATTACHMENT_LOCAL_ROOT, path))
+
+def _download_from_supabase(path):
+    return supabase.storage.from_(ATTACHMENT_BUCKET).download(path)
+
+def _download_from_local(path):
+    with open(os.path.join(ATTACHMENT_LOCAL_ROOT, path), "rb") as f:
+        return f.read()
+
+def _sign_supabase(paths, expires_in):
+    """{path: signed URL} for a batch of objects in one storage call."""
+    signed = supabase.storage.from_(ATTACHMENT_BUCKET).create_signed_urls(paths, expires_in)
+    urls = {}
+    for item in signed:
+        url = item.get('signedURL') or item.get('signedUrl') # key spelling differs across client versions
+        if url and not item.get('error'):
+            urls[item['path']] = url
+    return urls
+
+def _sign_local(paths, expires_in):
+    """file:// URLs for the local backend; the expiry is carried along only so the cache behaves the same."""
+    expires = int(time.time() + expires_in)
+    return {path: f"{pathlib.Path(ATTACHMENT_LOCAL_ROOT, path).resolve().as_uri()}?expires={expires}"
+            for path in paths if os.path.exists(os.path.join(ATTACHMENT_LOCAL_ROOT, path))}
+
+# Storage backend operations: upload(path, spool_file), exists(path) -> bool,
+# download(path) -> bytes and sign(paths, expires_in) -> {path: url}
+ATTACHMENT_BACKENDS = {
+    "supabase": {"upload": _upload_to_supabase, "exists": _exists_in_supabase,
+                 "download": _download_from_supabase, "sign": _sign_supabase},
+    "local": {"upload": _upload_to_local, "exists": _exists_in_local,
+              "download": _download_from_local, "sign": _sign_local},
+}
+
+def _spool_file(path):
+    return os.path.join(ATTACHMENT_SPOOL_DIR, os.path.basename(path))
+
+def spool_attachment(uploaded_file):
+    """Copies an uploaded PDF to the spool in chunks, hashing as it goes.
+
+    Returns its content-addressed storage path (mn_attachments/<sha256>.pdf). Spool files are
+    shared by every submission of the same content, so the caller holds this one until it
+    passes it to enqueue_attachment_upload() or discard_spooled_attachment().
+    """
+    state = attachment_upload_worker()
+    os.makedirs(ATTACHMENT_SPOOL_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=ATTACHMENT_SPOOL_DIR, suffix=".part", delete=False) as tmp:
+        while chunk := uploaded_file.read(1 << 20):
+            digest.update(chunk)
+            tmp.write(chunk)
+    path = f"mn_attachments/{digest.hexdigest()}.pdf"
+    with state["lock"]:
+        state["holds"][path] = state["holds"].get(path, 0) + 1
+        os.replace(tmp.name, _spool_file(path))
+    return path
+
+def _finish_attachment(path, status):
+    with unit_of_work() as uow:
+        execute_query("UPDATE requests SET pdf_upload_status = :status WHERE pdf_file_path = :path AND pdf_upload_status = 'pending'",
+                      {"status": status, "path": path}, uow=uow)
+        bump_data_version('requests', uow=uow)
+
+@st.cache_resource
+def attachment_upload_worker():
+    """Starts one daemon thread per process that drains the upload queue.
+
+    Jobs are (due_at, attempt, path); a failed upload is re-queued with exponential backoff.
+    On start it re-queues the pending rows whose spool file is on this host, so uploads
+    interrupted by a restart resume. A spool file stays while a job for it is queued
+    (pending) or a submission holds it (holds); both count per path.
+    """
+    state = {"lock": threading.Lock(), "queue": queue.PriorityQueue(), "pending": {}, "holds": {},
+             "last_error": None}
+
+    def _enqueue(path, attempt=0, delay=0.0):
+        if attempt == 0:
+            with state["lock"]:
+                state["pending"][path] = state["pending"].get(path, 0) + 1
+        state["queue"].put((time.monotonic() + delay, attempt, path))
+
+    def _remove_spool_file_if_unused(path):
+        # Caller holds the lock
+        if not state["pending"].get(path) and not state["holds"].get(path) and os.path.exists(_spool_file(path)):
+            os.remove(_spool_file(path))
+
+    def _loop():
+        while True:
+            due_at, attempt, path = state["queue"].get()
+            wait = due_at - time.monotonic()
+            if wait > 0:
+                state["queue"].put((due_at, attempt, path))
+                time.sleep(min(wait, 1.0))
+                continue
+            backend = ATTACHMENT_BACKENDS[ATTACHMENT_STORAGE_BACKEND]
+            try:
+                if os.path.exists(_spool_file(path)):
+                    backend["upload"](path, _spool_file(path))
+                    _finish_attachment(path, 'complete')
+                    # Index from the local copy while we still have it
+                    index_attachment(path, _spool_file(path))
+                elif backend["exists"](path):
+                    # An earlier job for the same content stored it and removed the spool file
+                    _finish_attachment(path, 'complete')
+                else:
+                    print(f"Attachment lost before upload: {path} is neither spooled nor stored")
+                    with state["lock"]:
+                        state["last_error"] = f"{path}: spool file missing"
+                    _finish_attachment(path, 'failed')
+            except Exception as e:
+                with state["lock"]:
+                    state["last_error"] = f"{path}: {e}"
+                print(f"Attachment upload failed (attempt {attempt + 1}): {path}: {e}")
+                if attempt + 1 < ATTACHMENT_UPLOAD_MAX_ATTEMPTS:
+                    _enqueue(path, attempt + 1, delay=min(2 ** attempt * ATTACHMENT_RETRY_BASE_SEC, 600))
+                    continue
+                try:
+                    _finish_attachment(path, 'failed')
+                except Exception as db_error:
+                    print(f"Could not mark {path} as failed: {db_error}")
+            with state["lock"]:
+                state["pending"][path] -= 1
+                if not state["pending"][path]:
+                    del state["pending"][path]
+                _remove_spool_file_if_unused(path)
+
+    state["enqueue"] = _enqueue
+    state["remove_if_unused"] = _remove_spool_file_if_unused
+    for path in load_data("SELECT DISTINCT pdf_file_path FROM requests WHERE pdf_upload_status = 'pending'")['pdf_file_path']:
+        if os.path.exists(_spool_file(path)):
+            _enqueue(path)
+    threading.Thread(target=_loop, name="attachment-upload-worker", daemon=True).start()
+    return state
+
+def _release_spool_hold(state, path):
+    # Caller holds the lock
+    state["holds"][path] -= 1
+    if not state["holds"][path]:
+        del state["holds"][path]
+
+def enqueue_attachment_upload(path):
+    """Hands a spooled attachment, and the caller's hold on it, to the worker; returns immediately."""
+    state = attachment_upload_worker()
+    state["enqueue"](path)
+    with state["lock"]:
+        _release_spool_hold(state, path)
+
+def discard_spooled_attachment(path):
+    """Releases the caller's hold on an attachment whose MN was not accepted; the spool copy
+    goes once no other submission holds it and no upload of it is queued."""
+    state = attachment_upload_worker()
+    with state["lock"]:
+        _release_spool_hold(state, path)
+        state["remove_if_unused"](path)
+
+def pending_attachment_uploads():
+    """Number of uploads this process still has queued or in flight (no database access)."""
+    state = attachment_upload_worker()
+    with state["lock"]:
+        return sum(state["pending"].values())
+
+# --- SIGNED ATTACHMENT URLS (process-wide, reused until close to expiry) ---
+SIGNED_URL_TTL_SEC = int(st.secrets.get("SIGNED_URL_TTL_SEC", 3600))
+SIGNED_URL_MIN_REMAINING_SEC = 300 # re-sign before handing out a URL that would expire mid-read
+SIGNED_URL_BATCH_SIZE = 100
+
+def attachment_object_path(db_path):
+    """Storage path of a stored pdf_file_path (older rows carry a "/mn_files/" bucket prefix)."""
+    return db_path.replace(f"/{ATTACHMENT_BUCKET}/", "").lstrip("/")
+
+@st.cache_resource
+def _signed_url_cache():
+    return {"lock": threading.Lock(), "urls": {}}
+
+def get_signed_urls(paths):
+    """{path: signed URL} for the given storage paths.
+
+    URLs are cached per path until SIGNED_URL_MIN_REMAINING_SEC before they expire; only the
+    misses are signed, in batches of SIGNED_URL_BATCH_SIZE per storage call. Paths the
+    backend could not sign are left out.
+    """
+    cache = _signed_url_cache()
+    now = time.monotonic()
+    with cache["lock"]:
+        # Drop expired entries so the cache stays bounded by the documents in use
+        cache["urls"] = {p: entry for p, entry in cache["urls"].items() if entry[1] > now}
+        urls = {p: cache["urls"][p][0] for p in paths if p in cache["urls"]}
+    missing = sorted(set(paths) - set(urls))
+
+    sign = ATTACHMENT_BACKENDS[ATTACHMENT_STORAGE_BACKEND]["sign"]
+    for i in range(0, len(missing), SIGNED_URL_BATCH_SIZE):
+        fresh = sign(missing[i:i + SIGNED_URL_BATCH_SIZE], SIGNED_URL_TTL_SEC)
+        reuse_until = time.monotonic() + SIGNED_URL_TTL_SEC - SIGNED_URL_MIN_REMAINING_SEC
+        with cache["lock"]:
+            cache["urls"].update({p: (url, reuse_until) for p, url in fresh.items()})
+        urls.update(fresh)
+    return urls
+
+# --- DOCUMENT INDEX (thumbnails + full-text search of MN attachments) ---
+DOCUMENT_THUMBNAIL_WIDTH = 240 # px
+DOCUMENT_INDEX_MAX_PAGES = 50 # text is extracted from at most this many pages
+DOCUMENT_SEARCH_LIMIT = 50
+
+def extract_pdf_index(source):
+    """(page_count, first-page PNG bytes, text) of a PDF given as a file path or bytes."""
+    pdf = pdfium.PdfDocument(source)
+    try:
+        page_count = len(pdf)
+        first = pdf[0]
+        image = first.render(scale=DOCUMENT_THUMBNAIL_WIDTH / first.get_width()).to_pil()
+        thumbnail = io.BytesIO()
+        image.save(thumbnail, format="PNG", optimize=True)
+        texts = []
+        for i in range(min(page_count, DOCUMENT_INDEX_MAX_PAGES)):
+            texts.append(pdf[i].get_textpage().get_text_range())
+        return page_count, thumbnail.getvalue(), "\n".join(texts)
+    finally:
+        pdf.close()
+
+def index_attachment(db_path, source=None):
+    """Extracts and upserts the mn_documents row of one attachment; never raises.
+
+    `source` is a local file or bytes; without it the PDF is downloaded from storage.
+    A PDF that can't be parsed is recorded with its error so it isn't retried on every backfill.
+    """
+    page_count = thumbnail = content = error = None
+    try:
+        if source is None:
+            source = ATTACHMENT_BACKENDS[ATTACHMENT_STORAGE_BACKEND]["download"](attachment_object_path(db_path))
+        page_count, thumbnail, content = extract_pdf_index(source)
+    except Exception as e:
+        error = str(e)
+        print(f"Could not index {db_path}: {e}")
+    try:
+        with unit_of_work() as uow:
+            execute_query("""
+                INSERT INTO mn_documents (pdf_file_path, page_count, thumbnail, content, error, indexed_at)
+                VALUES (:path, :pages, :thumb, :content, :error, :ts)
+                ON CONFLICT (pdf_file_path) DO UPDATE SET
+                    page_count = EXCLUDED.page_count, thumbnail = EXCLUDED.thumbnail,
+                    content = EXCLUDED.content, error = EXCLUDED.error, indexed_at = EXCLUDED.indexed_at
+            """, {"path": db_path, "pages": page_count, "thumb": thumbnail, "content": content,
+                  "error": error, "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, uow=uow)
+            bump_data_version('mn_documents', uow=uow)
+    except Exception as e:
+        print(f"Could not save the index of {db_path}: {e}")
+    return error is None
+
+def load_unindexed_attachments(limit):
+    """Uploaded attachments without an mn_documents row (e.g. attached before the index existed)."""
+    return load_data("""
+        SELECT DISTINCT r.pdf_file_path FROM requests r
+        LEFT JOIN mn_documents d ON d.pdf_file_path = r.pdf_file_path
+        WHERE COALESCE(r.pdf_file_path, '') <> '' AND COALESCE(r.pdf_upload_status, 'complete') = 'complete'
+          AND d.pdf_file_path IS NULL
+        LIMIT :n
+    """, {"n": limit})['pdf_file_path'].tolist()
+
+@st.cache_resource
+def document_index_worker():
+    """Starts one daemon thread per process that indexes attachments already in storage.
+
+    Serves the backfill of attachments uploaded before the index existed, so downloading and
+    parsing them never runs inside a rerun. Separate from the upload worker so a long
+    backfill doesn't hold up fresh uploads.
+    """
+    state = {"lock": threading.Lock(), "queue": queue.Queue(), "queued": set(), "indexed": 0, "failed": 0}
+
+    def _loop():
+        while True:
+            path = state["queue"].get()
+            ok = index_attachment(path)
+            with state["lock"]:
+                state["queued"].discard(path)
+                state["indexed" if ok else "failed"] += 1
+
+    threading.Thread(target=_loop, name="document-index-worker", daemon=True).start()
+    return state
+
+def enqueue_document_index(paths):
+    """Queues attachments for background indexing, skipping those already queued. Returns how many were added."""
+    state = document_index_worker()
+    with state["lock"]:
+        if not state["queued"]:
+            # A new backfill run: progress counts start over
+            state["indexed"] = state["failed"] = 0
+        added = [p for p in paths if p not in state["queued"]]
+        state["queued"].update(added)
+    for path in added:
+        state["queue"].put(path)
+    return len(added)
+
+def document_index_progress():
+    """(queued, indexed, failed) of the current backfill run in this process (no database access)."""
+    state = document_index_worker()
+    with state["lock"]:
+        return len(state["queued"]), state["indexed"], state["failed"]
+
+@st.cache_data(max_entries=20)
+def load_document_grid(versions, offset, limit):
+    """One page of indexed attachments with their thumbnails, newest MN first.
+    `versions` are the (requests, mn_documents) data versions."""
+    df = load_data("""
+        SELECT r.mn_number, r.pdf_file_path, d.page_count, d.thumbnail
+        FROM requests r
+        JOIN mn_documents d ON d.pdf_file_path = r.pdf_file_path
+        ORDER BY COALESCE(r.date_logged, '') DESC, r.id DESC
+        LIMIT :n OFFSET :o
+    """, {"n": limit, "o": offset})
+    df['thumbnail'] = df['thumbnail'].map(lambda b: bytes(b) if b is not None else None)
+    return df
+
+@st.cache_data(max_entries=100)
+def search_documents(search_text, versions):
+    """MNs whose attachment text matches `search_text` (web-search syntax), best match first,
+    with a highlighted snippet. Runs on the GIN index; no PDF is downloaded."""
+    return load_data("""
+        SELECT r.mn_number, r.pdf_file_path, d.page_count,
+               ts_headline('simple', d.content, q, 'StartSel=**, StopSel=**, MaxFragments=2, MaxWords=25') AS snippet
+        FROM mn_documents d
+        JOIN requests r ON r.pdf_file_path = d.pdf_file_path,
+             websearch_to_tsquery('simple', :q) q
+        WHERE d.search_vector @@ q
+        ORDER BY ts_rank(d.search_vector, q) DESC, r.mn_number
+        LIMIT :n
+    """, {"q": search_text, "n": DOCUMENT_SEARCH_LIMIT})
+
+# --- FX REVALUATION (point-in-time landed cost, read-only) ---
+@st.cache_data(max_entries=4)
+def load_rate_history(config_version):
+    """Every effective-dated rate row, oldest first; keyed on the exchange_config version."""
+    history = load_data("SELECT key, value, effective_from FROM exchange_rate_history ORDER BY effective_from, id")
+    history['value'] = pd.to_numeric(history['value'], errors='coerce')
+    return history
+
+@st.cache_data(max_entries=10)
+def load_open_foreign_requests(requests_version):
+    """Cost inputs of the foreign MNs that are neither completed nor rejected."""
+    return load_data("""
+        SELECT mn_number, cost_area, status, currency, foreign_spare_cost, freight_fca_charges,
+               customs_duty_rate, local_cost_wo_vat_ait, vat_ait, landed_total_cost
+        FROM requests
+        WHERE supplier_type = 'Foreign' AND COALESCE(status, '') NOT IN ('Completed', 'Rejected')
+        ORDER BY cost_area, mn_number
+    """)
+
+def rates_as_of(as_of):
+    """{currency: BDT rate} in force on `as_of` (date or YYYY-MM-DD).
+
+    Takes the latest history row per key effective on or before the date; keys with no
+    row that early fall back to their earliest recorded rate, then to the current config.
+    """
+    config = get_exchange_config()
+    history = load_rate_history(config["version"])
+    as_of = str(as_of)
+
+    in_force = history[history['effective_from'] <= as_of].groupby('key')['value'].last()
+    earliest = history.groupby('key')['value'].first()
+    values = {**config["values"], **earliest.to_dict(), **in_force.to_dict()}
+    return {"BDT": 1.0, **{currency: values[key] for currency, key in FX_RATE_KEYS.items()}}
+
+def revalue_open_requests(as_of):
+    """Recomputes landed cost of every open foreign MN at the rates in force on `as_of`.
+
+    One vectorized pass over the stored foreign cost, freight and the customs duty rate each
+    MN was submitted with. Adds revaluation_rate, revalued_landed_cost and revaluation_delta;
+    nothing is written back.
+    """
+    df = load_open_foreign_requests(get_data_versions('requests')[0]).copy()
+    cost_cols = ['foreign_spare_cost', 'freight_fca_charges', 'customs_duty_rate',
+                 'local_cost_wo_vat_ait', 'vat_ait', 'landed_total_cost']
+    for col in cost_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    df['revaluation_rate'] = df['currency'].map(rates_as_of(as_of))
+    df['revalued_landed_cost'] = (
+        (df['foreign_spare_cost'] * (1 + df['customs_duty_rate']) + df['freight_fca_charges']) * df['revaluation_rate']
+        + df['local_cost_wo_vat_ait'] + df['vat_ait']
+    ).fillna(df['landed_total_cost']) # unknown currency: keep the stored cost
+    df['revaluation_delta'] = df['revalued_landed_cost'] - df['landed_total_cost']
+    return df
+
+def calculate_revalued_status(as_of):
+    """calculate_status() with open foreign MNs at the rates in force on `as_of`.
+
+    Returns (status_df, total_budget, total_spent, remaining, revalued_requests); status_df
+    gains a 'Revaluation Delta' column. The stored landed costs are left untouched.
+    """
+    df_status, _, _, _ = calculate_status()
+    revalued = revalue_open_requests(as_of)
+    if df_status.empty:
+        return df_status, 0, 0, 0, revalued
+
+    # Open MNs are never Rejected, so their whole delta lands in utilized
+    utilized_delta = revalued.groupby('cost_area')['revaluation_delta'].sum()
+    approved_delta = revalued[revalued['status'].isin(APPROVED_STATUSES)].groupby('cost_area')['revaluation_delta'].sum()
+    df_status['Revaluation Delta'] = df_status['cost_area'].map(utilized_delta).fillna(0)
+    df_status['Total Utilized Cost'] += df_status['Revaluation Delta']
+    df_status['MN_approved'] += df_status['cost_area'].map(approved_delta).fillna(0)
+
+    df_status, total_budget, total_spent, remaining = _with_balance_columns(df_status)
+    return df_status, total_budget, total_spent, remaining, revalued
+
+# --- BUDGET IMPORT (vectorized validation + single-statement upsert) ---
+BUDGET_IMPORT_COLUMNS = ['department', 'cost_area', 'total_budget']
+
+def normalize_budget_frame(budget_df):
+    """Cleans an uploaded budget sheet without touching rows one by one.
+
+    Returns (clean_df, rejected_df). Rows are rejected when the cost area is blank or
+    the budget is not a non-negative number. A cost area listed twice keeps its last row.
+    """
+    df = budget_df[BUDGET_IMPORT_COLUMNS].copy()
+    df['department'] = df['department'].fillna('').astype(str).str.strip()
+    df['cost_area'] = df['cost_area'].fillna('').astype(str).str.strip()
+    # Accept "1,250,000" style numbers from Excel exports
+    df['total_budget'] = pd.to_numeric(df['total_budget'].astype(str).str.replace(',', '', regex=False).str.strip(),
+                                       errors='coerce')
+
+    valid = (df['cost_area'] != '') & df['total_budget'].notna() & (df['total_budget'] >= 0)
+    clean_df = df[valid].drop_duplicates(subset='cost_area', keep='last').reset_index(drop=True)
+    return clean_df, df[~valid]
+
+def bulk_upsert_budget_heads(clean_df, uow):
+    """Upserts a normalized budget frame with one multi-row statement inside `uow`.
+
+    Rows whose department and budget already match are left untouched.
+    Returns {"inserted", "updated", "unchanged"} counts.
+    """
+    if clean_df.empty:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    # unnest() turns three parallel arrays into rows, so the whole sheet is a single round trip.
+    # RETURNING only reports rows actually written; xmax = 0 marks a fresh insert.
+    written = execute_query("""
+        INSERT INTO budget_heads (cost_area, department, total_budget)
+        SELECT * FROM unnest(CAST(:areas AS text[]), CAST(:depts AS text[]), CAST(:totals AS real[]))
+        ON CONFLICT (cost_area) DO UPDATE SET
+            department = EXCLUDED.department,
+            total_budget = EXCLUDED.total_budget
+        WHERE budget_heads.department IS DISTINCT FROM EXCLUDED.department
+           OR budget_heads.total_budget IS DISTINCT FROM EXCLUDED.total_budget
+        RETURNING (xmax = 0) AS inserted
+    """, {
+        "areas": clean_df['cost_area'].tolist(),
+        "depts": clean_df['department'].tolist(),
+        "totals": clean_df['total_budget'].astype(float).tolist(),
+    }, uow=uow).scalars().all()
+    inserted = sum(1 for flag in written if flag)
+    updated = len(written) - inserted
+    return {"inserted": inserted, "updated": updated, "unchanged": len(clean_df) - len(written)}
+
+# --- ADMIN REQUEST PICKER (typeahead) ---
+REQUEST_PICKER_LIMIT = 25
+
+@st.cache_data(max_entries=500)
+def search_requests(term, requests_version, limit=REQUEST_PICKER_LIMIT):
+    """
+    Top matches for the admin request picker, newest first: MN number prefix
+    (MN numbers are upper-case, so an index-backed LIKE 'X%' is used rather than ILIKE)
+    or an exact request ID. An empty term lists the latest requests.
+    requests_version only keys the cache.
+    """
+    term = (term or "").strip().upper()
+    conditions, params = [], {"limit": limit}
+    if term:
+        conditions.append("mn_number LIKE :prefix")
+        params["prefix"] = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        if term.isdigit():
+            conditions.append("id = :id")
+            params["id"] = int(term)
+    where = f"WHERE {' OR '.join(conditions)}" if conditions else ""
+    return load_data(f"""
+        SELECT id, mn_number, status, cost_area, landed_total_cost
+        FROM requests {where}
+        ORDER BY COALESCE(date_logged, '') DESC, id DESC
+        LIMIT :limit
+    """, params)
+
+# --- REQUEST LIST: SQL filter pushdown + keyset pagination ---
+REQUEST_FILTER_COLUMNS = ['status', 'mn_category', 'cost_area', 'supplier_type']
+REQUESTS_PAGE_SIZE = 50
+
+def _request_filter_clause(filters):
+    """
+    Turns ((column, values), ...) into WHERE conditions + named params.
+    Columns are whitelisted; empty selections mean "no filter" like the old isin() chain.
+    """
+    conditions, params = [], {}
+    for column, values in filters:
+        if column not in REQUEST_FILTER_COLUMNS:
+            raise ValueError(f"Unsupported request filter column: {column}")
+        if values:
+            conditions.append(f"{column} IN :{column}")
+            params[column] = tuple(values)
+    return conditions, params
+
+@st.cache_data(max_entries=20)
+def get_request_filter_options(column, requests_version):
+    """DISTINCT values of a filterable column. requests_version only keys the cache."""
+    if column not in REQUEST_FILTER_COLUMNS:
+        raise ValueError(f"Unsupported request filter column: {column}")
+    options_df = load_data(f"SELECT DISTINCT {column} FROM requests WHERE {column} IS NOT NULL ORDER BY {column}")
+    return options_df[column].tolist()
+
+@st.cache_data(max_entries=200)
+def count_requests(filters, requests_version):
+    """Number of requests matching the filters. requests_version only keys the cache."""
+    conditions, params = _request_filter_clause(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    count_df = load_data(f"SELECT COUNT(*) AS count FROM requests {where}", params)
+    return int(count_df.iloc[0]['count'])
+
+@st.cache_data(max_entries=200)
+def load_requests_page(filters, after, requests_version, limit=REQUESTS_PAGE_SIZE):
+    """
+    One page of matching requests, newest first, keyset-paginated on (date_logged, id).
+    after is the (date_logged, id) of the last row of the previous page, or None for page 1.
+    Requests without a date_logged sort as '' (last), so the cursor never compares with NULL.
+    """
+    conditions, params = _request_filter_clause(filters)
+    if after is not None:
+        conditions.append("(COALESCE(date_logged, ''), id) < (:after_date, :after_id)")
+        # pandas hands a missing date_logged back as None or NaN
+        params.update({"after_date": after[0] if isinstance(after[0], str) else '', "after_id": after[1]})
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params["limit"] = limit
+    return load_data(f"SELECT * FROM requests {where} ORDER BY COALESCE(date_logged, '') DESC, id DESC LIMIT :limit", params)
+
+def load_filtered_requests(filters):
+    """All matching requests (for CSV export only; the page itself is paginated)."""
+    conditions, params = _request_filter_clause(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return load_data(f"SELECT * FROM requests {where} ORDER BY COALESCE(date_logged, '') DESC, id DESC", params)
+
+# --- PAGE SECTION LOADERS (inputs of the fragments, cached per data version) ---
+# Each takes the data_versions counters of the tables it reads, so a fragment rerun costs one
+# version lookup and a cache hit until somebody writes to those tables.
+@st.cache_data(max_entries=20)
+def load_tracking_table(versions):
+    """requests joined with lc_po_tracker for the LC/PO page. versions only keys the cache."""
+    return load_data("""
+        SELECT
+            r.mn_number,
+            r.mn_particulars,
+            r.cost_area,
+            r.supplier_vendor,
+            r.supplier_type,
+            r.status,
+            t.lc_po_nr,
+            t.lc_po_date,
+            t.eta_shipment_delivery,
+            t.delivery_completed,
+            t.date_of_delivery,
+            t.delay_days,
+            t.bill_tracking_id,
+            t.bill_paid
+        FROM requests r
+        INNER JOIN lc_po_tracker t ON r.mn_number = t.mn_number
+    """)
+
+@st.cache_data(max_entries=20)
+def load_saved_bills(versions):
+    """Bill headers joined with their line items. versions only keys the cache."""
+    return load_data("""
+        SELECT r.bill_no, r.bill_date, r.supplier, r.total_bill_amount, 
+               d.description, d.quantity, d.unit, d.rate, d.amount as item_amount, 
+               r.indent_no, r.grn_no, r.payment_mode, r.remarks
+        FROM indent_purchase_record r
+        JOIN indent_goods_details d ON r.bill_no = d.bill_no
+        ORDER BY r.bill_date DESC
+    """)
+
+@st.cache_data(max_entries=20)
+def load_request_statuses(requests_version):
+    """(status, mn_number) of every request, for the balance sheet drill-down."""
+    return load_data("SELECT status, mn_number FROM requests ORDER BY mn_number ASC")
+
+@st.cache_data(max_entries=200)
+def load_request_overview(mn_number, requests_version):
+    return load_data("SELECT * FROM requests WHERE mn_number = :mn", {"mn": mn_number})
+
+@st.cache_data(max_entries=20)
+def load_pending_indent_numbers(indents_version):
+    """Indents that still have unbilled items (newest first)."""
+    return load_data("SELECT DISTINCT indent_number, indent_date FROM standalone_indents WHERE status = 'Not Purchased' ORDER BY indent_date DESC")
+
+@st.cache_data(max_entries=50)
+def load_pending_indent_items(indent_numbers, indents_version):
+    """Not-yet-billed items of the given indents (a tuple), for the bill builder."""
+    return load_data("""
+        SELECT indent_id, indent_number, item_description, quantity, unit, rate 
+        FROM standalone_indents 
+        WHERE indent_number IN :indents AND status = 'Not Purchased'
+    """, {"indents": tuple(indent_numbers)})
+
+# --- MESSAGE BOARD (incremental fetch shared by every open board) ---
+MESSAGE_POLL_SEC = int(st.secrets.get("MESSAGE_POLL_SEC", 10)) # how often an open board checks for new posts
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_CACHE_SIZE = 500 # newest messages kept in process memory
+
+@st.cache_data(ttl=MESSAGE_POLL_SEC)
+def latest_message_id():
+    """Newest message id: one primary-key lookup per server process per poll interval,
+    however many boards are open."""
+    latest = load_data("SELECT MAX(id) AS id FROM messages")['id'].iloc[0]
+    return 0 if pd.isna(latest) else int(latest)
+
+@st.cache_resource
+def _message_cache():
+    """Process-wide tail of the board, oldest first; extended only by rows past last_id."""
+    return {"lock": threading.Lock(), "rows": [], "last_id": 0}
+
+def recent_messages():
+    """Newest messages (oldest first, at most MESSAGE_CACHE_SIZE).
+
+    Queries the table only when latest_message_id() moved past the cached tail, and then
+    only for the new rows; otherwise served from memory.
+    """
+    latest = latest_message_id()
+    cache = _message_cache()
+    with cache['lock']:
+        if latest > cache['last_id']:
+            if cache['last_id'] == 0:
+                new_rows = load_data("SELECT id, username, message, timestamp FROM messages ORDER BY id DESC LIMIT :n",
+                                     {"n": MESSAGE_PAGE_SIZE}).iloc[::-1]
+            else:
+                new_rows = load_data("""
+                    SELECT id, username, message, timestamp FROM messages
+                    WHERE id > :after ORDER BY id LIMIT :n
+                """, {"after": cache['last_id'], "n": MESSAGE_CACHE_SIZE})
+            cache['rows'] = (cache['rows'] + new_rows.to_dict('records'))[-MESSAGE_CACHE_SIZE:]
+            if cache['rows']:
+                cache['last_id'] = int(cache['rows'][-1]['id'])
+        return list(cache['rows'])
+
+@st.cache_data(max_entries=200)
+def load_messages_before(before_id):
+    """One page of history older than `before_id`, newest first (keyset on the primary key).
+
+    Posts are never edited or deleted, so a page stays valid for the life of the process.
+    """
+    return load_data("""
+        SELECT id, username, message, timestamp FROM messages
+        WHERE id < :before ORDER BY id DESC LIMIT :n
+    """, {"before": before_id, "n": MESSAGE_PAGE_SIZE}).to_dict('records')
+
+def _render_message(row):
+    with st.container(border=True):
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            st.markdown(f"**{row['username']}**")
+            st.caption(f"{row['timestamp']}")
+        with col2:
+            st.write(row['message'])
+
+@st.fragment(run_every=MESSAGE_POLL_SEC)
+def message_feed():
+    """Live part of the board: everything newer than this session's anchor, newest first.
+    Reruns on its own every MESSAGE_POLL_SEC; with no new posts that costs no query."""
+    rows = recent_messages()
+    anchor = st.session_state.get('mb_anchor_id')
+    # First view, or the anchor has scrolled out of the process cache: restart from the newest page
+    if anchor is None or (rows and anchor < rows[0]['id']):
+        anchor = rows[-MESSAGE_PAGE_SIZE:][0]['id'] if rows else latest_message_id() + 1
+        st.session_state['mb_anchor_id'] = anchor
+        st.session_state['mb_history_pages'] = 0
+
+    live = [row for row in rows if row['id'] >= anchor]
+    if not live and not rows:
+        st.info("No messages yet. Be the first to post!")
+    for row in reversed(live):
+        _render_message(row)
+
+@st.fragment
+def message_history():
+    """Older posts, loaded a page at a time below the live feed; never auto-refreshes."""
+    anchor = st.session_state.get('mb_anchor_id')
+    if anchor is None:
+        return
+    before, exhausted = anchor, False
+    for _ in range(st.session_state.get('mb_history_pages', 0)):
+        page = load_messages_before(before)
+        for row in page:
+            _render_message(row)
+        if len(page) < MESSAGE_PAGE_SIZE:
+            exhausted = True
+            break
+        before = page[-1]['id']
+
+    if exhausted:
+        st.caption("Beginning of the board.")
+    elif st.button("Load older messages"):
+        st.session_state['mb_history_pages'] = st.session_state.get('mb_history_pages', 0) + 1
+        st.rerun(scope="fragment")
+
+def message_board():
+    st.title("📋 Community Message Board")
+    
+    # Message Input Section
+    with st.form("message_form", clear_on_submit=True):
+        user_msg = st.text_area("Post a message for all users:", placeholder="Type your update here...")
+        submit = st.form_submit_button("Post Message")
+        
+        if submit and user_msg.strip():
+            # 1. Define the query using named placeholders (:key)
+            query = "INSERT INTO messages (username, message) VALUES (:user, :msg)"
+            
+            # 2. Define the parameters in a dictionary
+            params = {
+                "user": st.session_state['username'],
+                "msg": user_msg
+            }
+            
+            # 3. Use the centralized execution function
+            execute_query(query, params)
+            # Show it now instead of after the next poll, in every open board
+            latest_message_id.clear()
+            
+            st.success("Message posted!")
+
+    st.markdown("---")
+    # Display Messages Section
+    message_feed()
+    message_history()
+
+# --- CHANGE FEED (Postgres LISTEN/NOTIFY, one listener per server process) ---
+CHANGE_FEED_ENABLED = bool(st.secrets.get("CHANGE_FEED_ENABLED", True))
+CHANGE_FEED_POLL_SEC = int(st.secrets.get("CHANGE_FEED_POLL_SEC", 15)) # how often open sessions check for a prompt
+# Changes that get a "refresh" prompt; the message board already shows new posts by itself
+CHANGE_FEED_PROMPT_TABLES = {'requests', 'budget_heads', 'lc_po_tracker', 'exchange_config'}
+
+@st.cache_resource
+def _change_feed_state():
+    """Process-wide change counters: seq grows on every change; tables[t] holds (seq, writer session)
+    of the last change by each of the two most recent distinct writers of t."""
+    return {"lock": threading.Lock(), "seq": 0, "tables": {}, "listening": False, "error": None}
+
+def _change_feed_session_id():
+    """Id of the browser session running this code ('' on background threads)."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+def publish_change(table, session_id=None):
+    """Records a change to `table` by `session_id` (None: unknown writer) in this process and
+    drops its caches that aren't keyed on data_versions.
+
+    Called by the listener for every notification; call it directly to simulate one without Postgres.
+    """
+    state = _change_feed_state()
+    with state['lock']:
+        state['seq'] += 1
+        # The newest change by anyone but a given session is in one of the two newest entries
+        older = [entry for entry in state['tables'].get(table, []) if entry[1] != session_id]
+        state['tables'][table] = [(state['seq'], session_id)] + older[:1]
+    # Everything else is keyed on data_versions and notices the change by itself
+    if table == 'messages':
+        latest_message_id.clear()
+    elif table == 'exchange_config':
+        get_exchange_config.clear()
+
+def changes_since(seq, session_id=None):
+    """Tables changed after change counter `seq` by someone other than `session_id` (no database access)."""
+    state = _change_feed_state()
+    with state['lock']:
+        return {table for table, writers in state['tables'].items()
+                if any(last > seq for last, writer in writers if writer is None or writer != session_id)}
+
+def get_change_feed_status():
+    state = _change_feed_state()
+    with state['lock']:
+        return {k: v for k, v in state.items() if k not in ("lock", "tables")}
+
+def _open_change_feed_connection():
+    """(pool record, psycopg2 connection) in autocommit, detached from the pool for good."""
+    raw = conn_db.engine.raw_connection()
+    raw.detach() # keep this connection for good instead of holding a pool slot
+    try:
+        pg = raw.driver_connection
+        pg.autocommit = True
+    except Exception:
+        raw.close()
+        raise
+    return raw, pg
+
+@st.cache_resource
+def change_feed_listener():
+    """Starts one daemon thread per process that LISTENs on CHANGE_FEED_CHANNEL and hands
+    each notification to publish_change(). Reconnects with backoff; after a reconnect every
+    table counts as changed, since notifications sent while it was away are lost.
+    """
+    state = _change_feed_state()
+
+    def _listen(reconnect):
+        raw, pg = _open_change_feed_connection()
+        try:
+            with pg.cursor() as cur:
+                cur.execute(f"LISTEN {CHANGE_FEED_CHANNEL}")
+            with state['lock']:
+                state.update(listening=True, error=None)
+            if reconnect:
+                for table in CHANGE_FEED_TABLES:
+                    publish_change(table)
+
+            while True:
+                if select.select([pg], [], [], 60) == ([], [], []):
+                    # Idle: make sure the connection is still alive rather than silently dead
+                    with pg.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    continue
+                pg.poll()
+                while pg.notifies:
+                    # "table|writer session"; migration 5's trigger sent the table alone
+                    table, _, session_id = pg.notifies.pop(0).payload.partition('|')
+                    publish_change(table, session_id or None)
+        finally:
+            with state['lock']:
+                state['listening'] = False
+            raw.close()
+
+    def _loop():
+        backoff, reconnect = 1, False
+        while True:
+            started = time.monotonic()
+            try:
+                _listen(reconnect)
+            except Exception as e:
+                with state['lock']:
+                    state['error'] = str(e)
+                print(f"Change feed listener failed: {e}")
+            reconnect = True
+            backoff = 1 if time.monotonic() - started > 60 else min(backoff * 2, 60)
+            time.sleep(backoff)
+
+    threading.Thread(target=_loop, name="change-feed-listener", daemon=True).start()
+    return state
+
+def mark_changes_seen():
+    """Call on every full rerun: the session now shows everything up to the current counter."""
+    st.session_state['change_feed_seen'] = _change_feed_state()['seq']
+
+@st.fragment(run_every=CHANGE_FEED_POLL_SEC)
+def change_feed_notice():
+    """Prompts a refresh when another session or replica changed data since this session's last full rerun."""
+    changed = changes_since(st.session_state.get('change_feed_seen', 0), _change_feed_session_id()) & CHANGE_FEED_PROMPT_TABLES
+    if changed:
+        st.info(f"🔄 Updated elsewhere: {', '.join(sorted(changed))}")
+        if st.button("Refresh", key="change_feed_refresh"):
+            st.rerun()
+
+# --- SCHEMA BOOTSTRAP (once per process) ---
+def get_schema_version():
+    """Highest applied migration, or 0 when the database has never been initialized."""
+    try:
+        df = load_data("SELECT MAX(version) AS version FROM schema_migrations")
+    except Exception:
+        return 0 # schema_migrations doesn't exist yet
+    version = df.iloc[0]['version'] if not df.empty else None
+    return 0 if pd.isna(version) else int(version)
+
+@st.cache_resource
+def bootstrap_schema():
+    """Runs init_db() only when the database is behind LATEST_SCHEMA_VERSION.
+
+    Cached for the lifetime of the server process, so every later session skips it.
+    """
+    current = get_schema_version()
+    if current < LATEST_SCHEMA_VERSION:
+        init_db()
+        current = LATEST_SCHEMA_VERSION
+    return current
@@ -0,0 +1,255 @@
+import streamlit as st
+import pandas as pd
+from datetime import date
+from sqlalchemy.exc import IntegrityError
+
+from tracker_final.core import (
+    bump_data_version, execute_query, get_data_versions, load_data, load_pending_indent_items,
+    load_pending_indent_numbers, load_saved_bills, unit_of_work,
+)
+
+
+@st.fragment
+def bill_builder():
+    """Indent picker, item editor and bill form. Editing the table reruns only this section;
+    saving a bill reruns the whole page so the registry above refreshes."""
+    indents_version = get_data_versions('standalone_indents')[0]
+    # Only indents with 'Not Purchased' items, to avoid double billing
+    indent_list_df = load_pending_indent_numbers(indents_version)
+
+    if not indent_list_df.empty:
+        selected_indents = st.multiselect("Select Indent Number(s)", indent_list_df['indent_number'].tolist())
+    
+        if selected_indents:
+            available_items_df = load_pending_indent_items(tuple(selected_indents), indents_version)
+
+            if not available_items_df.empty:
+                st.write("Select specific items to include in this bill:")
+            
+                # Add selection column for checkbox
+                available_items_df.insert(0, "Select", True)
+            
+                # Use data_editor to allow checkbox selection and quantity/rate adjustments
+                edited_items_df = st.data_editor(
+                    available_items_df,
+                    column_config={
+                        "Select": st.column_config.CheckboxColumn("Select", default=True),
+                        "indent_id": None, # Hide ID from user
+                        "indent_number": st.column_config.TextColumn("Indent No", disabled=True),
+                        "item_description": "Item Name",
+                        "quantity": st.column_config.NumberColumn("Qty", min_value=0.0),
+                        "rate": st.column_config.NumberColumn("Rate", min_value=0.0),
+                    },
+                    disabled=["indent_number"],
+                    hide_index=True,
+                    key="multi_bill_editor"
+                )
+
+                # Filter for only selected items
+                selected_items_to_bill = edited_items_df[edited_items_df["Select"] == True].copy()
+            
+                if not selected_items_to_bill.empty:
+                    # Calculate totals
+                    selected_items_to_bill['amount'] = selected_items_to_bill['quantity'] * selected_items_to_bill['rate']
+                    total_bill_val = selected_items_to_bill['amount'].sum()
+                    total_bill_amt = float(total_bill_val)
+                    st.info(f"Total Amount for Selected Items: {total_bill_amt:,.2f} BDT")
+                
+                    # 4.3 Bill Header Information Form
+                    with st.form("multi_indent_bill_form"):
+                        c1, c2, c3 = st.columns(3)
+                        new_bill_no = c1.text_input("Bill No *")
+                        new_bill_date = c2.date_input("Bill Date", value=date.today())
+                        new_supplier = c3.text_input("Supplier Name *")
+                    
+                        c4, c5 = st.columns(2)
+                        new_grn = c4.text_input("GRN No (Optional)")
+                        new_pay_mode = c5.selectbox("Payment Mode", ["Cash", "Bank Transfer", "Cheque", "Credit"])
+                        new_remarks = st.text_area("Remarks")
+
+                        submit_bill = st.form_submit_button("Generate & Save Bill")
+
+                    if submit_bill:
+                        if not new_bill_no or not new_supplier:
+                            st.error("Bill No and Supplier Name are required.")
+                        else:
+                            try:
+                                # Create a summary string of indents for the header
+                                indents_summary = ", ".join(selected_indents)
+                            
+                                # 1. Insert into indent_purchase_record (Header)
+                                header_query = """
+                                    INSERT INTO indent_purchase_record 
+                                    (bill_no, indent_no, grn_no, supplier, bill_date, payment_mode, total_bill_amount, remarks)
+                                    VALUES (:bill, :indents, :grn, :supp, :b_date, :pay_mode, :total, :rem)
+                                """
+                                header_params = {
+                                    "bill": new_bill_no,
+                                    "indents": indents_summary,
+                                    "grn": new_grn,
+                                    "supp": new_supplier,
+                                    "b_date": str(new_bill_date),
+                                    "pay_mode": new_pay_mode,
+                                    "total": total_bill_amt,
+                                    "rem": new_remarks
+                                }
+                                bill_items = selected_items_to_bill[['indent_id', 'item_description', 'quantity', 'unit', 'rate', 'amount']]
+                                indent_ids = [int(i) for i in bill_items['indent_id']]
+
+                                # Header, line items and registry updates are three statements in one transaction,
+                                # whatever the number of lines; any failure rolls all of them back.
+                                with unit_of_work() as uow:
+                                    execute_query(header_query, header_params, uow=uow)
+                                
+                                    # 2. Insert all Line Items in one multi-row statement
+                                    execute_query("""
+                                        INSERT INTO indent_goods_details 
+                                        (bill_no, description, quantity, unit, rate, amount)
+                                        SELECT :bill, d, q, u, r, a
+                                        FROM unnest(CAST(:descs AS text[]), CAST(:qtys AS real[]), CAST(:units AS text[]),
+                                                    CAST(:rates AS real[]), CAST(:amts AS real[])) AS t(d, q, u, r, a)
+                                    """, {
+                                        "bill": new_bill_no,
+                                        "descs": bill_items['item_description'].tolist(),
+                                        "qtys": bill_items['quantity'].astype(float).tolist(),
+                                        "units": bill_items['unit'].tolist(),
+                                        "rates": bill_items['rate'].astype(float).tolist(),
+                                        "amts": bill_items['amount'].astype(float).tolist(),
+                                    }, uow=uow)
+                                
+                                    # 3. Mark every billed item Purchased at once; an item billed meanwhile
+                                    # by another session won't match and aborts the whole bill
+                                    marked = execute_query("""
+                                        UPDATE standalone_indents SET status = 'Purchased'
+                                        WHERE indent_id = ANY(:ids) AND status = 'Not Purchased'
+                                    """, {"ids": indent_ids}, uow=uow).rowcount
+                                    if marked != len(indent_ids):
+                                        raise ValueError(f"{len(indent_ids) - marked} selected item(s) were already billed by someone else. "
+                                                         "Reload the page and select again.")
+                                    bump_data_version('standalone_indents', uow=uow)
+                                    bump_data_version('indent_purchase_record', uow=uow)
+                            
+                                st.success(f"Bill {new_bill_no} successfully generated for Indents: {indents_summary}")
+                                st.rerun()
+
+                            except IntegrityError:
+                                # Duplicate bill_no (primary key); the unit of work already rolled back
+                                st.error("Error: This Bill No already exists.")
+                            except ValueError as e:
+                                st.error(f"Error: {e}")
+                            except Exception as e:
+                                st.error(f"Unexpected Error: {e}")
+                else:
+                    st.warning("Please select at least one item from the table above to generate a bill.")
+        else:
+            st.info("Please select one or more Indent Numbers from the list.")
+    else:
+        st.warning("No pending (Not Purchased) indents found in the registry.")
+
+@st.fragment
+def saved_bills():
+    """Saved bills with search and filters; filter changes rerun only this section."""
+    bills_df = load_saved_bills(get_data_versions('indent_purchase_record'))
+
+    if not bills_df.empty:
+        # Filters
+        f1, f2, f3 = st.columns(3)
+        with f1: search = st.text_input("Search Bill/Indent No")
+        with f2: sel_sup = st.multiselect("Filter Supplier", bills_df['supplier'].unique())
+        with f3: sel_pay = st.multiselect("Filter Payment Mode", bills_df['payment_mode'].unique())
+    
+        # Apply Filters
+        filtered = bills_df.copy()
+        if search: filtered = filtered[filtered['bill_no'].astype(str).str.contains(search) | filtered['indent_no'].astype(str).str.contains(search)]
+        if sel_sup: filtered = filtered[filtered['supplier'].isin(sel_sup)]
+        if sel_pay: filtered = filtered[filtered['payment_mode'].isin(sel_pay)]
+    
+        st.dataframe(filtered, width='stretch', hide_index=True)
+    
+        # --- ADDED: TOTALS SECTION ---
+        st.markdown("### 📊 Summary of Filtered Bills")
+    
+        # Since the JOIN creates duplicate rows for the header amount (one per item), 
+        # we must group by bill_no to get the unique bill totals.
+        unique_bills = filtered.drop_duplicates(subset=['bill_no'])
+    
+        total_recorded = unique_bills['total_bill_amount'].sum()
+        cash_total = unique_bills[unique_bills['payment_mode'] == 'Cash']['total_bill_amount'].sum()
+        cheque_total = unique_bills[unique_bills['payment_mode'] == 'Cheque']['total_bill_amount'].sum()
+
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Total Recorded Amount", f"{total_recorded:,.2f} BDT")
+        c2.metric("Total Cash Amount", f"{cash_total:,.2f} BDT")
+        c3.metric("Total Cheque Amount", f"{cheque_total:,.2f} BDT")
+
+st.title("🛒 Indent & Purchase Management")
+
+# Initialize Session States for Billing
+if 'temp_bill_items' not in st.session_state:
+    st.session_state['temp_bill_items'] = []
+
+# 1. Add Items to Indent Registry
+st.header("1. Add Items to Indent Registry")
+with st.form("add_indent_registry_form", clear_on_submit=True):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        reg_indent_no = st.text_input("Indent Number *")
+        reg_date = st.date_input("Indent Date", value=date.today())
+    with col2:
+        reg_desc = st.text_input("Goods Description *")
+        reg_unit = st.selectbox("Unit", ["Nos", "Sets", "Kg", "Ltr", "Mtr", "Pkt", "Roll", "Box"])
+    with col3:
+        reg_qty = st.number_input("Quantity *", min_value=0.0, step=1.0)
+        reg_rate = st.number_input("Rate (Optional)", min_value=0.0, step=0.01)
+
+    if st.form_submit_button("Add to Indent Registry", type="primary"):
+        if reg_indent_no and reg_desc and reg_qty > 0:
+            # 1. Update SQL to use named placeholders
+            query = '''INSERT INTO standalone_indents 
+                           (indent_number, indent_date, item_description, quantity, unit, rate, total_amount, status) 
+                           VALUES (:no, :date, :desc, :qty, :unit, :rate, :total, :status)'''
+            
+            # 2. Map variables to a dictionary
+            params = {
+                "no": reg_indent_no,
+                "date": reg_date.strftime("%Y-%m-%d"),
+                "desc": reg_desc,
+                "qty": reg_qty,
+                "unit": reg_unit,
+                "rate": reg_rate,
+                "total": reg_qty * reg_rate,
+                "status": "Not Purchased"
+            }
+            
+            with unit_of_work() as uow:
+                execute_query(query, params, uow=uow)
+                bump_data_version('standalone_indents', uow=uow)
+            
+            st.success(f"Added item '{reg_desc}' to Indent {reg_indent_no}")
+            st.rerun()            
+
+# 4. Indent Registry Status
+st.header("4. Indent Registry Status")
+registry_df = load_data("SELECT indent_id, indent_number, indent_date, item_description, quantity, unit, rate, status FROM standalone_indents ORDER BY indent_id DESC")
+st.dataframe(registry_df, width='stretch', hide_index=True)
+
+st.markdown("---")
+
+# 3. Generate Bill from Indent Registry
+st.header("3. Generate Bill from Indent Registry")
+
+bill_builder()
+
+# C. Temporary Display Section
+if st.session_state['temp_bill_items']:
+    st.subheader("📋 Temporary Display (Items to be Billed)")
+    temp_df = pd.DataFrame(st.session_state['temp_bill_items'])
+    st.table(temp_df[['desc', 'qty', 'unit', 'rate', 'amount']])
+    total_val = temp_df['amount'].sum()
+    st.metric("Calculated Bill Total", f"{total_val:,.2f} BDT")
+
+st.markdown("---")
+
+# 5. View Saved Bills
+st.header("5. View Saved Bills")
+saved_bills()
@@ -0,0 +1,3 @@
+from tracker_final.core import message_board
+
+message_board()
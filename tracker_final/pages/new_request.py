@@ -0,0 +1,199 @@
+# --- TAB 2: NEW REQUEST (MN) ---
+import streamlit as st
+import re
+from datetime import datetime
+
+from tracker_final.core import (
+    apply_request_delta, discard_spooled_attachment, enqueue_attachment_upload,
+    exchange_config_changed, get_exchange_config, load_data, spool_attachment, submit_mn_request,
+)
+
+st.session_state['show_mn_details'] = False
+st.session_state['show_admin_edit'] = False
+st.session_state['edit_mn_id'] = None
+st.title("📝 Create New Management Notification")
+
+budgets = load_data("SELECT cost_area, department FROM budget_heads")
+exchange_config = get_exchange_config()
+fx_rates = exchange_config['fx_rates']
+customs_duty_pct = exchange_config['customs_duty_pct']
+
+if budgets.empty:
+    st.warning("No Department or Cost Area data found. Please set up budgets first.")
+    st.stop()
+
+departments = sorted(budgets['department'].unique().tolist())
+
+# Display persistent success/error message
+if st.session_state['mn_submission_result']:
+    if st.session_state['mn_submission_status'] == 'success':
+        st.success(st.session_state['mn_submission_result'])
+    elif st.session_state['mn_submission_status'] == 'error':
+        st.error(st.session_state['mn_submission_result'])
+    # We no longer clear it immediately here to allow it to be visible after the rerun
+
+st.subheader("1. General & Categorization")
+col1, col2, col3 = st.columns(3)
+with col1:
+    mn_issue_date = st.date_input("MN Issue Date *", value=datetime.now())
+    requester = st.text_input("Requester Name", value=st.session_state['username'], disabled=True)
+    mn_category = st.selectbox("MN Category *", ["R&M (Repair & Maintenance)", "C&C (Chemicals & Consumables)"], index=None)
+with col2:
+    mn_no = st.text_input("MN Number * (Format: DHK/001/2026)")
+    selected_department = st.selectbox("Department *", departments, index=None, key="mn_dept_select")
+with col3:
+    cost_areas_filtered = []
+    if selected_department:
+        cost_areas_filtered = budgets[budgets['department'] == selected_department]['cost_area'].unique().tolist()
+    area = st.selectbox("Cost Area *", sorted(cost_areas_filtered), index=None, key="mn_area_select")
+    location = st.text_input("Location *")
+mn_particulars = st.text_area("MN Particulars/Detailed Description of Work * (Max 200 chars)", max_chars=200)
+
+st.subheader("2. Financial & Procurement Details")
+col_supp, col_curr, col_cost1, col_cost2 = st.columns(4)
+with col_supp:
+    supplier_vendor = st.text_input("Supplier/Vendor *")
+    supplier_type = st.selectbox("Supplier Type *", ["Local", "Foreign"], index=None)
+with col_curr:
+    currency = st.selectbox("Currency *", list(fx_rates.keys()), index=0)
+    st.info(f"Rate: 1 {currency} = **{fx_rates.get(currency):.4f} BDT**")
+with col_cost1:
+    foreign_spare_cost = st.number_input("Foreign Spare Cost *", min_value=0.0, format="%.2f", value=0.0, key="mn_fsc")
+    freight_fca_charges = st.number_input("Freight & FCA Charges *", min_value=0.0, format="%.2f", value=0.0, key="mn_ffc")
+with col_cost2:
+    local_cost_wo_vat_ait = st.number_input("Local Cost without VAT & AIT *", min_value=0.0, format="%.2f", value=0.0, key="mn_lcwa")
+    vat_ait = st.number_input("VAT & AIT *", min_value=0.0, format="%.2f", value=0.0, key="mn_va")
+    exchange_rate = fx_rates.get(currency, 1.0)
+    landed_total_cost = (
+        (foreign_spare_cost * (1 + customs_duty_pct)) + 
+        freight_fca_charges
+    ) * exchange_rate + local_cost_wo_vat_ait + vat_ait
+    st.markdown(f"**Calculated Landed Total Cost (BDT):**")
+    st.markdown(f"## {landed_total_cost:,.2f}")
+    st.caption(f"*(Duty Rate: {customs_duty_pct:.2%} | {currency} Rate: {exchange_rate:.4f} BDT)*")
+
+st.subheader("3. Timeline & Remarks")
+col_date, col_remarks = st.columns([1, 2])
+with col_date:
+    date_sent_ho = st.date_input("Date of Sending To HO *", value=datetime.now())
+with col_remarks:
+    plant_remarks = st.text_area("Plant Remarks/Notes")
+
+st.subheader("4. Document Attachment")
+uploaded_file = st.file_uploader("Upload PDF Copy * (Max 1MB)", type=["pdf"])
+
+# 2. Size Validation logic (1MB = 1,048,576 bytes)
+MAX_FILE_SIZE = 1 * 1024 * 1024 
+
+if uploaded_file:
+    if uploaded_file.size > MAX_FILE_SIZE:
+        st.error("⚠️ File is too large! Please upload a PDF smaller than 1MB.")
+        uploaded_file = None # Reset the file variable
+
+with st.form("mn_submission_form"):
+    st.markdown("*Fields marked with a * or ** are mandatory.")
+    st.markdown("---")
+    submitted = st.form_submit_button("Submit New Request", type="primary")
+    if st.session_state['mn_submission_result']:
+        if st.session_state['mn_submission_status'] == 'success':
+            st.success(st.session_state['mn_submission_result'])
+        elif st.session_state['mn_submission_status'] == 'error':
+            st.error(st.session_state['mn_submission_result'])   
+            # Ensure validation:
+    if submitted:
+        # 1. MN Number Regex Validation
+        # Pattern explains: 3 uppercase letters / 3 digits / 4 digits
+        mn_pattern = r"^[A-Z]{3}/\d{3}/\d{4}$"
+        
+        if not mn_no:
+            st.error("MN Number is required.")
+        elif not re.match(mn_pattern, mn_no):
+            st.error("❌ Invalid MN Number format! Please use 'AAA/000/0000' (e.g., DHK/001/2026).")
+        else:
+            # 2. Existing validation for other fields
+            required_fields = [
+                (mn_no, "MN Number"), (mn_category, "MN Category"), (selected_department, "Department"), 
+                (area, "Cost Area"), (location, "Location"), (supplier_vendor, "Supplier/Vendor"), 
+                (supplier_type, "Supplier Type"), (currency, "Currency"), (mn_particulars, "MN Particulars"), 
+                (date_sent_ho, "Date of Sending To HO")
+            ]
+        missing_fields = [label for value, label in required_fields if value is None or (isinstance(value, str) and not value.strip())]
+        
+        # Reset previous result on new attempt
+        st.session_state['mn_submission_result'] = None
+        st.session_state['mn_submission_status'] = None
+
+        if missing_fields or landed_total_cost <= 0:
+            error_msg = "⚠️ Please fill in all mandatory fields (*)."
+            if missing_fields: error_msg += f" Missing: {', '.join(missing_fields)}."
+            if landed_total_cost <= 0: error_msg += " Landed Total Cost must be greater than 0."
+            st.session_state['mn_submission_result'] = error_msg
+            st.session_state['mn_submission_status'] = 'error'
+            st.rerun()
+        
+        # The preview used cached rates; don't save a landed cost computed from rates that changed since
+        if exchange_config_changed(exchange_config):
+            get_exchange_config.clear()
+            st.session_state['mn_submission_result'] = ("⚠️ Exchange rates or customs duty were updated while you were filling the form. "
+                                                        "Check the recalculated Landed Total Cost and submit again.")
+            st.session_state['mn_submission_status'] = 'error'
+            st.rerun()
+
+        # The PDF goes to the local spool now and to storage in the background after the insert.
+        # This submission holds the spool file until it's queued or discarded below.
+        pdf_file_path = spool_attachment(uploaded_file) if uploaded_file else None
+
+        # Duplicate check, budget check (under a lock on the cost area's budget head), insert,
+        # audit entry and version bump all happen in one database call
+        request = {
+            "mn_number": mn_no,
+            "mn_issue_date": mn_issue_date.strftime("%Y-%m-%d"),
+            "date_logged": datetime.now().strftime("%Y-%m-%d"),
+            "requester": requester,
+            "cost_area": area,
+            "estimated_cost": landed_total_cost,
+            "status": "Pending",
+            "mn_particulars": mn_particulars,
+            "mn_category": mn_category,
+            "department": selected_department,
+            "location": location,
+            "supplier_vendor": supplier_vendor,
+            "supplier_type": supplier_type,
+            "currency": currency,
+            "foreign_spare_cost": foreign_spare_cost,
+            "freight_fca_charges": freight_fca_charges,
+            "customs_duty_rate": customs_duty_pct,
+            "local_cost_wo_vat_ait": local_cost_wo_vat_ait,
+            "vat_ait": vat_ait,
+            "landed_total_cost": landed_total_cost,
+            "date_sent_ho": date_sent_ho.strftime("%Y-%m-%d"),
+            "plant_remarks": plant_remarks,
+            "pdf_file_path": pdf_file_path,
+            "pdf_upload_status": "pending" if pdf_file_path else None,
+        }
+        outcome = None
+        try:
+            outcome, curr_remaining, requests_version = submit_mn_request(request)
+        finally:
+            if pdf_file_path:
+                if outcome == 'submitted':
+                    enqueue_attachment_upload(pdf_file_path)
+                else:
+                    discard_spooled_attachment(pdf_file_path)
+
+        if outcome == 'duplicate':
+            st.session_state['mn_submission_result'] = f"❌ Duplicate Submission Error: MN {mn_no} already exists."
+            st.session_state['mn_submission_status'] = 'error'
+            st.rerun()
+        if outcome == 'over_budget':
+            st.session_state['mn_submission_result'] = f"⚠️ Budget Exceeded! '{area}' only has **{curr_remaining:,.2f} BDT** remaining."
+            st.session_state['mn_submission_status'] = 'error'
+            st.rerun()
+        if outcome == 'no_budget':
+            st.session_state['mn_submission_result'] = f"⚠️ No budget is set up for cost area '{area}'."
+            st.session_state['mn_submission_status'] = 'error'
+            st.rerun()
+        apply_request_delta(None, (area, landed_total_cost, "Pending"), requests_version)
+        st.session_state['mn_submission_result'] = f"✅ MN Request Successful: Request **{mn_no}** submitted successfully!"
+        st.session_state['mn_submission_status'] = 'success'
+        st.rerun()
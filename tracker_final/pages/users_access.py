@@ -0,0 +1,159 @@
+# --- TAB 6: USERS & ACCESS CONTROL ---
+import streamlit as st
+from datetime import date
+
+from tracker_final.core import (
+    execute_query, get_exchange_config, load_data, load_rate_history, log_event, make_hashes,
+    save_exchange_config, unit_of_work,
+)
+
+st.session_state['mn_submission_result'] = None
+st.session_state['mn_submission_status'] = None
+st.session_state['show_mn_details'] = False
+st.session_state['show_admin_edit'] = False
+st.session_state['edit_mn_id'] = None
+
+if st.session_state['role'] != 'administrator':
+    st.error("🚫 Access Denied: Only Administrators can access User and Configuration settings.")
+    st.stop()
+    
+st.title("👥 User Creation & Access Management")
+
+# --- CONFIGURATION FORM ---
+st.header("1. Financial Configuration (Admin Only)")
+config_dict = get_exchange_config()['values']
+
+with st.form("financial_config_form"):
+    st.subheader("Currency Exchange Rates (1 Unit = BDT)")
+    col_rates = st.columns(5)
+    # Fetch existing rates or use defaults
+    usd = col_rates[0].number_input("USD Rate", value=config_dict.get('USD_rate', 110.00), min_value=0.01)
+    eur = col_rates[1].number_input("EUR Rate", value=config_dict.get('EUR_rate', 120.00), min_value=0.01)
+    gbp = col_rates[2].number_input("GBP Rate", value=config_dict.get('GBP_rate', 130.00), min_value=0.01)
+    inr = col_rates[3].number_input("INR Rate", value=config_dict.get('INR_rate', 1.50), min_value=0.01)
+    other = col_rates[4].number_input("Other Currency Rate", value=config_dict.get('OTHER_rate', 100.00), min_value=0.01)
+
+    st.subheader("Customs Duty")
+    # Customs Duty is in percentage (0.05 for 5%)
+    duty = st.number_input("Customs Duty % (e.g., input 0.05 for 5%)", 
+                           value=config_dict.get('CustomsDuty_pct', 0.05), 
+                           min_value=0.00, 
+                           max_value=1.0,
+                           format="%.4f")
+
+    # Back-dating corrects the history used by the FX revaluation; new MNs always use the saved rates
+    effective_from = st.date_input("Effective From", value=date.today(), max_value=date.today())
+    
+    if st.form_submit_button("Save Configuration"):
+        updates = {
+            'USD_rate': usd, 'EUR_rate': eur, 'GBP_rate': gbp, 
+            'INR_rate': inr, 'OTHER_rate': other, 'CustomsDuty_pct': duty
+        }
+        
+        # One batched upsert for all six keys, the version stamp and the audit entry, in one transaction
+        with unit_of_work() as uow:
+            save_exchange_config(updates, uow, effective_from=effective_from)
+            
+            # LOGGING CONFIG UPDATE
+            log_event("CONFIG_UPDATE", f"Updated Financial Config: Duty={duty:.2%}, Rates=USD:{usd}, EUR:{eur}, GBP:{gbp}, INR:{inr}, OTHER:{other}, effective {effective_from}.", uow=uow)
+        # Every page reads the rates from this cache; drop it only once the new values are committed
+        get_exchange_config.clear()
+        st.success("Financial configuration updated successfully!")
+        st.rerun()
+
+with st.expander("Exchange Rate History"):
+    rate_history = load_rate_history(get_exchange_config()['version'])
+    st.dataframe(rate_history.iloc[::-1], width='stretch', hide_index=True)
+
+st.markdown("---")
+st.header("2. Create New User")
+with st.form("new_user_form"):
+    col1, col2 = st.columns(2)
+    with col1:
+        new_username = st.text_input("Username")
+        new_password = st.text_input("Password", type='password')
+    with col2:
+        new_role = st.selectbox("Role", ["user", "super", "administrator"])
+
+    if st.form_submit_button("Create User"):
+        if new_username and new_password:
+            try:
+                hashed_pwd = make_hashes(new_password)
+                
+                # 1. Update to named parameters (:username, etc.)
+                query = "INSERT INTO users (username, password_hash, role) VALUES (:user, :pw, :role)"
+                
+                # 2. Pass parameters as a dictionary
+                params = {
+                    "user": new_username,
+                    "pw": hashed_pwd,
+                    "role": new_role
+                }
+                
+                with unit_of_work() as uow:
+                    execute_query(query, params, uow=uow)
+                    
+                    # LOGGING USER CREATION
+                    log_event("USER_CREATE", f"Created new user '{new_username}' with role '{new_role}'.", uow=uow)
+                st.success(f"User **{new_username}** created with role **{new_role}**.")
+                st.rerun() 
+                
+            except Exception as e:
+                # 3. Use a generic exception or check for 'UniqueViolation' 
+                # to replace sqlite3.IntegrityError
+                if "unique constraint" in str(e).lower() or "already exists" in str(e).lower():
+                    st.error("Username already exists. Please choose a different name.")
+                else:
+                    st.error(f"Database error: {e}")
+        else:
+            st.warning("Username and Password cannot be empty.")
+
+st.subheader("3. Existing Users")
+users_df = load_data("SELECT id, username, role FROM users")
+st.dataframe(users_df, width='stretch')
+st.subheader("Manage Registered Users")
+
+# Load users from the database
+users_df = load_data("SELECT id, username, role FROM users ORDER BY username")
+
+if not users_df.empty:
+    # Create a selection box to choose a user to delete
+    # Exclude the currently logged-in admin to prevent self-deletion
+    other_users = users_df[users_df['username'] != st.session_state['username']]
+
+    if not other_users.empty:
+        user_to_delete = st.selectbox(
+            "Select User to Remove", 
+            options=other_users['username'].tolist(),
+            help="Warning: This action cannot be undone."
+        )
+        if st.button("❌ Delete Selected User", type="primary"):
+            # 1. Update SQL to use :username (PostgreSQL/SQLAlchemy style)
+            # 2. Pass the parameter as a dictionary
+            query = "DELETE FROM users WHERE username = :user"
+            params = {"user": user_to_delete}
+            
+            with unit_of_work() as uow:
+                execute_query(query, params, uow=uow)
+            
+                # Log the event
+                log_event("USER_DELETE", f"Admin deleted user: {user_to_delete}", uow=uow)
+        
+            st.success(f"User '{user_to_delete}' has been permanently removed.")
+            st.rerun() # Refresh the page to update the user list
+    else:
+        st.info("No other users available to delete.")
+    
+    # Display the current user table for reference
+    st.dataframe(users_df[['username', 'role']], width='stretch', hide_index=True)
+else:
+    st.warning("No users found in the database.")
+
+# Download CSV option
+st.download_button(
+    label="Download User List CSV",
+    data=users_df.to_csv(index=False).encode('utf-8'),
+    file_name='user_list.csv',
+    mime='text/csv',
+    key='download_users'
+)
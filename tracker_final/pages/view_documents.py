@@ -0,0 +1,142 @@
+# --- VIEW DOCUMENTS PAGE LOGIC ---
+import streamlit as st
+import os
+
+from tracker_final.core import (
+    ATTACHMENT_LOCAL_ROOT, ATTACHMENT_STORAGE_BACKEND, attachment_object_path, document_index_progress,
+    enqueue_document_index, get_data_versions, get_signed_urls, load_data, load_document_grid,
+    load_unindexed_attachments, search_documents,
+)
+
+DOCUMENT_GRID_PAGE_SIZE = 24
+DOCUMENT_GRID_COLUMNS = 6
+BACKFILL_BATCH_SIZE = 20
+
+if 'vd_selected_mn' not in st.session_state:
+    st.session_state.vd_selected_mn = "---"
+
+def show_document(mn_number):
+    st.session_state.vd_selected_mn = mn_number
+
+@st.fragment(run_every=2)
+def backfill_progress():
+    """Progress of the background indexing run; reruns the page once it finishes so the grid picks it up."""
+    queued, indexed, failed = document_index_progress()
+    if queued:
+        st.session_state['vd_backfill_running'] = True
+        done = indexed + failed
+        st.progress(done / (done + queued), text=f"Indexing older attachments in the background: {done} of {done + queued} done")
+    elif st.session_state.get('vd_backfill_running'):
+        st.session_state['vd_backfill_running'] = False
+        st.rerun()
+    elif indexed or failed:
+        st.caption(f"Indexed {indexed} older attachment(s)" + (f"; {failed} could not be read." if failed else "."))
+
+st.title("MN Document Viewer")
+
+# 1. Fetch records that have an attachment
+try:
+    # We filter for paths that aren't empty
+    docs_df = load_data("SELECT mn_number, pdf_file_path, pdf_upload_status FROM requests WHERE pdf_file_path IS NOT NULL AND pdf_file_path != ''")
+
+    if docs_df.empty:
+        st.info("No documents found in the database. Please ensure you have uploaded a PDF during the MN Request process.")
+    else:
+        st.success(f"Found {len(docs_df)} documents.")
+        docs_df['pdf_upload_status'] = docs_df['pdf_upload_status'].fillna('complete')
+        docs_df['object_path'] = docs_df['pdf_file_path'].map(attachment_object_path)
+        index_versions = get_data_versions('requests', 'mn_documents')
+
+        # 2. Full-text search across attachments (served by the document index, no downloads)
+        search_text = st.text_input("🔍 Search inside documents", placeholder="e.g. compressor overhaul")
+        if search_text.strip():
+            hits = search_documents(search_text.strip(), index_versions)
+            if hits.empty:
+                st.info("No attachment mentions that.")
+            for hit in hits.to_dict('records'):
+                with st.container(border=True):
+                    col_hit, col_open = st.columns([5, 1])
+                    col_hit.markdown(f"**{hit['mn_number']}** · {hit['page_count']} page(s)")
+                    col_hit.caption(hit['snippet'].replace("\n", " "))
+                    col_open.button("View", key=f"vd_hit_{hit['mn_number']}", on_click=show_document, args=(hit['mn_number'],))
+
+        # 3. Thumbnail grid of indexed attachments, a page at a time
+        with st.expander("🖼️ Browse thumbnails", expanded=not search_text.strip()):
+            grid_page = st.number_input("Page", min_value=1, value=1, step=1, key="vd_grid_page")
+            grid = load_document_grid(index_versions, (grid_page - 1) * DOCUMENT_GRID_PAGE_SIZE, DOCUMENT_GRID_PAGE_SIZE)
+            if grid.empty:
+                st.caption("No indexed documents on this page.")
+            records = grid.to_dict('records')
+            for start in range(0, len(records), DOCUMENT_GRID_COLUMNS):
+                for col, doc in zip(st.columns(DOCUMENT_GRID_COLUMNS), records[start:start + DOCUMENT_GRID_COLUMNS]):
+                    with col:
+                        if doc['thumbnail']:
+                            st.image(doc['thumbnail'], width='stretch')
+                        else:
+                            st.caption("(no preview)")
+                        st.button(doc['mn_number'], key=f"vd_thumb_{doc['mn_number']}", on_click=show_document,
+                                  args=(doc['mn_number'],), width='stretch')
+
+            # Downloading and parsing runs on the index worker; the page only polls its progress
+            if not document_index_progress()[0]:
+                unindexed = load_unindexed_attachments(BACKFILL_BATCH_SIZE)
+                if unindexed and st.button(f"Index {len(unindexed)} older attachment(s)"):
+                    enqueue_document_index(unindexed)
+                    st.session_state['vd_backfill_running'] = True
+            backfill_progress()
+
+        # 4. Sign every uploaded document in batched storage calls; reruns and reopening
+        # a PDF reuse the cached URLs until they get close to expiry
+        ready_paths = docs_df.loc[docs_df['pdf_upload_status'] == 'complete', 'object_path'].tolist()
+        try:
+            signed_urls = get_signed_urls(ready_paths)
+        except Exception as e:
+            st.error(f"Error retrieving links from storage: {e}")
+            signed_urls = {}
+        docs_df['document_link'] = docs_df['object_path'].map(signed_urls)
+
+        with st.expander("📄 All documents"):
+            st.dataframe(
+                docs_df[['mn_number', 'pdf_upload_status', 'document_link']],
+                column_config={
+                    "mn_number": "MN Number",
+                    "pdf_upload_status": "Upload",
+                    "document_link": st.column_config.LinkColumn("Document", display_text="Open"),
+                },
+                width='stretch', hide_index=True
+            )
+
+        mn_list = docs_df['mn_number'].tolist()
+        if st.session_state.vd_selected_mn not in mn_list:
+            st.session_state.vd_selected_mn = "---"
+        selected_mn = st.selectbox("Select MN Number to View PDF", ["---"] + mn_list, key="vd_selected_mn")
+
+        if selected_mn != "---":
+            doc = docs_df[docs_df['mn_number'] == selected_mn].iloc[0]
+            if doc['pdf_upload_status'] == 'pending':
+                st.info("⏫ This document is still being uploaded. Check back in a moment.")
+                st.stop()
+            if doc['pdf_upload_status'] == 'failed':
+                st.error("The upload of this document failed after several attempts. Please re-attach it.")
+                st.stop()
+
+            if ATTACHMENT_STORAGE_BACKEND == "local":
+                # Browsers won't embed file:// URLs in the page; hand the file over instead
+                with open(os.path.join(ATTACHMENT_LOCAL_ROOT, doc['object_path']), "rb") as f:
+                    st.download_button("Download PDF", f.read(), file_name=f"{selected_mn.replace('/', '_')}.pdf", mime="application/pdf")
+                st.stop()
+
+            signed_url = signed_urls.get(doc['object_path'])
+            if signed_url:
+                # 5. Embed the PDF using an iframe
+                # Added 'type="application/pdf"' to help browsers recognize the content
+                pdf_display = f'<iframe src="{signed_url}" width="100%" height="800px" style="border:none;" type="application/pdf"></iframe>'
+                st.markdown(pdf_display, unsafe_allow_html=True)
+
+                # Provide a fallback link
+                st.markdown(f"**[🔗 Open Document in New Tab]({signed_url})**")
+            else:
+                st.error(f"Could not generate access link. Check if file exists at: {doc['object_path']}")
+
+except Exception as e:
+    st.error(f"Database Error: Could not fetch document list. Error: {e}")
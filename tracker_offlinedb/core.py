@@ -0,0 +1,1387 @@
+# Shared config, DB access and helpers for app_v17_offlinedb.py and the scripts in tracker_offlinedb/pages.
+# Python imports this once per server process; pages import what they need from here.
+import streamlit as st
+import pandas as pd
+import sqlite3
+from datetime import datetime, date, timedelta
+import hashlib 
+import re
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# --- CONFIGURATION & DATABASE SETUP ---
+DB_FILE = "tracker_2026.db"
+
+# --- SQLITE CONNECTION MANAGER ---
+# WAL lets plant users keep reading while one session writes; writers still take turns,
+# so they wait up to SQLITE_BUSY_TIMEOUT_MS and then retry a few times before giving up.
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_LOCK_RETRIES = 4
+SQLITE_POOL_MAX_IDLE = 8
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",    # safe with WAL; fsync only at checkpoints
+    "PRAGMA cache_size = -20000",     # ~20 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",   # 256 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+    f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+]
+
+def _open_connection():
+    # isolation_level=None: autocommit for reads, unit_of_work() issues BEGIN IMMEDIATE itself.
+    # check_same_thread=False because pooled connections move between rerun threads
+    # (only ever one thread at a time).
+    conn = sqlite3.connect(DB_FILE, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                           isolation_level=None, check_same_thread=False)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+@st.cache_resource
+def _connection_pool():
+    """Idle connections handed back by finished threads, shared across sessions."""
+    return {"lock": threading.Lock(), "idle": []}
+
+def _release_connection(pool, conn):
+    if conn.in_transaction:
+        conn.rollback()
+    with pool["lock"]:
+        if len(pool["idle"]) < SQLITE_POOL_MAX_IDLE:
+            pool["idle"].append(conn)
+            return
+    conn.close()
+
+_thread_conn = threading.local()
+
+def get_connection():
+    """The calling thread's connection, reused for every query of the rerun.
+
+    Streamlit runs each rerun on its own thread, so the connection goes back to the pool
+    when that thread is gone and the next rerun picks it up again, pragmas already applied.
+    """
+    conn = getattr(_thread_conn, "conn", None)
+    if conn is None:
+        pool = _connection_pool()
+        with pool["lock"]:
+            conn = pool["idle"].pop() if pool["idle"] else None
+        if conn is None:
+            conn = _open_connection()
+        _thread_conn.conn = conn
+        weakref.finalize(threading.current_thread(), _release_connection, pool, conn)
+    return conn
+
+def _is_lock_error(e):
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+def with_lock_retry(fn, *args, **kwargs):
+    """Calls fn, retrying with backoff while another writer still holds the database lock."""
+    for attempt in range(SQLITE_LOCK_RETRIES):
+        try:
+            return fn(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not _is_lock_error(e) or attempt == SQLITE_LOCK_RETRIES - 1:
+                raise
+            time.sleep(0.1 * 2 ** attempt)
+
+# --- SECURITY FUNCTIONS (Basic Hashing) ---
+def make_hashes(password):
+    """Returns a SHA256 hash of the password."""
+    return hashlib.sha256(str.encode(password)).hexdigest()
+
+def check_hashes(password, hashed_text):
+    """Checks if the entered password matches the stored hash."""
+    return make_hashes(password) == hashed_text
+
+# --- SCHEMA MIGRATIONS ---
+def _add_column_if_missing(c, table, column, definition):
+    """SQLite has no ADD COLUMN IF NOT EXISTS."""
+    existing = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+    if column not in existing:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+# Tables shipped by tracker_sync.py between this build and the Supabase build.
+# Tables without a natural business key get a sync_key instead of their AUTOINCREMENT id;
+# the listed columns seed the key of existing rows (same recipe as the Supabase build).
+SYNC_TRACKED_TABLES = {
+    'requests': None, # sync_key added by migration 7 (see _add_request_sync_key)
+    'lc_po_tracker': None,
+    'standalone_indents': ['indent_id', 'indent_number', 'item_description', 'indent_date'],
+    'event_log': ['id', 'timestamp', 'username', 'action_type'],
+}
+# UTC, millisecond precision; identical text format to the Supabase build so values sort the same.
+SYNC_TIMESTAMP_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+def _install_sync_tracking(c):
+    """Row-version/origin columns, backfill and stamping triggers for every synced table."""
+    c.execute("""CREATE TABLE IF NOT EXISTS sync_site (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    site_id TEXT NOT NULL,
+                    applying INTEGER NOT NULL DEFAULT 0,
+                    row_version_counter INTEGER NOT NULL DEFAULT 0
+                )""")
+    c.execute("INSERT OR IGNORE INTO sync_site (id, site_id) VALUES (1, 'lite-' || lower(hex(randomblob(6))))")
+    c.execute("""CREATE TABLE IF NOT EXISTS sync_state (
+                    peer_site_id TEXT,
+                    table_name TEXT,
+                    last_version INTEGER NOT NULL DEFAULT 0,
+                    synced_at TEXT,
+                    PRIMARY KEY (peer_site_id, table_name)
+                )""")
+    site = "(SELECT site_id FROM sync_site WHERE id = 1)"
+
+    for table, key_columns in SYNC_TRACKED_TABLES.items():
+        _add_column_if_missing(c, table, 'row_version', 'INTEGER')
+        _add_column_if_missing(c, table, 'updated_at', 'TEXT')
+        _add_column_if_missing(c, table, 'origin', 'TEXT')
+        c.execute(f"""UPDATE {table} SET row_version = (SELECT row_version_counter FROM sync_site WHERE id = 1) + rowid,
+                          updated_at = {SYNC_TIMESTAMP_SQL}, origin = {site}
+                      WHERE row_version IS NULL""")
+        c.execute(f"""UPDATE sync_site SET row_version_counter =
+                          MAX(row_version_counter, (SELECT COALESCE(MAX(row_version), 0) FROM {table})) WHERE id = 1""")
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_row_version ON {table} (row_version)")
+
+        if key_columns:
+            _add_sync_key(c, table, key_columns)
+        _create_sync_stamp_triggers(c, table, with_sync_key=bool(key_columns))
+
+def _add_sync_key(c, table, key_columns):
+    """sync_key column, seeded for existing rows from key_columns, with a unique index."""
+    # SQLite has no md5(); hash in Python so existing rows match the Supabase backfill
+    _add_column_if_missing(c, table, 'sync_key', 'TEXT')
+    rows = c.execute(f"SELECT rowid, {', '.join(key_columns)} FROM {table}").fetchall()
+    c.executemany(f"UPDATE {table} SET sync_key = ? WHERE rowid = ?",
+                  [(hashlib.md5('|'.join('' if v is None else str(v) for v in row[1:]).encode()).hexdigest(), row[0])
+                   for row in rows])
+    c.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{table}_sync_key ON {table} (sync_key)")
+
+def _create_sync_stamp_triggers(c, table, with_sync_key):
+    """Triggers stamping row_version/origin/updated_at (and a new row's sync_key) on every write."""
+    site = "(SELECT site_id FROM sync_site WHERE id = 1)"
+    applying = "(SELECT applying FROM sync_site WHERE id = 1)"
+    key_assignment = ", sync_key = COALESCE(NEW.sync_key, lower(hex(randomblob(16))))" if with_sync_key else ""
+
+    # tracker_sync.py sets sync_site.applying while it writes rows received from the other
+    # build, so their origin/updated_at survive; every local write is stamped here.
+    # The UPDATE trigger skips the stamping UPDATE issued by the INSERT trigger itself.
+    for event, condition in (('INSERT', ''), ('UPDATE', 'WHEN NEW.row_version IS OLD.row_version')):
+        c.execute(f"""CREATE TRIGGER IF NOT EXISTS sync_stamp_{table}_{event.lower()} AFTER {event} ON {table} {condition}
+                      BEGIN
+                          UPDATE sync_site SET row_version_counter = row_version_counter + 1 WHERE id = 1;
+                          UPDATE {table} SET
+                              row_version = (SELECT row_version_counter FROM sync_site WHERE id = 1),
+                              origin = CASE WHEN {applying} THEN NEW.origin ELSE {site} END,
+                              updated_at = CASE WHEN {applying} THEN NEW.updated_at ELSE {SYNC_TIMESTAMP_SQL} END
+                              {key_assignment}
+                          WHERE rowid = NEW.rowid;
+                      END""")
+
+def _add_request_sync_key(c):
+    """Gives requests a sync_key: mn_number can be edited, so it can't identify a row across stores."""
+    # Seeding the keys must not restamp the rows, so the triggers are dropped around it and
+    # come back with the sync_key assignment for new requests
+    for event in ('insert', 'update'):
+        c.execute(f"DROP TRIGGER IF EXISTS sync_stamp_requests_{event}")
+    _add_sync_key(c, 'requests', ['mn_number'])
+    _create_sync_stamp_triggers(c, 'requests', with_sync_key=True)
+
+# Append-only list of (version, description, steps). A step is SQL text or a callable
+# taking the cursor. Never edit an entry that has shipped; add a new version instead.
+MIGRATIONS = [
+    (1, "standalone_indents.status column for pre-status databases", [
+        lambda c: _add_column_if_missing(c, 'standalone_indents', 'status', "TEXT DEFAULT 'Not Purchased'"),
+    ]),
+    (2, "Indexes for request filters, budget aggregation, indent billing and the event log", [
+        # Status filters / LC-PO stage lookup
+        "CREATE INDEX IF NOT EXISTS idx_requests_status ON requests (status)",
+        # Covering index for the per-cost-area budget aggregation
+        "CREATE INDEX IF NOT EXISTS idx_requests_cost_area_status ON requests (cost_area, status, landed_total_cost)",
+        # Keyset pagination / newest-first listing
+        "CREATE INDEX IF NOT EXISTS idx_requests_date_logged_id ON requests (date_logged DESC, id DESC)",
+        # Bill builder: pending indents by number
+        "CREATE INDEX IF NOT EXISTS idx_standalone_indents_status_number ON standalone_indents (status, indent_number)",
+        # Saved bills join on the line items
+        "CREATE INDEX IF NOT EXISTS idx_indent_goods_details_bill_no ON indent_goods_details (bill_no)",
+        "CREATE INDEX IF NOT EXISTS idx_event_log_timestamp ON event_log (timestamp DESC)",
+        # requests.mn_number (UNIQUE) and lc_po_tracker.mn_number (PRIMARY KEY) already
+        # index both sides of the LC/PO join; mn_number prefix search uses the UNIQUE index.
+    ]),
+    (3, "Change tracking for offline <-> Supabase sync (see tracker_sync.py)", [
+        _install_sync_tracking,
+    ]),
+    (4, "Effective-dated exchange rate history for FX revaluation", [
+        """CREATE TABLE IF NOT EXISTS exchange_rate_history (
+            id INTEGER PRIMARY KEY,
+            key TEXT NOT NULL,
+            value REAL NOT NULL,
+            effective_from TEXT NOT NULL,
+            created_by TEXT,
+            created_at TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_exchange_rate_history_key_effective ON exchange_rate_history (key, effective_from, id)",
+        # The rates in force today are the only ones known; treat them as in force since the start
+        """INSERT INTO exchange_rate_history (key, value, effective_from, created_by, created_at)
+           SELECT key, value, '1900-01-01', 'migration', datetime('now', 'localtime')
+           FROM exchange_config""",
+    ]),
+    (5, "event_log indexes for keyset pagination and server-side filters", [
+        # (timestamp, id) is the page key; the per-user/per-action variants serve the filtered pages
+        "CREATE INDEX IF NOT EXISTS idx_event_log_timestamp_id ON event_log (timestamp DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_event_log_timestamp",
+        "CREATE INDEX IF NOT EXISTS idx_event_log_username_timestamp ON event_log (username, timestamp DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_event_log_action_timestamp ON event_log (action_type, timestamp DESC, id DESC)",
+    ]),
+    (6, "sync_state.last_xid: transaction-id half of the watermarks tracker_sync.py keeps for Supabase", [
+        # SQLite stamps row_version under the write lock, so its own rows commit in order and
+        # keep last_xid = 0; only watermarks of a Postgres peer use it
+        lambda c: _add_column_if_missing(c, 'sync_state', 'last_xid', 'INTEGER NOT NULL DEFAULT 0'),
+    ]),
+    (7, "requests.sync_key: sync requests on an id that survives MN number edits", [
+        _add_request_sync_key,
+    ]),
+    (8, "sync_conflicts: rows tracker_sync.py could not apply without breaking a UNIQUE column", [
+        """CREATE TABLE IF NOT EXISTS sync_conflicts (
+            peer_site_id TEXT,
+            table_name TEXT,
+            row_key TEXT,
+            detail TEXT,
+            detected_at TEXT,
+            PRIMARY KEY (peer_site_id, table_name, row_key)
+        )""",
+    ]),
+    (9, "Request list index on COALESCE(date_logged, ''), id for keyset pages over undated requests", [
+        # Requests are listed newest first with a NULL date_logged sorting as '', which the
+        # plain (date_logged, id) index can't serve
+        "CREATE INDEX IF NOT EXISTS idx_requests_date_logged_key_id ON requests ((COALESCE(date_logged, '')) DESC, id DESC)",
+        "DROP INDEX IF EXISTS idx_requests_date_logged_id",
+    ]),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations():
+    """Applies pending MIGRATIONS in order, one transaction per version."""
+    execute_query('''CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TEXT
+                )''')
+
+    for version, description, steps in MIGRATIONS:
+        # unit_of_work() takes the write lock up front (BEGIN IMMEDIATE), so two sessions
+        # can't apply the same version
+        with unit_of_work() as c:
+            if c.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone() is None:
+                for step in steps:
+                    if callable(step):
+                        step(c)
+                    else:
+                        c.execute(step)
+                c.execute("INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                          (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+def init_db():
+    """Initializes the SQL database with all necessary tables."""
+    conn = get_connection()
+    c = conn.cursor()
+    with_lock_retry(c.execute, "BEGIN IMMEDIATE")
+    
+    # Table 1: Budget Configuration (Cost Center)
+    c.execute('''CREATE TABLE IF NOT EXISTS budget_heads (
+                    id INTEGER PRIMARY KEY,
+                    department TEXT,
+                    cost_area TEXT UNIQUE,
+                    total_budget REAL
+                )''')
+    
+    # Table 2: Maintenance Notifications / Requests 
+    c.execute('''CREATE TABLE IF NOT EXISTS requests (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    mn_number TEXT UNIQUE, 
+                    mn_issue_date TEXT, 
+                    date_logged TEXT,
+                    requester TEXT,
+                    cost_area TEXT,
+                    estimated_cost REAL,
+                    status TEXT DEFAULT 'Pending',
+                    mn_particulars TEXT,
+                    mn_category TEXT,
+                    department TEXT,
+                    location TEXT,
+                    supplier_vendor TEXT,
+                    supplier_type TEXT,
+                    currency TEXT,
+                    foreign_spare_cost REAL,
+                    freight_fca_charges REAL,
+                    customs_duty_rate REAL, 
+                    local_cost_wo_vat_ait REAL,
+                    vat_ait REAL,
+                    landed_total_cost REAL,
+                    date_sent_ho TEXT,
+                    plant_remarks TEXT,
+                    FOREIGN KEY(cost_area) REFERENCES budget_heads(cost_area)
+                )''')
+                
+    # Table 3: User Management
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT UNIQUE,
+                    password_hash TEXT,
+                    role TEXT -- 'administrator' or 'user'
+                )''')
+
+    # Table 4: Message Board
+    c.execute('''CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT,
+                    message TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )''')
+
+    # Table 4: Exchange Rate and Duty Configuration
+    c.execute('''CREATE TABLE IF NOT EXISTS exchange_config (
+                    key TEXT PRIMARY KEY,
+                    value REAL
+                )''')
+                
+    # Table 5: Event Log
+    c.execute('''CREATE TABLE IF NOT EXISTS event_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    username TEXT,
+                    action_type TEXT, -- e.g., 'BUDGET_UPDATE', 'USER_CREATE', 'MN_STATUS_CHANGE'
+                    description TEXT
+                )''')
+                
+    # Table 6: LC/PO and Payment Tracker
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS lc_po_tracker (
+            mn_number TEXT PRIMARY KEY,
+            lc_po_nr TEXT,
+            lc_po_date TEXT,
+            eta_shipment_delivery TEXT,
+            delivery_completed TEXT, -- 'Yes' or 'No'
+            date_of_delivery TEXT,
+            commercial_store_remarks TEXT,
+            delay_days INTEGER,
+            bill_submitted_vendor TEXT, -- Local Supplier Only field
+            bill_tracking_id TEXT,
+            date_bill_submit_acc TEXT,
+            date_bill_submit_ho TEXT,
+            bill_paid TEXT, -- 'Yes' or 'No'
+            actual_lc_costing REAL, -- Foreign Supplier Only field
+            FOREIGN KEY(mn_number) REFERENCES requests(mn_number)
+        )
+    ''')
+
+    # Table 7: Indent Purchase Record (Main Record Header)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS indent_purchase_record (
+            bill_no TEXT PRIMARY KEY, 
+            indent_no TEXT,
+            grn_no TEXT,
+            supplier TEXT,
+            bill_date TEXT,
+            payment_mode TEXT,
+            total_bill_amount REAL,
+            remarks TEXT
+        )
+    ''')
+
+    # Table 8: Indent Goods Details (Line Items)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS indent_goods_details (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bill_no TEXT, -- Stores the bill_no from the header table
+            description TEXT,
+            quantity REAL,
+            unit TEXT,
+            rate REAL,
+            amount REAL,
+            FOREIGN KEY(bill_no) REFERENCES indent_purchase_record(bill_no)
+        )
+    ''')
+
+    # Updated Table 9: Independent Indent Records (Standalone)
+    c.execute('''CREATE TABLE IF NOT EXISTS standalone_indents (
+                    indent_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    indent_number TEXT,
+                    item_description TEXT,
+                    quantity REAL,
+                    unit TEXT,
+                    rate REAL,
+                    total_amount REAL,
+                    indent_date TEXT,
+                    supplier TEXT,
+                    status TEXT DEFAULT 'Not Purchased'
+                )''')
+
+    # Table 10: Data Versions (per-table change counters used as cache keys)
+    c.execute('''CREATE TABLE IF NOT EXISTS data_versions (
+                    table_name TEXT PRIMARY KEY,
+                    version INTEGER DEFAULT 0
+                )''')
+    
+    # Initialize default configuration values if not present
+    for key, value in DEFAULT_EXCHANGE_CONFIG.items():
+        c.execute("INSERT OR IGNORE INTO exchange_config (key, value) VALUES (?, ?)", (key, value))
+    
+    conn.commit()
+
+    # Create a default admin user
+    admin_username = 'admin'
+    admin_new_password_hash = make_hashes("admin1024098")
+
+    c.execute("SELECT COUNT(*) FROM users WHERE username=?", (admin_username,))
+    if c.fetchone()[0] == 0:
+        c.execute("INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)", 
+                (admin_username, admin_new_password_hash, 'administrator'))
+    else:
+        c.execute("UPDATE users SET password_hash = ? WHERE username = ?",
+                (admin_new_password_hash, admin_username))
+                
+    conn.commit()
+
+    # Versioned schema changes (columns, indexes) on top of the base tables
+    run_migrations()
+
+# --- QUERY INSTRUMENTATION (per-rerun timings for the Diagnostics page) ---
+QUERY_STATS_MAX_RERUNS = 500
+QUERY_METRICS_PORT = None # e.g. 9464 to expose /metrics for Prometheus
+N_PLUS_ONE_THRESHOLD = 5 # same statement more than this many times in one rerun
+_SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+def query_fingerprint(query):
+    """Statement text with literals replaced by ?, IN lists collapsed and whitespace squeezed.
+
+    Returns (short_id, normalized_sql); the id is stable across processes.
+    """
+    sql = _SQL_LITERAL_RE.sub('?', query)
+    sql = _SQL_IN_LIST_RE.sub('IN (...)', sql)
+    sql = ' '.join(sql.split())
+    return hashlib.md5(sql.encode()).hexdigest()[:10], sql
+
+def _value_shape(value):
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+def params_shape(params):
+    """Types (not values) of the bound parameters, e.g. "{id:int, tables:tuple[3]}" or "25 x (str, int)"."""
+    if not params:
+        return ""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}:{_value_shape(v)}" for k, v in sorted(params.items())) + "}"
+    if isinstance(params, list) and isinstance(params[0], (dict, list, tuple)):
+        return f"{len(params)} x {params_shape(params[0])}"
+    return "(" + ", ".join(_value_shape(v) for v in params) + ")"
+
+@st.cache_resource
+def _query_stats_store():
+    """Process-wide: the last QUERY_STATS_MAX_RERUNS reruns plus lifetime counters per (page, kind, statement)."""
+    return {"lock": threading.Lock(), "reruns": deque(maxlen=QUERY_STATS_MAX_RERUNS),
+            "totals": {}, "rerun_totals": {}, "statements": {}}
+
+# This module is imported once and shared by every session, but each rerun runs on its own
+# script thread, so the rerun being recorded is tracked per thread
+_rerun_local = threading.local()
+
+def _current_rerun():
+    return getattr(_rerun_local, "rerun", None)
+
+def begin_rerun_stats():
+    """Opens the query record for this rerun. Call once, near the top of the entrypoint."""
+    rerun = {"started_at": datetime.now(), "page": None, "user": None, "queries": []}
+    _rerun_local.rerun = rerun
+    store = _query_stats_store()
+    with store["lock"]:
+        store["reruns"].append(rerun)
+
+def set_rerun_page(page_name, username=None):
+    """Attributes this rerun (and the queries it issues from now on) to a page."""
+    rerun = _current_rerun()
+    if rerun is None:
+        return
+    rerun["page"], rerun["user"] = page_name, username
+    store = _query_stats_store()
+    with store["lock"]:
+        store["rerun_totals"][page_name] = store["rerun_totals"].get(page_name, 0) + 1
+
+def _frame_bytes(df):
+    # Shallow: string columns count their pointers only, which is cheap and enough to compare pages
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+def record_query(query, params, kind, rows, nbytes, elapsed_sec):
+    """Called by load_data/execute_query after every statement."""
+    fp_id, fp_sql = query_fingerprint(query)
+    rerun = _current_rerun()
+    page = (rerun or {}).get("page") or "(startup)"
+    store = _query_stats_store()
+    with store["lock"]:
+        store["statements"].setdefault(fp_id, fp_sql)
+        totals = store["totals"].setdefault((page, kind, fp_id), [0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += elapsed_sec
+        totals[2] += max(rows, 0)
+        totals[3] += nbytes
+    if rerun is not None:
+        rerun["queries"].append({
+            "fingerprint": fp_id, "kind": kind, "params": params_shape(params),
+            "rows": rows, "bytes": nbytes, "ms": elapsed_sec * 1000,
+        })
+
+def get_query_stats():
+    """Flattened copy of the buffered reruns: (reruns_df, queries_df)."""
+    store = _query_stats_store()
+    with store["lock"]:
+        reruns = list(store["reruns"])
+        statements = dict(store["statements"])
+    rerun_rows, query_rows = [], []
+    for n, rerun in enumerate(reruns):
+        queries = list(rerun["queries"])
+        rerun_rows.append({
+            "rerun": n, "started_at": rerun["started_at"], "page": rerun["page"] or "(startup)",
+            "user": rerun["user"], "queries": len(queries),
+            "db_ms": sum(q["ms"] for q in queries), "rows": sum(max(q["rows"], 0) for q in queries),
+            "bytes": sum(q["bytes"] for q in queries),
+        })
+        for q in queries:
+            query_rows.append({"rerun": n, "page": rerun["page"] or "(startup)",
+                               "statement": statements.get(q["fingerprint"], ""), **q})
+    return pd.DataFrame(rerun_rows), pd.DataFrame(query_rows)
+
+def reset_query_stats():
+    """Drops the buffered reruns. Lifetime counters (the Prometheus export) are kept."""
+    store = _query_stats_store()
+    with store["lock"]:
+        store["reruns"].clear()
+
+def _prom_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def render_prometheus_metrics(store=None):
+    """Lifetime query counters in the Prometheus text exposition format."""
+    store = store or _query_stats_store()
+    with store["lock"]:
+        totals = dict((k, list(v)) for k, v in store["totals"].items())
+        rerun_totals = dict(store["rerun_totals"])
+        statements = dict(store["statements"])
+
+    lines = []
+    for i, (name, help_text) in enumerate([
+        ("tracker_queries_total", "Statements run through load_data/execute_query."),
+        ("tracker_query_duration_seconds_total", "Wall time spent in those statements."),
+        ("tracker_query_rows_total", "Rows returned (reads) or affected (writes)."),
+        ("tracker_query_bytes_total", "Shallow in-memory size of the frames returned."),
+    ]):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (page, kind, fp_id), values in sorted(totals.items()):
+            lines.append(f'{name}{{page="{_prom_label(page)}",kind="{kind}",fingerprint="{fp_id}"}} {round(values[i], 6)}')
+    lines += ["# HELP tracker_reruns_total Script reruns per page.", "# TYPE tracker_reruns_total counter"]
+    for page, count in sorted(rerun_totals.items()):
+        lines.append(f'tracker_reruns_total{{page="{_prom_label(page)}"}} {count}')
+    lines += ["# HELP tracker_query_statement_info Normalized statement text for each fingerprint.",
+              "# TYPE tracker_query_statement_info gauge"]
+    for fp_id, sql in sorted(statements.items()):
+        lines.append(f'tracker_query_statement_info{{fingerprint="{fp_id}",statement="{_prom_label(sql[:200])}"}} 1')
+    return "\n".join(lines) + "\n"
+
+@st.cache_resource
+def query_metrics_exporter(port):
+    """Serves render_prometheus_metrics() at http://<host>:<port>/metrics from a daemon thread."""
+    store = _query_stats_store()
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus_metrics(store).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="query-metrics-exporter", daemon=True).start()
+    return server
+
+# --- DATABASE INTERACTION FUNCTIONS ---
+def load_data(query, params=()):
+    conn = get_connection()
+    started = time.perf_counter()
+    if params:
+        df = with_lock_retry(pd.read_sql, query, conn, params=params)
+    else:
+        df = with_lock_retry(pd.read_sql, query, conn)
+    record_query(query, params, "read", len(df), _frame_bytes(df), time.perf_counter() - started)
+    return df
+
+@contextmanager
+def unit_of_work():
+    """One transaction on the thread's connection for several writes.
+
+    Yields a cursor; commits when the block exits normally and rolls back if anything raises.
+    BEGIN IMMEDIATE takes the write lock up front so the transaction can't hit SQLITE_BUSY
+    halfway through. A nested unit_of_work() joins the outer transaction.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn.cursor()
+        return
+    c = conn.cursor()
+    with_lock_retry(c.execute, "BEGIN IMMEDIATE")
+    try:
+        yield c
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def execute_query(query, params=(), uow=None):
+    """Runs one write inside `uow` when given, otherwise in its own transaction. Returns the cursor."""
+    started = time.perf_counter()
+    if uow is not None:
+        cursor = uow.execute(query, params)
+    else:
+        with unit_of_work() as c:
+            cursor = c.execute(query, params)
+    record_query(query, params, "write", cursor.rowcount, 0, time.perf_counter() - started)
+    return cursor
+
+# --- LOGGING FUNCTIONS ---
+def log_event(action_type, description, uow=None):
+    username = st.session_state.get('username', 'SYSTEM')
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    execute_query('''INSERT INTO event_log (timestamp, username, action_type, description)
+                     VALUES (?, ?, ?, ?)''', 
+                     (timestamp, username, action_type, description), uow=uow)
+    
+# --- EVENT LOG: server-side filters + keyset pagination ---
+EVENT_LOG_FILTER_COLUMNS = ['username', 'action_type']
+EVENT_LOG_PAGE_SIZE = 100
+
+def _event_log_filter_clause(filters):
+    """
+    Turns an event log filter dict into WHERE conditions + positional params. Keys (all optional):
+    date_from/date_to (dates, inclusive), username/action_type (tuples of values) and
+    search (substring of the description, case-insensitive).
+    """
+    conditions, params = [], []
+    if filters.get('date_from'):
+        conditions.append("timestamp >= ?")
+        params.append(str(filters['date_from']))
+    if filters.get('date_to'):
+        # Timestamps are 'YYYY-MM-DD HH:MM:SS' text, so the day after is the exclusive bound
+        conditions.append("timestamp < ?")
+        params.append(str(filters['date_to'] + timedelta(days=1)))
+    for column in EVENT_LOG_FILTER_COLUMNS:
+        if filters.get(column):
+            conditions.append(f"{column} IN ({', '.join(['?'] * len(filters[column]))})")
+            params.extend(filters[column])
+    if filters.get('search'):
+        # SQLite's LIKE is case-insensitive for ASCII; escape wildcards typed by the user
+        conditions.append("description LIKE ? ESCAPE '\\'")
+        params.append("%" + re.sub(r"([\\%_])", r"\\\1", filters['search']) + "%")
+    return conditions, params
+
+@st.cache_data(ttl=300)
+def get_event_log_filter_options(column):
+    """DISTINCT values of a filterable event log column (refreshed every 5 minutes)."""
+    if column not in EVENT_LOG_FILTER_COLUMNS:
+        raise ValueError(f"Unsupported event log filter column: {column}")
+    options_df = load_data(f"SELECT DISTINCT {column} FROM event_log WHERE {column} IS NOT NULL ORDER BY {column}")
+    return options_df[column].tolist()
+
+def load_event_log_page(filters, after, limit=EVENT_LOG_PAGE_SIZE):
+    """
+    One page of matching events, newest first, keyset-paginated on (timestamp, id).
+    after is the (timestamp, id) of the last row of the previous page, or None for page 1.
+    Fetches one extra row to tell whether another page follows: returns (page_df, has_more).
+    """
+    conditions, params = _event_log_filter_clause(filters)
+    if after is not None:
+        conditions.append("(timestamp, id) < (?, ?)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit + 1)
+    page_df = load_data(f"""
+        SELECT id, timestamp, username, action_type, description FROM event_log {where}
+        ORDER BY timestamp DESC, id DESC LIMIT ?
+    """, tuple(params))
+    return page_df.head(limit), len(page_df) > limit
+
+def load_filtered_event_logs(filters):
+    """All matching events (for CSV export only; the page itself is paginated)."""
+    conditions, params = _event_log_filter_clause(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return load_data(f"SELECT timestamp, username, action_type, description FROM event_log {where} ORDER BY timestamp DESC, id DESC", tuple(params))
+
+# --- DATA VERSIONING (per-table change counters) ---
+def bump_data_version(table_name, uow=None):
+    """Increments the change counter of a table and returns the new version.
+
+    Pass the write's unit of work so the bump commits (or rolls back) with it.
+    """
+    if uow is None:
+        with unit_of_work() as c:
+            return bump_data_version(table_name, uow=c)
+    uow.execute("""INSERT INTO data_versions (table_name, version) VALUES (?, 1)
+                   ON CONFLICT(table_name) DO UPDATE SET version = version + 1""", (table_name,))
+    uow.execute("SELECT version FROM data_versions WHERE table_name = ?", (table_name,))
+    return int(uow.fetchone()[0])
+
+def get_data_versions(*table_names):
+    """Returns the current change counter of each table (0 if never written)."""
+    placeholders = ', '.join(['?'] * len(table_names))
+    versions_df = load_data(f"SELECT table_name, version FROM data_versions WHERE table_name IN ({placeholders})",
+                            tuple(table_names))
+    versions = dict(zip(versions_df['table_name'], versions_df['version']))
+    return tuple(int(versions.get(t, 0)) for t in table_names)
+
+# --- EXCHANGE RATE & DUTY CONFIGURATION (cached, invalidated on save) ---
+DEFAULT_EXCHANGE_CONFIG = {
+    'USD_rate': 110.00, 'EUR_rate': 120.00, 'GBP_rate': 130.00, 
+    'INR_rate': 1.50, 'OTHER_rate': 100.00, 'CustomsDuty_pct': 0.05
+}
+# Currency shown in the MN forms -> exchange_config key of its BDT rate
+FX_RATE_KEYS = {"USD": 'USD_rate', "EUR": 'EUR_rate', "GBP": 'GBP_rate', "INR": 'INR_rate', "Other": 'OTHER_rate'}
+EXCHANGE_CONFIG_TTL_SEC = 300 # backstop only; saving the config form clears the cache at once
+
+@st.cache_data(ttl=EXCHANGE_CONFIG_TTL_SEC)
+def get_exchange_config():
+    """Exchange rates and customs duty, with defaults for missing keys.
+
+    Returns {"version", "values", "fx_rates", "customs_duty_pct"}; version is the
+    data_versions stamp of exchange_config the values were read at. Served from the
+    cache on every rerun, so the landed-cost preview never touches the database.
+    Call save_exchange_config() to change the values.
+    """
+    version = get_data_versions('exchange_config')[0]
+    config_df = load_data("SELECT key, value FROM exchange_config")
+    values = {**DEFAULT_EXCHANGE_CONFIG, **{k: float(v) for k, v in zip(config_df['key'], config_df['value'])}}
+    return {
+        "version": version,
+        "values": values,
+        "fx_rates": {"BDT": 1.0, **{currency: values[key] for currency, key in FX_RATE_KEYS.items()}},
+        "customs_duty_pct": values['CustomsDuty_pct'],
+    }
+
+def exchange_config_changed(config):
+    """True if someone saved new rates after `config` was read (one tiny query; use on submit, not per keystroke)."""
+    return get_data_versions('exchange_config')[0] != config["version"]
+
+def save_exchange_config(values, uow, effective_from=None):
+    """Upserts the given keys, records them in exchange_rate_history as in force from
+    `effective_from` (default today) and stamps a new config version inside `uow`.
+
+    Call get_exchange_config.clear() after the unit of work commits.
+    """
+    uow.executemany("INSERT OR REPLACE INTO exchange_config (key, value) VALUES (?, ?)", list(values.items()))
+    effective_from = str(effective_from or date.today())
+    username = st.session_state.get('username', 'SYSTEM')
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    uow.executemany("INSERT INTO exchange_rate_history (key, value, effective_from, created_by, created_at) VALUES (?, ?, ?, ?, ?)",
+                    [(k, v, effective_from, username, timestamp) for k, v in values.items()])
+    return bump_data_version('exchange_config', uow=uow)
+
+# --- CORE FUNCTION: Budget vs. Cost Status Calculation ---
+# Must match the status lists used in the aggregation SQL below
+APPROVED_STATUSES = ["Finance Approved", "PO Issued", "Completed"]
+
+def _compute_budget_status():
+    """
+    Returns ((budget_heads_version, requests_version), (status_df, total_budget, total_spent, remaining)).
+    The change counters are read by the same statement as the sums, so a snapshot that
+    already includes a write is always labelled with that write's version.
+    """
+    # Aggregate in SQL so only one summed row per cost area crosses the wire,
+    # instead of every (wide) request row.
+    # Total Utilized (MN_issued) = all except Rejected
+    # MN_approved = Finance Approved, PO Issued, Completed
+    merged = load_data("""
+        SELECT v.budget_heads_version, v.requests_version,
+               b.id, b.department, b.cost_area, b.total_budget,
+               COALESCE(s.utilized, 0) AS utilized,
+               COALESCE(s.approved, 0) AS approved
+        FROM (
+            SELECT COALESCE((SELECT version FROM data_versions WHERE table_name = 'budget_heads'), 0) AS budget_heads_version,
+                   COALESCE((SELECT version FROM data_versions WHERE table_name = 'requests'), 0) AS requests_version
+        ) v
+        LEFT JOIN (
+            budget_heads b
+            LEFT JOIN (
+                SELECT cost_area,
+                       SUM(CASE WHEN COALESCE(status, '') <> 'Rejected' THEN landed_total_cost ELSE 0 END) AS utilized,
+                       SUM(CASE WHEN status IN ('Finance Approved', 'PO Issued', 'Completed') THEN landed_total_cost ELSE 0 END) AS approved
+                FROM requests
+                GROUP BY cost_area
+            ) s ON s.cost_area = b.cost_area
+        ) ON TRUE
+        ORDER BY b.id
+    """)
+    version = (int(merged['budget_heads_version'].iloc[0]), int(merged['requests_version'].iloc[0]))
+    # No budget heads: the versions row comes back alone, with NULL budget columns
+    merged = merged[merged['id'].notna()].drop(columns=['budget_heads_version', 'requests_version'])
+
+    if merged.empty:
+        return version, (pd.DataFrame(), 0, 0, 0)
+
+    merged.rename(columns={'utilized': 'Total Utilized Cost', 'approved': 'MN_approved'}, inplace=True)
+    for col in ['total_budget', 'Total Utilized Cost', 'MN_approved']:
+        merged[col] = pd.to_numeric(merged[col], errors='coerce').fillna(0)
+
+    return version, _with_balance_columns(merged)
+
+def _with_balance_columns(merged):
+    """Derives Remaining Balance / Utilization % and the grand totals."""
+    merged['Remaining Balance'] = merged['total_budget'] - merged['Total Utilized Cost']
+    
+    total_budget = merged['total_budget'].sum()
+    total_spent = merged['Total Utilized Cost'].sum()
+    remaining = total_budget - total_spent
+
+    # Vectorized: 0 where the budget is not positive
+    merged['Utilization %'] = (
+        merged['Total Utilized Cost'] / merged['total_budget'].where(merged['total_budget'] > 0) * 100
+    ).fillna(0)
+    
+    return merged, total_budget, total_spent, remaining
+
+@st.cache_resource
+def _budget_status_cache():
+    """Process-wide budget status snapshot shared by every session, keyed on data versions."""
+    return {"lock": threading.Lock(), "version": None, "result": None}
+
+def calculate_status():
+    """
+    Returns (status_df, total_budget, total_spent, remaining).
+    Recomputes only when the budget_heads/requests change counters moved past
+    the cached snapshot; single-request writes are folded in by apply_request_delta().
+    """
+    version = get_data_versions('budget_heads', 'requests')
+    cache = _budget_status_cache()
+    with cache['lock']:
+        if cache['version'] == version:
+            df, total_budget, total_spent, remaining = cache['result']
+            return df.copy(), total_budget, total_spent, remaining
+
+    # Cache under the version the aggregate itself saw, not the one read above: a write
+    # committing in between must not be folded in again by its apply_request_delta()
+    version, result = _compute_budget_status()
+    with cache['lock']:
+        # Don't overwrite a snapshot that a concurrent delta already moved ahead
+        if cache['version'] is None or all(new >= old for new, old in zip(version, cache['version'])):
+            cache['version'], cache['result'] = version, result
+    df, total_budget, total_spent, remaining = result
+    return df.copy(), total_budget, total_spent, remaining
+
+def _request_contribution(cost, status):
+    """(utilized, approved) amount a single request adds to its cost area."""
+    cost = 0.0 if pd.isna(cost) else float(cost)
+    utilized = cost if status != 'Rejected' else 0.0
+    approved = cost if status in APPROVED_STATUSES else 0.0
+    return utilized, approved
+
+def read_request_contribution(request_id, uow):
+    """(cost_area, landed_total_cost, status) of a request as of `uow`, or None if it's gone.
+
+    Read inside the write's transaction, so the old side of apply_request_delta() is the row this
+    write replaces, not what the page showed when it rendered.
+    """
+    # BEGIN IMMEDIATE already holds the write lock, so nobody can change the row before commit
+    row = execute_query("SELECT cost_area, landed_total_cost, status FROM requests WHERE id = ?",
+                        (request_id,), uow=uow).fetchone()
+    return tuple(row) if row else None
+
+def apply_request_delta(old, new, requests_version):
+    """
+    Folds one request change into the cached budget status instead of recomputing.
+    old/new are (cost_area, landed_total_cost, status) tuples; None for "no row"
+    (e.g. old=None on insert). requests_version is the value returned by
+    bump_data_version('requests') for this write. If the snapshot missed any other
+    write in between, it is left alone and the next read recomputes it.
+    """
+    cache = _budget_status_cache()
+    with cache['lock']:
+        if cache['version'] is None or cache['version'][1] != requests_version - 1:
+            return
+        df, total_budget, _, _ = cache['result']
+        if df.empty:
+            return
+        df = df.copy()
+        for row, sign in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            area, cost, status = row
+            utilized, approved = _request_contribution(cost, status)
+            mask = df['cost_area'] == area
+            df.loc[mask, 'Total Utilized Cost'] += sign * utilized
+            df.loc[mask, 'MN_approved'] += sign * approved
+        cache['version'] = (cache['version'][0], requests_version)
+        cache['result'] = _with_balance_columns(df)
+
+# --- MN SUBMISSION (duplicate + budget check and insert in one transaction) ---
+# Columns of a new MN as passed to submit_mn_request()
+MN_SUBMIT_COLUMNS = [
+    'mn_number', 'mn_issue_date', 'date_logged', 'requester', 'cost_area', 'estimated_cost',
+    'status', 'mn_particulars', 'mn_category', 'department', 'location',
+    'supplier_vendor', 'supplier_type', 'currency', 'foreign_spare_cost',
+    'freight_fca_charges', 'customs_duty_rate', 'local_cost_wo_vat_ait',
+    'vat_ait', 'landed_total_cost', 'date_sent_ho', 'plant_remarks',
+]
+
+def submit_mn_request(request):
+    """Checks and inserts a new MN in one write transaction.
+
+    unit_of_work() holds SQLite's write lock from BEGIN IMMEDIATE, so no other submission can
+    commit between the balance check and the insert. `request` maps MN_SUBMIT_COLUMNS to values.
+    Returns (outcome, remaining, requests_version) where outcome is 'submitted', 'duplicate',
+    'over_budget' or 'no_budget'; requests_version is set only when submitted.
+    """
+    with unit_of_work() as c:
+        budget = c.execute("SELECT total_budget FROM budget_heads WHERE cost_area = ?", (request['cost_area'],)).fetchone()
+        if budget is None:
+            return 'no_budget', None, None
+        if c.execute("SELECT 1 FROM requests WHERE mn_number = ?", (request['mn_number'],)).fetchone():
+            return 'duplicate', None, None
+
+        # Same rule as _compute_budget_status(): everything except Rejected counts as utilized
+        utilized = c.execute("""SELECT COALESCE(SUM(landed_total_cost), 0) FROM requests
+                                WHERE cost_area = ? AND COALESCE(status, '') <> 'Rejected'""",
+                             (request['cost_area'],)).fetchone()[0]
+        remaining = (budget[0] or 0) - utilized
+        if request['landed_total_cost'] > remaining:
+            return 'over_budget', remaining, None
+
+        execute_query(f"INSERT INTO requests ({', '.join(MN_SUBMIT_COLUMNS)}) VALUES ({', '.join(['?'] * len(MN_SUBMIT_COLUMNS))})",
+                      tuple(request.get(col) for col in MN_SUBMIT_COLUMNS), uow=c)
+        requests_version = bump_data_version('requests', uow=c)
+    return 'submitted', remaining - request['landed_total_cost'], requests_version
+
+# --- FX REVALUATION (point-in-time landed cost, read-only) ---
+@st.cache_data(max_entries=4)
+def load_rate_history(config_version):
+    """Every effective-dated rate row, oldest first; keyed on the exchange_config version."""
+    history = load_data("SELECT key, value, effective_from FROM exchange_rate_history ORDER BY effective_from, id")
+    history['value'] = pd.to_numeric(history['value'], errors='coerce')
+    return history
+
+@st.cache_data(max_entries=10)
+def load_open_foreign_requests(requests_version):
+    """Cost inputs of the foreign MNs that are neither completed nor rejected."""
+    return load_data("""
+        SELECT mn_number, cost_area, status, currency, foreign_spare_cost, freight_fca_charges,
+               customs_duty_rate, local_cost_wo_vat_ait, vat_ait, landed_total_cost
+        FROM requests
+        WHERE supplier_type = 'Foreign' AND COALESCE(status, '') NOT IN ('Completed', 'Rejected')
+        ORDER BY cost_area, mn_number
+    """)
+
+def rates_as_of(as_of):
+    """{currency: BDT rate} in force on `as_of` (date or YYYY-MM-DD).
+
+    Takes the latest history row per key effective on or before the date; keys with no
+    row that early fall back to their earliest recorded rate, then to the current config.
+    """
+    config = get_exchange_config()
+    history = load_rate_history(config["version"])
+    as_of = str(as_of)
+
+    in_force = history[history['effective_from'] <= as_of].groupby('key')['value'].last()
+    earliest = history.groupby('key')['value'].first()
+    values = {**config["values"], **earliest.to_dict(), **in_force.to_dict()}
+    return {"BDT": 1.0, **{currency: values[key] for currency, key in FX_RATE_KEYS.items()}}
+
+def revalue_open_requests(as_of):
+    """Recomputes landed cost of every open foreign MN at the rates in force on `as_of`.
+
+    One vectorized pass over the stored foreign cost, freight and the customs duty rate each
+    MN was submitted with. Adds revaluation_rate, revalued_landed_cost and revaluation_delta;
+    nothing is written back.
+    """
+    df = load_open_foreign_requests(get_data_versions('requests')[0]).copy()
+    cost_cols = ['foreign_spare_cost', 'freight_fca_charges', 'customs_duty_rate',
+                 'local_cost_wo_vat_ait', 'vat_ait', 'landed_total_cost']
+    for col in cost_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    df['revaluation_rate'] = df['currency'].map(rates_as_of(as_of))
+    df['revalued_landed_cost'] = (
+        (df['foreign_spare_cost'] * (1 + df['customs_duty_rate']) + df['freight_fca_charges']) * df['revaluation_rate']
+        + df['local_cost_wo_vat_ait'] + df['vat_ait']
+    ).fillna(df['landed_total_cost']) # unknown currency: keep the stored cost
+    df['revaluation_delta'] = df['revalued_landed_cost'] - df['landed_total_cost']
+    return df
+
+def calculate_revalued_status(as_of):
+    """calculate_status() with open foreign MNs at the rates in force on `as_of`.
+
+    Returns (status_df, total_budget, total_spent, remaining, revalued_requests); status_df
+    gains a 'Revaluation Delta' column. The stored landed costs are left untouched.
+    """
+    df_status, _, _, _ = calculate_status()
+    revalued = revalue_open_requests(as_of)
+    if df_status.empty:
+        return df_status, 0, 0, 0, revalued
+
+    # Open MNs are never Rejected, so their whole delta lands in utilized
+    utilized_delta = revalued.groupby('cost_area')['revaluation_delta'].sum()
+    approved_delta = revalued[revalued['status'].isin(APPROVED_STATUSES)].groupby('cost_area')['revaluation_delta'].sum()
+    df_status['Revaluation Delta'] = df_status['cost_area'].map(utilized_delta).fillna(0)
+    df_status['Total Utilized Cost'] += df_status['Revaluation Delta']
+    df_status['MN_approved'] += df_status['cost_area'].map(approved_delta).fillna(0)
+
+    df_status, total_budget, total_spent, remaining = _with_balance_columns(df_status)
+    return df_status, total_budget, total_spent, remaining, revalued
+
+# --- BUDGET IMPORT (vectorized validation + single-statement upsert) ---
+BUDGET_IMPORT_COLUMNS = ['department', 'cost_area', 'total_budget']
+
+def normalize_budget_frame(budget_df):
+    """Cleans an uploaded budget sheet without touching rows one by one.
+
+    Returns (clean_df, rejected_df). Rows are rejected when the cost area is blank or
+    the budget is not a non-negative number. A cost area listed twice keeps its last row.
+    """
+    df = budget_df[BUDGET_IMPORT_COLUMNS].copy()
+    df['department'] = df['department'].fillna('').astype(str).str.strip()
+    df['cost_area'] = df['cost_area'].fillna('').astype(str).str.strip()
+    # Accept "1,250,000" style numbers from Excel exports
+    df['total_budget'] = pd.to_numeric(df['total_budget'].astype(str).str.replace(',', '', regex=False).str.strip(),
+                                       errors='coerce')
+
+    valid = (df['cost_area'] != '') & df['total_budget'].notna() & (df['total_budget'] >= 0)
+    clean_df = df[valid].drop_duplicates(subset='cost_area', keep='last').reset_index(drop=True)
+    return clean_df, df[~valid]
+
+def bulk_upsert_budget_heads(clean_df, uow):
+    """Upserts a normalized budget frame through a temp staging table inside `uow`.
+
+    Rows whose department and budget already match are left untouched.
+    Returns {"inserted", "updated", "unchanged"} counts.
+    """
+    if clean_df.empty:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    uow.execute("CREATE TEMP TABLE IF NOT EXISTS budget_import_stage (cost_area TEXT PRIMARY KEY, department TEXT, total_budget REAL)")
+    uow.execute("DELETE FROM budget_import_stage")
+    uow.executemany("INSERT INTO budget_import_stage (cost_area, department, total_budget) VALUES (?, ?, ?)",
+                    clean_df[['cost_area', 'department', 'total_budget']].itertuples(index=False, name=None))
+
+    inserted, unchanged = uow.execute("""
+        SELECT SUM(b.cost_area IS NULL),
+               SUM(b.cost_area IS NOT NULL AND b.department IS s.department AND b.total_budget IS s.total_budget)
+        FROM budget_import_stage s LEFT JOIN budget_heads b ON b.cost_area = s.cost_area
+    """).fetchone()
+
+    # Merge: one statement for the whole sheet, skipping rows that wouldn't change.
+    # "WHERE true" is required by SQLite's parser for INSERT ... SELECT ... ON CONFLICT.
+    uow.execute("""
+        INSERT INTO budget_heads (cost_area, department, total_budget)
+        SELECT cost_area, department, total_budget FROM budget_import_stage WHERE true
+        ON CONFLICT(cost_area) DO UPDATE SET
+            department = excluded.department,
+            total_budget = excluded.total_budget
+        WHERE budget_heads.department IS NOT excluded.department
+           OR budget_heads.total_budget IS NOT excluded.total_budget
+    """)
+    uow.execute("DELETE FROM budget_import_stage")
+    inserted, unchanged = int(inserted or 0), int(unchanged or 0)
+    return {"inserted": inserted, "updated": len(clean_df) - inserted - unchanged, "unchanged": unchanged}
+
+# --- ADMIN REQUEST PICKER (typeahead) ---
+REQUEST_PICKER_LIMIT = 25
+
+@st.cache_data(max_entries=500)
+def search_requests(term, requests_version, limit=REQUEST_PICKER_LIMIT):
+    """
+    Top matches for the admin request picker, newest first: MN number prefix
+    (GLOB 'X*' so SQLite can range-scan the mn_number UNIQUE index) or an exact
+    request ID. An empty term lists the latest requests.
+    requests_version only keys the cache.
+    """
+    term = re.sub(r"[*?\[\]]", "", (term or "").strip().upper())
+    conditions, params = [], []
+    if term:
+        conditions.append("mn_number GLOB ?")
+        params.append(term + '*')
+        if term.isdigit():
+            conditions.append("id = ?")
+            params.append(int(term))
+    where = f"WHERE {' OR '.join(conditions)}" if conditions else ""
+    params.append(limit)
+    return load_data(f"""
+        SELECT id, mn_number, status, cost_area, landed_total_cost
+        FROM requests {where}
+        ORDER BY COALESCE(date_logged, '') DESC, id DESC
+        LIMIT ?
+    """, tuple(params))
+
+# --- REQUEST LIST: SQL filter pushdown + keyset pagination ---
+REQUEST_FILTER_COLUMNS = ['status', 'mn_category', 'cost_area', 'supplier_type']
+REQUESTS_PAGE_SIZE = 50
+
+def _request_filter_clause(filters):
+    """
+    Turns ((column, values), ...) into WHERE conditions + positional params.
+    Columns are whitelisted; empty selections mean "no filter" like the old isin() chain.
+    """
+    conditions, params = [], []
+    for column, values in filters:
+        if column not in REQUEST_FILTER_COLUMNS:
+            raise ValueError(f"Unsupported request filter column: {column}")
+        if values:
+            conditions.append(f"{column} IN ({', '.join(['?'] * len(values))})")
+            params.extend(values)
+    return conditions, params
+
+@st.cache_data(max_entries=20)
+def get_request_filter_options(column, requests_version):
+    """DISTINCT values of a filterable column. requests_version only keys the cache."""
+    if column not in REQUEST_FILTER_COLUMNS:
+        raise ValueError(f"Unsupported request filter column: {column}")
+    options_df = load_data(f"SELECT DISTINCT {column} FROM requests WHERE {column} IS NOT NULL ORDER BY {column}")
+    return options_df[column].tolist()
+
+@st.cache_data(max_entries=200)
+def count_requests(filters, requests_version):
+    """Number of requests matching the filters. requests_version only keys the cache."""
+    conditions, params = _request_filter_clause(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    count_df = load_data(f"SELECT COUNT(*) AS count FROM requests {where}", tuple(params))
+    return int(count_df.iloc[0]['count'])
+
+@st.cache_data(max_entries=200)
+def load_requests_page(filters, after, requests_version, limit=REQUESTS_PAGE_SIZE):
+    """
+    One page of matching requests, newest first, keyset-paginated on (date_logged, id).
+    after is the (date_logged, id) of the last row of the previous page, or None for page 1.
+    Requests without a date_logged sort as '' (last), so the cursor never compares with NULL.
+    """
+    conditions, params = _request_filter_clause(filters)
+    if after is not None:
+        # pandas hands a missing date_logged back as None or NaN. SQLite only seeks the index
+        # on the leading-column bound; the row-value comparison alone scans it
+        after_date = after[0] if isinstance(after[0], str) else ''
+        conditions.append("COALESCE(date_logged, '') <= ? AND (COALESCE(date_logged, ''), id) < (?, ?)")
+        params.extend([after_date, after_date, after[1]])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit)
+    return load_data(f"SELECT * FROM requests {where} ORDER BY COALESCE(date_logged, '') DESC, id DESC LIMIT ?", tuple(params))
+
+def load_filtered_requests(filters):
+    """All matching requests (for CSV export only; the page itself is paginated)."""
+    conditions, params = _request_filter_clause(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return load_data(f"SELECT * FROM requests {where} ORDER BY COALESCE(date_logged, '') DESC, id DESC", tuple(params))
+
+# --- PAGE SECTION LOADERS (inputs of the fragments, cached per data version) ---
+# Each takes the data_versions counters of the tables it reads, so a fragment rerun costs one
+# version lookup and a cache hit until somebody writes to those tables.
+@st.cache_data(max_entries=20)
+def load_tracking_table(versions):
+    """requests joined with lc_po_tracker for the LC/PO page. versions only keys the cache."""
+    return load_data("""
+        SELECT
+            r.mn_number,
+            r.mn_particulars,
+            r.cost_area,
+            r.supplier_vendor,
+            r.supplier_type,
+            r.status,
+            t.lc_po_nr,
+            t.lc_po_date,
+            t.eta_shipment_delivery,
+            t.delivery_completed,
+            t.date_of_delivery,
+            t.delay_days,
+            t.bill_tracking_id,
+            t.bill_paid
+        FROM requests r
+        INNER JOIN lc_po_tracker t ON r.mn_number = t.mn_number
+    """)
+
+@st.cache_data(max_entries=20)
+def load_saved_bills(versions):
+    """Bill headers joined with their line items. versions only keys the cache."""
+    return load_data("""
+        SELECT r.bill_no, r.bill_date, r.supplier, r.total_bill_amount, 
+               d.description, d.quantity, d.unit, d.rate, d.amount as item_amount, 
+               r.indent_no, r.grn_no, r.payment_mode, r.remarks
+        FROM indent_purchase_record r
+        JOIN indent_goods_details d ON r.bill_no = d.bill_no
+        ORDER BY r.bill_date DESC
+    """)
+
+@st.cache_data(max_entries=20)
+def load_request_statuses(requests_version):
+    """(status, mn_number) of every request, for the balance sheet drill-down."""
+    return load_data("SELECT status, mn_number FROM requests ORDER BY mn_number ASC")
+
+@st.cache_data(max_entries=200)
+def load_request_overview(mn_number, requests_version):
+    return load_data("SELECT * FROM requests WHERE mn_number = ?", (mn_number,))
+
+@st.cache_data(max_entries=20)
+def load_pending_indent_numbers(indents_version):
+    """Indents that still have unbilled items (newest first)."""
+    return load_data("SELECT DISTINCT indent_number FROM standalone_indents WHERE status = 'Not Purchased' ORDER BY indent_date DESC")
+
+@st.cache_data(max_entries=50)
+def load_pending_indent_items(indent_numbers, indents_version):
+    """Not-yet-billed items of the given indents (a tuple), for the bill builder."""
+    placeholders = ', '.join(['?'] * len(indent_numbers))
+    return load_data(f"""
+        SELECT indent_id, indent_number, item_description, quantity, unit, rate 
+        FROM standalone_indents 
+        WHERE indent_number IN ({placeholders}) AND status = 'Not Purchased'
+    """, tuple(indent_numbers))
+
+# --- MESSAGE BOARD (incremental fetch shared by every open board) ---
+MESSAGE_POLL_SEC = 10 # how often an open board checks for new posts
+MESSAGE_PAGE_SIZE = 50
+MESSAGE_CACHE_SIZE = 500 # newest messages kept in process memory
+
+@st.cache_data(ttl=MESSAGE_POLL_SEC)
+def latest_message_id():
+    """Newest message id: one primary-key lookup per server process per poll interval,
+    however many boards are open."""
+    latest = load_data("SELECT MAX(id) AS id FROM messages")['id'].iloc[0]
+    return 0 if pd.isna(latest) else int(latest)
+
+@st.cache_resource
+def _message_cache():
+    """Process-wide tail of the board, oldest first; extended only by rows past last_id."""
+    return {"lock": threading.Lock(), "rows": [], "last_id": 0}
+
+def recent_messages():
+    """Newest messages (oldest first, at most MESSAGE_CACHE_SIZE).
+
+    Queries the table only when latest_message_id() moved past the cached tail, and then
+    only for the new rows; otherwise served from memory.
+    """
+    latest = latest_message_id()
+    cache = _message_cache()
+    with cache['lock']:
+        if latest > cache['last_id']:
+            if cache['last_id'] == 0:
+                new_rows = load_data("SELECT id, username, message, timestamp FROM messages ORDER BY id DESC LIMIT ?",
+                                     (MESSAGE_PAGE_SIZE,)).iloc[::-1]
+            else:
+                new_rows = load_data("""
+                    SELECT id, username, message, timestamp FROM messages
+                    WHERE id > ? ORDER BY id LIMIT ?
+                """, (cache['last_id'], MESSAGE_CACHE_SIZE))
+            cache['rows'] = (cache['rows'] + new_rows.to_dict('records'))[-MESSAGE_CACHE_SIZE:]
+            if cache['rows']:
+                cache['last_id'] = int(cache['rows'][-1]['id'])
+        return list(cache['rows'])
+
+@st.cache_data(max_entries=200)
+def load_messages_before(before_id):
+    """One page of history older than `before_id`, newest first (keyset on the primary key).
+
+    Posts are never edited or deleted, so a page stays valid for the life of the process.
+    """
+    return load_data("""
+        SELECT id, username, message, timestamp FROM messages
+        WHERE id < ? ORDER BY id DESC LIMIT ?
+    """, (before_id, MESSAGE_PAGE_SIZE)).to_dict('records')
+
+def _render_message(row):
+    with st.container(border=True):
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            st.markdown(f"**{row['username']}**")
+            st.caption(f"{row['timestamp']}")
+        with col2:
+            st.write(row['message'])
+
+@st.fragment(run_every=MESSAGE_POLL_SEC)
+def message_feed():
+    """Live part of the board: everything newer than this session's anchor, newest first.
+    Reruns on its own every MESSAGE_POLL_SEC; with no new posts that costs no query."""
+    rows = recent_messages()
+    anchor = st.session_state.get('mb_anchor_id')
+    # First view, or the anchor has scrolled out of the process cache: restart from the newest page
+    if anchor is None or (rows and anchor < rows[0]['id']):
+        anchor = rows[-MESSAGE_PAGE_SIZE:][0]['id'] if rows else latest_message_id() + 1
+        st.session_state['mb_anchor_id'] = anchor
+        st.session_state['mb_history_pages'] = 0
+
+    live = [row for row in rows if row['id'] >= anchor]
+    if not live and not rows:
+        st.info("No messages yet. Be the first to post!")
+    for row in reversed(live):
+        _render_message(row)
+
+@st.fragment
+def message_history():
+    """Older posts, loaded a page at a time below the live feed; never auto-refreshes."""
+    anchor = st.session_state.get('mb_anchor_id')
+    if anchor is None:
+        return
+    before, exhausted = anchor, False
+    for _ in range(st.session_state.get('mb_history_pages', 0)):
+        page = load_messages_before(before)
+        for row in page:
+            _render_message(row)
+        if len(page) < MESSAGE_PAGE_SIZE:
+            exhausted = True
+            break
+        before = page[-1]['id']
+
+    if exhausted:
+        st.caption("Beginning of the board.")
+    elif st.button("Load older messages"):
+        st.session_state['mb_history_pages'] = st.session_state.get('mb_history_pages', 0) + 1
+        st.rerun(scope="fragment")
+
+def message_board():
+    st.title("📋 Community Message Board")
+    
+    # Message Input Section
+    with st.form("message_form", clear_on_submit=True):
+        user_msg = st.text_area("Post a message for all users:", placeholder="Type your update here...")
+        submit = st.form_submit_button("Post Message")
+        
+        if submit and user_msg.strip():
+            execute_query("INSERT INTO messages (username, message) VALUES (?, ?)", 
+                          (st.session_state['username'], user_msg))
+            # Show it now instead of after the next poll, in every open board
+            latest_message_id.clear()
+            st.success("Message posted!")
+
+    st.markdown("---")
+    # Display Messages Section
+    message_feed()
+    message_history()
+
+# --- SCHEMA BOOTSTRAP (once per process) ---
+def get_schema_version():
+    """Highest applied migration, or 0 when the database has never been initialized."""
+    try:
+        row = get_connection().execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    except sqlite3.OperationalError:
+        row = None # schema_migrations doesn't exist yet
+    return int(row[0]) if row and row[0] is not None else 0
+
+@st.cache_resource
+def bootstrap_schema():
+    """Runs init_db() only when the database is behind LATEST_SCHEMA_VERSION.
+
+    Cached for the lifetime of the server process, so later reruns skip it.
+    """
+    current = get_schema_version()
+    if current < LATEST_SCHEMA_VERSION:
+        init_db()
+        current = LATEST_SCHEMA_VERSION
+    return current
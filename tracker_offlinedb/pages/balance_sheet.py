@@ -0,0 +1,212 @@
+# --- TAB 3: BUDGET BALANCE SHEET ---
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import date
+
+from tracker_offlinedb.core import (
+    calculate_revalued_status, calculate_status, get_data_versions, load_request_overview,
+    load_request_statuses,
+)
+
+
+@st.fragment
+def status_drilldown():
+    """Status pie, counts and the MN drill-down; its buttons and selectbox rerun only this section."""
+    requests_version = get_data_versions('requests')[0]
+    status_raw = load_request_statuses(requests_version)
+
+    if not status_raw.empty:
+        counts = status_raw['status'].value_counts().reset_index()
+        counts.columns = ['Status', 'Count']
+    
+        sc1, sc2 = st.columns([1, 1])
+    
+        with sc1:
+            # Pie Chart
+            fig_pie = px.pie(
+                counts, 
+                values='Count', 
+                names='Status', 
+                hole=0.4,
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+            fig_pie.update_layout(margin=dict(t=0, b=0, l=0, r=0), height=300)
+            st.plotly_chart(fig_pie, use_container_width=True)
+
+        with sc2:
+            # Metrics with "link-like" buttons
+            st.write("**Click a number to view MNs:**")
+            for _, row in counts.iterrows():
+                # Display metric and a button for drill-down
+                col_m, col_b = st.columns([2, 3])
+                col_m.metric(row['Status'], row['Count'])
+                if col_b.button(f"List {row['Status']} MNs", key=f"drill_{row['Status']}"):
+                    st.session_state.bb_selected_status = row['Status']
+                    st.session_state.bb_selected_mn = None # Reset MN choice
+
+        # Drill-down view
+        if st.session_state.bb_selected_status:
+            st.markdown(f"### MNs for Status: `{st.session_state.bb_selected_status}`")
+            mn_list = status_raw[status_raw['status'] == st.session_state.bb_selected_status]['mn_number'].tolist()
+        
+            sel_mn = st.selectbox("Select an MN number for overview", ["-- Select --"] + mn_list)
+            if sel_mn != "-- Select --":
+                mn_full = load_request_overview(sel_mn, requests_version)
+                if not mn_full.empty:
+                    d = mn_full.iloc[0]
+                    with st.container(border=True):
+                        st.markdown(f"#### Overview: {sel_mn}")
+                        c_a, c_b = st.columns(2)
+                        c_a.write(f"**Requester:** {d['requester']}")
+                        c_a.write(f"**Dept:** {d['department']}")
+                        c_a.write(f"**Cost Area:** {d['cost_area']}")
+                        c_b.write(f"**Est. Cost:** BDT {d['estimated_cost']:,.2f}")
+                        c_b.write(f"**Date Logged:** {d['date_logged']}")
+                        c_b.write(f"**Category:** {d['mn_category']}")
+                        st.write(f"**Particulars:** {d['mn_particulars']}")
+        
+            if st.button("Close Drill-down"):
+                st.session_state.bb_selected_status = None
+                st.rerun(scope="fragment")
+
+    else:
+        st.info("No MN requests recorded yet.")
+
+
+@st.fragment
+def fx_revaluation():
+    """Open foreign MNs revalued at the rates in force on a chosen date; the date input reruns only this section."""
+    as_of = st.date_input("Revalue at rates in force on", value=date.today(), key="bb_fx_as_of")
+    df_reval, reval_budget, reval_spent, reval_remaining, revalued = calculate_revalued_status(as_of)
+
+    if revalued.empty:
+        st.info("No open foreign MNs to revalue.")
+        return
+
+    rc1, rc2, rc3 = st.columns(3)
+    rc1.metric("Open Foreign MNs (Booked)", f"BDT {revalued['landed_total_cost'].sum():,.2f}")
+    rc2.metric("Open Foreign MNs (Revalued)", f"BDT {revalued['revalued_landed_cost'].sum():,.2f}",
+               delta=f"{revalued['revaluation_delta'].sum():,.2f}", delta_color="inverse")
+    rc3.metric("Remaining Budget (Revalued)", f"BDT {reval_remaining:,.2f}")
+
+    reval_cols = {
+        'department': 'Department', 'cost_area': 'cost_area', 'total_budget': 'Total Budget',
+        'Revaluation Delta': 'Revaluation Delta', 'Total Utilized Cost': 'MN_issued (Revalued)',
+        'MN_approved': 'MN_approved (Revalued)', 'Remaining Balance': 'Remaining Budget (Revalued)',
+    }
+    reval_display = df_reval[list(reval_cols)].rename(columns=reval_cols)
+    st.dataframe(
+        reval_display.style.format({col: 'BDT {:,.2f}' for col in list(reval_cols.values())[2:]}),
+        width='stretch', hide_index=True
+    )
+
+    with st.expander(f"Revalued MNs ({len(revalued)})"):
+        st.dataframe(
+            revalued[['mn_number', 'cost_area', 'status', 'currency', 'revaluation_rate',
+                      'landed_total_cost', 'revalued_landed_cost', 'revaluation_delta']],
+            width='stretch', hide_index=True
+        )
+
+# Reset unrelated session states
+st.session_state['mn_submission_result'] = None
+st.session_state['mn_submission_status'] = None
+st.session_state['show_mn_details'] = False
+st.session_state['show_admin_edit'] = False
+st.session_state['edit_mn_id'] = None
+
+# Initialize local session states for drill-down
+if 'bb_selected_status' not in st.session_state:
+    st.session_state.bb_selected_status = None
+if 'bb_selected_mn' not in st.session_state:
+    st.session_state.bb_selected_mn = None
+
+st.title("📊 Budget Balance Sheet (Departmental Subtotals)")
+
+# Fetch data
+df_status, total_budget, total_spent, remaining = calculate_status()
+
+if df_status.empty:
+    st.info("No budget data found.")
+    st.stop()
+
+# --- 1. FINANCIAL BAR CHART ---
+st.subheader("Budget vs. Expenditure Overview")
+total_approved = df_status['MN_approved'].sum()
+chart_df = pd.DataFrame({
+    "Metric": ["Total Budget", "MN Issued (Utilized)", "MN Approved", "Remaining Budget"],
+    "Amount (BDT)": [total_budget, total_spent, total_approved, remaining]
+})
+
+fig_bar = px.bar(
+    chart_df, 
+    x="Metric", 
+    y="Amount (BDT)", 
+    color="Metric",
+    text="Amount (BDT)",
+    color_discrete_map={
+        "Total Budget": "#008080", 
+        "MN Issued (Utilized)": "#FFA500", 
+        "MN Approved": "#2ECC71", 
+        "Remaining Budget": "#E74C3C"
+    }
+)
+fig_bar.update_traces(texttemplate='%{text:,.2s}', textposition='outside')
+fig_bar.update_layout(showlegend=False, height=450, margin=dict(t=30))
+st.plotly_chart(fig_bar, use_container_width=True)
+
+st.markdown("---")
+
+# --- 2. MN REQUEST STATUS SUMMARY & DRILL-DOWN ---
+st.subheader("MN Request Status Summary")
+status_drilldown()
+
+st.markdown("---")
+
+# --- 3. DETAILED BREAKDOWN TABLE ---
+st.subheader("Detailed Departmental Breakdown")
+df_status = df_status.rename(columns={
+    'total_budget': 'Total Budget',
+    'Total Utilized Cost': 'MN_issued',
+    'Remaining Balance': 'Remaining Budget'
+})
+
+display_cols = ['department', 'cost_area', 'Total Budget', 'MN_issued', 'MN_approved', 'Remaining Budget']
+df_display = df_status[display_cols].copy()
+
+val_cols = ['Total Budget', 'MN_issued', 'MN_approved', 'Remaining Budget']
+df_subtotal = df_display.groupby('department', as_index=False)[val_cols].sum()
+df_subtotal['cost_area'] = '--- SUBTOTAL ---'
+
+final_df = pd.concat([df_display, df_subtotal], ignore_index=True)
+final_df = final_df.sort_values(by=['department', 'cost_area'], ascending=[True, True])
+final_df = final_df.rename(columns={'department': 'Department'})
+
+def style_balance_sheet(row):
+    if row['cost_area'] == '--- SUBTOTAL ---':
+        return ['font-weight: bold; background-color: #f0f2f6'] * len(row)
+    return [''] * len(row)
+
+styled_df = final_df.style.apply(style_balance_sheet, axis=1).format({
+    'Total Budget': 'BDT {:,.2f}',
+    'MN_issued': 'BDT {:,.2f}',
+    'MN_approved': 'BDT {:,.2f}',
+    'Remaining Budget': 'BDT {:,.2f}'
+})
+
+st.dataframe(styled_df, use_container_width=True, hide_index=True)
+
+st.download_button(
+    label="Download Balance Sheet CSV",
+    data=final_df.to_csv(index=False).encode('utf-8'),
+    file_name='budget_balance_sheet.csv',
+    mime='text/csv'
+)
+
+st.markdown("---")
+
+# --- 4. FX REVALUATION (what-if) ---
+st.subheader("FX Revaluation of Open Foreign MNs")
+st.caption("Recomputes landed cost from each MN's foreign cost, freight and duty rate at the selected date's exchange rates. "
+           "Booked costs are not changed.")
+fx_revaluation()
@@ -0,0 +1,120 @@
+# --- TAB 5: BUDGET SETUP & IMPORT ---
+import streamlit as st
+import pandas as pd
+import sqlite3
+
+from tracker_offlinedb.core import (
+    bulk_upsert_budget_heads, bump_data_version, execute_query, load_data, log_event,
+    normalize_budget_frame, unit_of_work,
+)
+
+st.session_state['mn_submission_result'] = None
+st.session_state['mn_submission_status'] = None
+st.session_state['show_mn_details'] = False
+st.session_state['show_admin_edit'] = False
+st.session_state['edit_mn_id'] = None
+
+if st.session_state['role'] != 'administrator':
+    st.error("🚫 Access Denied: Only Administrators can access Budget Setup.")
+    st.stop()
+
+st.title("⚙️ Budget Configuration & Import 2026")
+
+st.header("1. Import Budget from File")
+st.markdown("**Expected Columns:** `Department`, `Cost Area`, `Total Budget`")
+
+uploaded_file = st.file_uploader("Upload Budget File (CSV or XLSX)", type=['csv', 'xlsx'])
+
+if uploaded_file is not None:
+    try:
+        if uploaded_file.name.endswith('.csv'):
+            budget_df = pd.read_csv(uploaded_file)
+        else:
+            budget_df = pd.read_excel(uploaded_file, engine='openpyxl')
+            
+        budget_df.columns = [col.strip().replace(' ', '_').replace('.', '_').lower() for col in budget_df.columns]
+        required_cols = ['department', 'cost_area', 'total_budget']
+
+        if not all(col in budget_df.columns for col in required_cols):
+            st.error(f"Error: Missing required columns: {', '.join([col for col in required_cols if col not in budget_df.columns])}.")
+        else:
+            clean_df, rejected_df = normalize_budget_frame(budget_df)
+            st.subheader("Preview of Data to Import:")
+            st.dataframe(clean_df)
+            if not rejected_df.empty:
+                st.warning(f"{len(rejected_df)} row(s) will be skipped (blank Cost Area or invalid Total Budget).")
+                st.dataframe(rejected_df)
+            
+            if st.button("Confirm and Import/Update Budgets"):
+                with unit_of_work() as uow:
+                    counts = bulk_upsert_budget_heads(clean_df, uow)
+                    if counts["inserted"] or counts["updated"]:
+                        log_event("BUDGET_IMPORT", f"Bulk import: {counts['inserted']} inserted, {counts['updated']} updated, "
+                                                   f"{counts['unchanged']} unchanged budget heads.", uow=uow)
+                        bump_data_version('budget_heads', uow=uow)
+                st.success(f"✅ Import complete: {counts['inserted']} inserted, {counts['updated']} updated, "
+                           f"{counts['unchanged']} unchanged, {len(rejected_df)} skipped.")
+                st.rerun()
+    except Exception as e:
+        st.error(f"An unexpected error occurred during file processing: {e}")
+    st.markdown("---") # Adds a nice divider 
+    
+# --- MANUAL ENTRY OPTION ---
+st.header("2. Manual Budget Entry")
+st.markdown("Use this form to add a new budget or quickly adjust an existing one.")
+
+# Manual Entry Form 
+with st.form("manual_budget_form"):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        dept = st.text_input("Department (e.g., Production)")
+    with col2:
+        area = st.text_input("Cost Area Name (e.g., Line-1, Generator)")
+    with col3:
+        amount = st.number_input("Approved Budget 2026 (BDT)", min_value=0.0, format="%.2f")
+    
+    submit_budget = st.form_submit_button("Manually Add/Update Budget Head")
+    
+    if submit_budget:
+        if dept and area and amount > 0:
+            try:
+                with unit_of_work() as uow:
+                    execute_query("INSERT OR REPLACE INTO budget_heads (cost_area, department, total_budget) VALUES (?, ?, ?)",
+                                  (area, dept, amount), uow=uow)
+                    # LOGGING MANUAL BUDGET UPDATE
+                    log_event("BUDGET_UPDATE", f"Manually updated/added budget for {area} to {amount:,.2f} BDT.", uow=uow)
+                    bump_data_version('budget_heads', uow=uow)
+                st.success(f"Added/Updated {area} with budget {amount:,.2f}")
+                st.rerun()
+            except sqlite3.IntegrityError:
+                st.error("Database error. Please check the Cost Area name.")
+        else:
+            st.warning("Please fill all manual entry fields.")
+
+# Display current budget allocations
+st.subheader("Current Master Budget Data")
+current_budget_df = load_data("SELECT * FROM budget_heads")
+st.dataframe(current_budget_df, width='stretch')
+
+# Download CSV option
+st.download_button(
+    label="Download Budget Data CSV",
+    data=current_budget_df.to_csv(index=False).encode('utf-8'),
+    file_name='master_budget_data.csv',
+    mime='text/csv',
+    key='download_budget_data'
+)
+
+# --- CLEAR BUDGET DATA OPTION ---
+st.markdown("---")
+st.header("3. Danger Zone (Clear Data)")
+st.markdown("Use this to clear all existing budget allocations to start fresh for a new fiscal year. **This does NOT delete request history.**")
+
+if st.button("🔴 CLEAR ALL BUDGET DATA", help="This action cannot be undone!", type="secondary"):
+    with unit_of_work() as uow:
+        execute_query("DELETE FROM budget_heads", uow=uow)
+        # LOGGING BUDGET CLEAR
+        log_event("BUDGET_CLEAR", "Cleared ALL data from the budget_heads table.", uow=uow)
+        bump_data_version('budget_heads', uow=uow)
+    st.warning("🗑️ All budget data has been cleared!")
+    st.rerun()
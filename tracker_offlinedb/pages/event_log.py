@@ -0,0 +1,87 @@
+# --- TAB 7: EVENT LOG ---
+import streamlit as st
+from datetime import date, timedelta
+
+from tracker_offlinedb.core import (
+    EVENT_LOG_PAGE_SIZE, get_event_log_filter_options, load_event_log_page, load_filtered_event_logs,
+)
+
+EVENT_LOG_COLUMN_LABELS = {
+    'timestamp': 'Time',
+    'username': 'User',
+    'action_type': 'Action Type',
+    'description': 'Details'
+}
+
+@st.fragment
+def event_log_table():
+    """Filters, keyset-paged table and CSV export; only matching rows are ever read from the database."""
+    col_filter_1, col_filter_2, col_filter_3 = st.columns(3)
+    with col_filter_1:
+        date_range = st.date_input("Date Range", value=(date.today() - timedelta(days=30), date.today()), key="ev_date_range")
+    with col_filter_2:
+        selected_users = st.multiselect("Filter by User", get_event_log_filter_options('username'), default=[])
+    with col_filter_3:
+        selected_actions = st.multiselect("Filter by Action Type", get_event_log_filter_options('action_type'), default=[])
+    search_text = st.text_input("🔍 Search Details", placeholder="e.g. MN/2026/0042")
+
+    # An open-ended range (only the start picked so far) filters from that day on
+    date_from, date_to = (tuple(date_range) + (None, None))[:2]
+    filters = {
+        'date_from': date_from,
+        'date_to': date_to,
+        'username': tuple(selected_users),
+        'action_type': tuple(selected_actions),
+        'search': search_text.strip(),
+    }
+    # Restart from page 1 whenever the filter selection changes
+    if st.session_state.get('ev_filters') != filters:
+        st.session_state['ev_filters'] = filters
+        st.session_state['ev_page_cursors'] = [None]
+    page_cursors = st.session_state['ev_page_cursors']
+
+    page_df, has_more = load_event_log_page(filters, page_cursors[-1])
+    first_row = (len(page_cursors) - 1) * EVENT_LOG_PAGE_SIZE
+
+    if page_df.empty:
+        st.info("No events match these filters.")
+    else:
+        st.caption(f"Showing events {first_row + 1}-{first_row + len(page_df)}, newest first")
+        st.dataframe(page_df.drop(columns=['id']).rename(columns=EVENT_LOG_COLUMN_LABELS), width='stretch', hide_index=True)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    if col_prev.button("◀ Previous", disabled=len(page_cursors) == 1, key="ev_prev_page"):
+        page_cursors.pop()
+        st.rerun(scope="fragment")
+    col_page.markdown(f"Page **{len(page_cursors)}**")
+    if col_next.button("Next ▶", disabled=not has_more, key="ev_next_page"):
+        last_row = page_df.iloc[-1]
+        page_cursors.append((last_row['timestamp'], int(last_row['id'])))
+        st.rerun(scope="fragment")
+
+    # Export loads the full filtered set only on demand
+    if st.button("Prepare Event Log CSV", key="prepare_event_log_csv"):
+        export_df = load_filtered_event_logs(filters).rename(columns=EVENT_LOG_COLUMN_LABELS)
+        st.download_button(
+            label=f"Download Event Log CSV ({len(export_df)} rows)",
+            data=export_df.to_csv(index=False).encode('utf-8'),
+            file_name='application_event_log.csv',
+            mime='text/csv',
+            key='download_event_log',
+            on_click="ignore"
+        )
+
+# Guard: Super & Admin can access
+if st.session_state['role'] not in ['administrator', 'super']:
+    st.error("🚫 Access Denied.")
+    st.stop()
+st.session_state['mn_submission_result'] = None
+st.session_state['mn_submission_status'] = None
+st.session_state['show_mn_details'] = False
+st.session_state['show_admin_edit'] = False
+st.session_state['edit_mn_id'] = None
+    
+st.title("📜 Application Event Log (Admin Audit)")
+st.markdown("Displays critical actions performed by users and the system.")
+
+event_log_table()
@@ -0,0 +1,268 @@
+import streamlit as st
+from datetime import date, datetime
+
+from tracker_offlinedb.core import (
+    apply_request_delta, bump_data_version, execute_query, get_data_versions, load_data,
+    load_tracking_table, log_event, unit_of_work,
+)
+
+
+@st.fragment
+def tracking_table():
+    """Joined LC/PO view with its filters; filter changes rerun only this section."""
+    tracker_display_df = load_tracking_table(get_data_versions('requests', 'lc_po_tracker'))
+
+    if tracker_display_df.empty:
+        st.info("No tracking entries have been created yet.")
+    else:
+        # Smart Filtering for the Display Table
+        st.subheader("Filter Tracking Table")
+    
+        # CHANGED: Added supplier_type to the filtering options
+        col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+    
+        filter_po = col_t1.text_input("Filter by LC/PO Number")
+        filter_supp_type = col_t2.multiselect("Filter by Supplier Type", tracker_display_df['supplier_type'].unique(), default=[])
+        filter_delivery = col_t3.multiselect("Filter by Delivery Status", tracker_display_df['delivery_completed'].unique(), default=[])
+        filter_paid = col_t4.multiselect("Filter by Bill Paid Status", tracker_display_df['bill_paid'].unique(), default=[])
+    
+        filtered_tracker = tracker_display_df.copy()
+        if filter_po:
+            filtered_tracker = filtered_tracker[filtered_tracker['lc_po_nr'].str.contains(filter_po, case=False, na=False)]
+        if filter_supp_type:
+            filtered_tracker = filtered_tracker[filtered_tracker['supplier_type'].isin(filter_supp_type)]
+        if filter_delivery:
+            filtered_tracker = filtered_tracker[filtered_tracker['delivery_completed'].isin(filter_delivery)]
+        if filter_paid:
+            filtered_tracker = filtered_tracker[filtered_tracker['bill_paid'].isin(filter_paid)]
+        
+        st.dataframe(filtered_tracker, width='stretch')
+    
+        st.download_button(
+            label="Download Tracking Data CSV",
+            data=filtered_tracker.to_csv(index=False).encode('utf-8'),
+            file_name='lc_po_tracker_data.csv',
+            mime='text/csv',
+            key='download_tracker_data'
+        )
+
+st.session_state['mn_submission_result'] = None
+st.session_state['mn_submission_status'] = None
+st.session_state['show_admin_edit'] = False
+st.session_state['edit_mn_id'] = None
+    
+st.title("💰 LC/PO & Payment Tracker")
+st.markdown("Track the procurement and payment progress for **Finance Approved** MN Requests.")
+
+# 1. Fetch Finance Approved Requests
+approved_requests = load_data("""
+    SELECT mn_number, mn_particulars, cost_area, supplier_vendor, date_sent_ho, supplier_type
+    FROM requests 
+    WHERE status IN ('Finance Approved', 'PO Issued') 
+    ORDER BY date_sent_ho DESC
+""")
+
+if approved_requests.empty:
+    st.info("No MN requests are currently at the 'Finance Approved' or 'PO Issued' stage for tracking.")
+    st.session_state['show_mn_details'] = False # Ensure details are hidden if no data exists
+    st.stop()
+    
+# Add a blank option to force selection
+mn_options = ['--- Select an MN Reference ID ---'] + approved_requests['mn_number'].tolist()
+
+# 2. MN Selection Form
+with st.form("mn_tracker_select_form"):
+    col_select, col_button = st.columns([3, 1])
+    selected_mn = col_select.selectbox("Select MN Reference ID to Track/Update *", mn_options, index=0, key="tracker_mn_select")
+    
+    is_mn_selected = selected_mn != '--- Select an MN Reference ID ---'
+    
+    # Button to trigger details visibility
+    if col_button.form_submit_button("Show Details", type="primary"):
+        if is_mn_selected:
+            st.session_state['show_mn_details'] = True
+        else:
+            st.session_state['show_mn_details'] = False
+            st.error("Please select a valid MN Reference ID.")
+    
+    # Only proceed with complex fetching and rendering if the MN is selected AND the details flag is set
+    if st.session_state['show_mn_details'] and is_mn_selected:
+        
+        # Fetch existing tracker data or initialize empty
+        tracker_df = load_data("SELECT * FROM lc_po_tracker WHERE mn_number = ?", (selected_mn,))
+        tracker_data = {}
+        if not tracker_df.empty:
+            tracker_data = tracker_df.iloc[0].to_dict()
+        
+        request_data = approved_requests[approved_requests['mn_number'] == selected_mn].iloc[0].to_dict()
+        
+        # Helper function to safely convert DB string date to date object
+        def safe_date_input(key, default_date_str=None):
+            if tracker_data.get(key):
+                try:
+                    # Use default value if parsing fails
+                    return datetime.strptime(tracker_data[key], "%Y-%m-%d").date()
+                except ValueError:
+                    pass
+            
+            # Use today's date if no default string is provided and conversion failed
+            if default_date_str == str(date.today()):
+                return date.today()
+                
+            return None
+            
+        # --- START DISPLAYING DETAILS AND INPUT FIELDS ---
+        st.markdown("---")
+        st.subheader("Selected MN Details")
+        
+        col_d1, col_d2, col_d3 = st.columns(3)
+        col_d1.info(f"**Cost Area:** {request_data.get('cost_area')}")
+        col_d2.info(f"**Supplier:** {request_data.get('supplier_vendor')}")
+        col_d3.info(f"**Supplier Type:** {request_data.get('supplier_type')}")
+        st.markdown(f"**MN Particulars:** *{request_data.get('mn_particulars')}*")
+
+        st.markdown("---")
+        st.subheader("Procurement & Payment Inputs")
+        
+        # --- INPUT FIELDS ---
+        col1, col2 = st.columns(2)
+        
+        # Procurement/LC Details
+        lc_po_nr = col1.text_input("LC Nr. / PO Nr.", value=tracker_data.get('lc_po_nr', ''))
+        lc_po_date_val = safe_date_input('lc_po_date')
+        lc_po_date = col2.date_input("Date of LC/PO", value=lc_po_date_val, key="lc_po_date", disabled=not is_mn_selected)
+        
+        col3, col4 = st.columns(2)
+        eta_shipment_val = safe_date_input('eta_shipment_delivery')
+        eta_shipment = col3.date_input("ETA Shipment/Delivery Date", value=eta_shipment_val, key="mn_eta", disabled=not is_mn_selected)
+        
+        delivery_completed = col4.selectbox("Delivery Completed?", 
+                                            options=['No', 'Yes'], 
+                                            index=['No', 'Yes'].index(tracker_data.get('delivery_completed', 'No')),
+                                            key="delivery_completed_select", disabled=not is_mn_selected)
+        
+        date_of_delivery_val = safe_date_input('date_of_delivery')
+        date_of_delivery = st.date_input("Date of Delivery", value=date_of_delivery_val, key="mn_delivery_date", disabled=not is_mn_selected)
+        
+        commercial_remarks = st.text_area("Commercial / Store Remarks", value=tracker_data.get('commercial_store_remarks', ''), disabled=not is_mn_selected)
+        
+        st.markdown("---")
+        
+        # Delay Calculation (LC/PO Date - Date Sent HO)
+        delay_days = 0
+        date_ho = datetime.strptime(request_data['date_sent_ho'], "%Y-%m-%d").date()
+        if lc_po_date:
+            delay_days = (lc_po_date - date_ho).days
+            st.info(f"Calculated Delay: **{delay_days} days** (LC/PO Date to Date Sent HO)")
+        else:
+            st.info("Delay will be calculated once the LC/PO Date is entered.")
+
+        st.markdown("---")
+        
+        # Payment Details
+        st.subheader("Bill & Payment Tracking")
+        
+        col5, col6 = st.columns(2)
+        
+        # Local Supplier Specific Field
+        # CHANGED: "Bill Submitted by Vendor" is now a Yes/No option for Local Suppliers
+        bill_submitted_vendor = tracker_data.get('bill_submitted_vendor', 'No')
+        if request_data.get('supplier_type') == 'Local':
+            bill_submitted_vendor = col5.selectbox("Bill Submitted by Vendor (Local Supplier)?", ["No", "Yes"], 
+                                                   index=["No", "Yes"].index(bill_submitted_vendor) if bill_submitted_vendor in ["No", "Yes"] else 0,
+                                                   disabled=not is_mn_selected)
+        else:
+            bill_submitted_vendor = col5.text_input("Bill Submitted by Vendor (Foreign Supplier)", 
+                                                   value=bill_submitted_vendor, disabled=not is_mn_selected)
+        
+        bill_tracking_id = col6.text_input("Bill Tracking ID", value=tracker_data.get('bill_tracking_id', ''), disabled=not is_mn_selected)
+        
+        col7, col8, col9 = st.columns(3)
+        date_bill_acc_val = safe_date_input('date_bill_submit_acc')
+        date_bill_acc = col7.date_input("Date of Bill Submit to Acc.", value=date_bill_acc_val, key="mn_bill_acc_date", disabled=not is_mn_selected)
+        
+        date_bill_ho_val = safe_date_input('date_bill_submit_ho')
+        date_bill_ho = col8.date_input("Date of Bill Submit to HO", value=date_bill_ho_val, key="mn_bill_ho_date", disabled=not is_mn_selected)
+        
+        bill_paid = col9.selectbox("Bill Paid?", 
+                                   options=['No', 'Yes'], 
+                                   index=['No', 'Yes'].index(tracker_data.get('bill_paid', 'No')),
+                                   key="bill_paid_select", disabled=not is_mn_selected)
+        
+        # Foreign Supplier Specific Field
+        actual_lc_costing = tracker_data.get('actual_lc_costing', 0.0)
+        if request_data.get('supplier_type') == 'Foreign':
+            actual_lc_costing = st.number_input("Actual LC Costing (Foreign Supplier)", min_value=0.0, format="%.2f", value=float(actual_lc_costing), disabled=not is_mn_selected)
+        
+        st.markdown("---")
+    
+    # --- SUBMIT BUTTON ---
+    submitted = st.form_submit_button("Update LC/PO & Payment Data")
+    
+    if submitted:
+        if not is_mn_selected:
+            st.error("Please select an MN Reference ID before submitting.")
+        elif not st.session_state['show_mn_details']:
+            st.error("Please click 'Show Details' first to load the data for the selected MN.")
+        else:
+            # Logic runs only if MN is selected and details were shown/updated
+            # Ensure date fields are formatted as strings for storage
+            # Check if date inputs are not None before calling strftime
+            lc_po_date_str = lc_po_date.strftime("%Y-%m-%d") if lc_po_date else None
+            eta_shipment_str = eta_shipment.strftime("%Y-%m-%d") if eta_shipment else None
+            date_of_delivery_str = date_of_delivery.strftime("%Y-%m-%d") if date_of_delivery else None
+            date_bill_acc_str = date_bill_acc.strftime("%Y-%m-%d") if date_bill_acc else None
+            date_bill_ho_str = date_bill_ho.strftime("%Y-%m-%d") if date_bill_ho else None
+            
+            # UPSERT (Insert or Update) logic
+            query = """
+                INSERT INTO lc_po_tracker (
+                    mn_number, lc_po_nr, lc_po_date, eta_shipment_delivery, delivery_completed, date_of_delivery, 
+                    commercial_store_remarks, delay_days, bill_submitted_vendor, bill_tracking_id, 
+                    date_bill_submit_acc, date_bill_submit_ho, bill_paid, actual_lc_costing
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(mn_number) DO UPDATE SET
+                    lc_po_nr=excluded.lc_po_nr, lc_po_date=excluded.lc_po_date, 
+                    eta_shipment_delivery=excluded.eta_shipment_delivery, delivery_completed=excluded.delivery_completed, 
+                    date_of_delivery=excluded.date_of_delivery, commercial_store_remarks=excluded.commercial_store_remarks, 
+                    delay_days=excluded.delay_days, bill_submitted_vendor=excluded.bill_submitted_vendor, 
+                    bill_tracking_id=excluded.bill_tracking_id, date_bill_submit_acc=excluded.date_bill_submit_acc, 
+                    date_bill_submit_ho=excluded.date_bill_submit_ho, bill_paid=excluded.bill_paid, 
+                    actual_lc_costing=excluded.actual_lc_costing
+            """
+            params = (
+                selected_mn, lc_po_nr, lc_po_date_str, eta_shipment_str, delivery_completed, date_of_delivery_str, 
+                commercial_remarks, delay_days, bill_submitted_vendor, bill_tracking_id, 
+                date_bill_acc_str, date_bill_ho_str, bill_paid, actual_lc_costing
+            )
+            
+            # Status promotion, tracker upsert and audit entries commit as one transaction
+            po_issued_version = None
+            with unit_of_work() as uow:
+                # Update requests table status if PO number is entered and status is 'Finance Approved';
+                # the status check lives in the WHERE clause, so no separate read is needed
+                if lc_po_nr:
+                    promoted = execute_query(
+                        "UPDATE requests SET status = 'PO Issued' WHERE mn_number = ? AND status = 'Finance Approved'",
+                        (selected_mn,), uow=uow
+                    ).rowcount
+                    if promoted:
+                        log_event("MN_STATUS_CHANGE", f"MN {selected_mn} status changed to 'PO Issued' by LC/PO entry.", uow=uow)
+                        po_issued_version = bump_data_version('requests', uow=uow)
+
+                execute_query(query, params, uow=uow)
+                log_event("LC_PO_UPDATE", f"Updated LC/PO tracker for MN {selected_mn}. LC/PO: {lc_po_nr}.", uow=uow)
+                bump_data_version('lc_po_tracker', uow=uow)
+
+            if po_issued_version is not None:
+                # Finance Approved -> PO Issued counts the same in both totals: no-op delta
+                apply_request_delta(None, None, po_issued_version)
+            st.success(f"Successfully updated tracking data for MN **{selected_mn}**.")
+            st.session_state['show_mn_details'] = False # Hide details after update
+            st.rerun()
+
+st.markdown("---")
+# 3. Display Updated Tracking Table
+st.header("LC/PO Tracking Data")
+
+tracking_table()
@@ -0,0 +1,3 @@
+from tracker_offlinedb.core import message_board
+
+message_board()
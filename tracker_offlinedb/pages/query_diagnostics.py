@@ -0,0 +1,79 @@
+# --- DIAGNOSTICS: query timings per rerun (admin only) ---
+import streamlit as st
+
+from tracker_offlinedb.core import (
+    N_PLUS_ONE_THRESHOLD, QUERY_METRICS_PORT, QUERY_STATS_MAX_RERUNS, get_query_stats,
+    render_prometheus_metrics, reset_query_stats,
+)
+
+if st.session_state['role'] != 'administrator':
+    st.error("🚫 Access Denied.")
+    st.stop()
+
+st.title("🩺 Query Diagnostics")
+st.markdown("Every statement that went through `load_data` / `execute_query`, grouped by rerun. "
+            f"Keeps the last {QUERY_STATS_MAX_RERUNS} reruns of all sessions on this server process.")
+
+reruns_df, queries_df = get_query_stats()
+if queries_df.empty:
+    st.info("No queries recorded yet.")
+else:
+    # 1. Per-page cost of one rerun
+    st.subheader("Per Page (average rerun)")
+    per_page = reruns_df.groupby('page').agg(
+        reruns=('rerun', 'count'), avg_queries=('queries', 'mean'), max_queries=('queries', 'max'),
+        avg_db_ms=('db_ms', 'mean'), max_db_ms=('db_ms', 'max'), avg_rows=('rows', 'mean'),
+        avg_kb=('bytes', lambda b: b.mean() / 1024),
+    ).sort_values('avg_db_ms', ascending=False)
+    st.dataframe(per_page.round(1), width='stretch')
+
+    # 2. N+1 suspects: one statement repeated many times inside a single rerun
+    st.subheader(f"N+1 Suspects (same statement > {N_PLUS_ONE_THRESHOLD}x in one rerun)")
+    repeats = queries_df.groupby(['rerun', 'page', 'fingerprint', 'statement']).agg(
+        calls=('ms', 'size'), ms=('ms', 'sum')).reset_index()
+    suspects = repeats[repeats['calls'] > N_PLUS_ONE_THRESHOLD]
+    if suspects.empty:
+        st.success("No statement ran more than the threshold within a single rerun.")
+    else:
+        st.dataframe(
+            suspects.groupby(['page', 'fingerprint', 'statement']).agg(
+                reruns_affected=('rerun', 'nunique'), max_calls_per_rerun=('calls', 'max'),
+                avg_ms_per_rerun=('ms', 'mean'),
+            ).reset_index().sort_values('max_calls_per_rerun', ascending=False).round(1),
+            width='stretch', hide_index=True
+        )
+
+    # 3. Statements by total time
+    st.subheader("Top Statements (by total time)")
+    top = queries_df.groupby(['fingerprint', 'kind', 'statement']).agg(
+        calls=('ms', 'size'), total_ms=('ms', 'sum'), avg_ms=('ms', 'mean'),
+        p95_ms=('ms', lambda m: m.quantile(0.95)), avg_rows=('rows', 'mean'),
+        params=('params', 'first'), pages=('page', lambda p: ', '.join(sorted(set(p)))),
+    ).reset_index().sort_values('total_ms', ascending=False)
+    st.dataframe(top.head(25).round(1), width='stretch', hide_index=True)
+
+    # 4. Most recent reruns, newest first
+    st.subheader("Recent Reruns")
+    recent = reruns_df.sort_values('rerun', ascending=False).head(50)
+    st.dataframe(recent.assign(db_ms=recent['db_ms'].round(1)), width='stretch', hide_index=True)
+    with st.expander("Statements of one rerun"):
+        pick = st.selectbox("Rerun", recent['rerun'].tolist(),
+                            format_func=lambda n: f"#{n} · {reruns_df.loc[n, 'page']} · "
+                                                  f"{reruns_df.loc[n, 'started_at']:%H:%M:%S}")
+        st.dataframe(queries_df[queries_df['rerun'] == pick]
+                     [['kind', 'fingerprint', 'statement', 'params', 'rows', 'bytes', 'ms']].round(2),
+                     width='stretch', hide_index=True)
+
+# 5. Prometheus export (lifetime counters, survive the reset below)
+st.subheader("Prometheus Export")
+metrics_text = render_prometheus_metrics()
+if QUERY_METRICS_PORT:
+    st.caption(f"Also served at `:{QUERY_METRICS_PORT}/metrics` for scraping.")
+st.download_button("Download metrics.txt", data=metrics_text.encode('utf-8'),
+                   file_name='tracker_metrics.txt', mime='text/plain', key='download_query_metrics')
+with st.expander("Show metrics text"):
+    st.code(metrics_text, language='text')
+
+if st.button("Clear recorded reruns", key='reset_query_stats'):
+    reset_query_stats()
+    st.rerun()
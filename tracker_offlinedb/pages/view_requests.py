@@ -0,0 +1,293 @@
+import streamlit as st
+from datetime import datetime
+
+from tracker_offlinedb.core import (
+    REQUESTS_PAGE_SIZE, apply_request_delta, bump_data_version, calculate_status, count_requests,
+    execute_query, get_connection, get_data_versions, get_exchange_config,
+    get_request_filter_options, load_data, load_filtered_requests, load_requests_page, log_event,
+    read_request_contribution, search_requests, unit_of_work,
+)
+
+
+@st.fragment
+def request_table():
+    """Filters, paged table and CSV export; widget changes here don't rerun the KPIs and admin tools."""
+    requests_version = get_data_versions('requests')[0]
+
+    st.subheader("Filter Requests")
+    col_filter_1, col_filter_2, col_filter_3 = st.columns(3)
+    with col_filter_1:
+        selected_status = st.multiselect("Filter by Status", get_request_filter_options('status', requests_version), default=[])
+    with col_filter_2:
+        selected_area = st.multiselect("Filter by Cost Center", get_request_filter_options('cost_area', requests_version), default=[])
+    with col_filter_3:
+        selected_supplier_type = st.multiselect("Filter by Supplier Type", get_request_filter_options('supplier_type', requests_version), default=[])
+
+    filters = (
+        ('status', tuple(selected_status)),
+        ('cost_area', tuple(selected_area)),
+        ('supplier_type', tuple(selected_supplier_type)),
+    )
+    # Restart from page 1 whenever the filter selection changes
+    if st.session_state.get('req_filters') != filters:
+        st.session_state['req_filters'] = filters
+        st.session_state['req_page_cursors'] = [None]
+    page_cursors = st.session_state['req_page_cursors']
+
+    total_matches = count_requests(filters, requests_version)
+    page_df = load_requests_page(filters, page_cursors[-1], requests_version)
+    first_row = (len(page_cursors) - 1) * REQUESTS_PAGE_SIZE
+
+    st.markdown("---")
+    st.subheader("All Request Fields")
+    st.caption(f"Showing {first_row + 1 if len(page_df) else 0}-{first_row + len(page_df)} of {total_matches} matching requests")
+    st.dataframe(page_df, width='stretch')
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    if col_prev.button("◀ Previous", disabled=len(page_cursors) == 1, key="req_prev_page"):
+        page_cursors.pop()
+        st.rerun(scope="fragment")
+    col_page.markdown(f"Page **{len(page_cursors)}** of **{max(1, -(-total_matches // REQUESTS_PAGE_SIZE))}**")
+    if col_next.button("Next ▶", disabled=first_row + len(page_df) >= total_matches, key="req_next_page"):
+        last_row = page_df.iloc[-1]
+        page_cursors.append((last_row['date_logged'], int(last_row['id'])))
+        st.rerun(scope="fragment")
+
+    # Export loads the full filtered set only on demand
+    if st.button("Prepare Filtered Requests CSV", key="prepare_requests_csv"):
+        export_df = load_filtered_requests(filters)
+        st.download_button(
+            label=f"Download Filtered Requests CSV ({len(export_df)} rows)",
+            data=export_df.to_csv(index=False).encode('utf-8'),
+            file_name='filtered_requests.csv',
+            mime='text/csv',
+            key='download_requests',
+            on_click="ignore"
+        )
+
+st.session_state['mn_submission_result'] = None
+st.session_state['mn_submission_status'] = None
+st.session_state['show_mn_details'] = False
+
+st.title("🔍 Existing Entries & Tracking Status")
+
+budgets = load_data("SELECT cost_area, department FROM budget_heads")
+exchange_config = get_exchange_config()
+fx_rates = exchange_config['fx_rates']
+customs_duty_pct = exchange_config['customs_duty_pct']
+
+df_status, total_budget, total_spent, remaining = calculate_status()
+
+if not df_status.empty:
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Budget 2026 (BDT)", f"{total_budget:,.2f}")
+    col2.metric("Total Utilized Cost", f"{total_spent:,.2f}")
+    col3.metric("Remaining Balance", f"{remaining:,.2f}")
+    st.markdown("---")
+
+requests_version = get_data_versions('requests')[0]
+
+if count_requests((), requests_version) == 0:
+    st.info("No requests found.")
+else:
+    st.subheader("🛠️ Admin Tools (Edit & Status Update)")
+    col_a1, col_a2 = st.columns(2)
+    search_term = col_a1.text_input("Search Request (MN Number prefix or ID)", placeholder="e.g. DHK/001 or 42",
+                                    key="admin_action_search")
+    action_df = search_requests(search_term, requests_version)
+    action_labels = dict(zip(
+        action_df['id'].tolist(),
+        ("ID " + action_df['id'].astype(str) + " - MN: " + action_df['mn_number'].astype(str)
+         + " (" + action_df['status'].astype(str) + ")").tolist()
+    ))
+    # The selected value is the request ID itself; labels are display-only
+    selected_id = col_a1.selectbox("Select Request for Action", options=list(action_labels),
+                                   format_func=action_labels.get, index=None,
+                                   placeholder="--- Select a Request ID to Action ---",
+                                   key="admin_action_select")
+    if search_term and action_df.empty:
+        col_a1.caption("No matching requests.")
+    
+    if st.session_state['role'] == 'administrator':
+        workflow_statuses = ["Pending", "Approved by SRPM", "Approved by AD", "Finance Approved", "Rejected", "PO Issued", "Completed"]
+        
+        with col_a2.form("status_update_form", clear_on_submit=True):
+            selected_row = action_df[action_df['id'] == selected_id].iloc[0] if selected_id else None
+            current_status = selected_row['status'] if selected_id else "Pending"
+            new_status = st.selectbox("New Status", workflow_statuses, 
+                                      index=workflow_statuses.index(current_status) if current_status in workflow_statuses else 0,
+                                      key="new_status_select")
+                
+            if st.form_submit_button("Apply Status Change"):
+                if selected_id:
+                    with unit_of_work() as uow:
+                        old = read_request_contribution(selected_id, uow)
+                        execute_query("UPDATE requests SET status = ? WHERE id = ?", (new_status, selected_id), uow=uow)
+                        log_event("MN_STATUS_CHANGE", f"MN ID {selected_id} status changed from {old[2] if old else current_status} to {new_status}.", uow=uow)
+                        requests_version = bump_data_version('requests', uow=uow)
+                    # Only this MN's cost area moves; patch the cached budget status in place
+                    if old is not None:
+                        apply_request_delta(old, (old[0], old[1], new_status), requests_version)
+                    st.success(f"Status for Request ID {selected_id} updated to **{new_status}**.")
+                    st.rerun()
+                else:
+                    st.warning("Please select a request.")
+                    
+        if selected_id and col_a1.button(f"✏️ Edit ID {selected_id} Details", type="secondary"):
+            st.session_state['show_admin_edit'] = True
+            st.session_state['edit_mn_id'] = selected_id
+            st.rerun()
+    
+    st.markdown("---")
+    
+    if st.session_state['show_admin_edit'] and st.session_state['edit_mn_id']:
+        edit_id = st.session_state['edit_mn_id']
+        record_to_edit_df = load_data("SELECT * FROM requests WHERE id = ?", (edit_id,))
+        if record_to_edit_df.empty:
+            st.error(f"Could not find request with ID {edit_id}.")
+            st.session_state['show_admin_edit'] = False
+            st.session_state['edit_mn_id'] = None
+            st.stop()
+        
+        original_data = record_to_edit_df.iloc[0].to_dict()
+        original_landed_cost = original_data['landed_total_cost']
+        original_cost_area = original_data['cost_area']
+        st.header(f"✏️ Editing Request ID: {edit_id} (MN: {original_data['mn_number']})")
+        departments = sorted(budgets['department'].unique().tolist())
+        
+        with st.form("admin_edit_form"):
+            st.subheader("1. General & Categorization")
+            col1, col2, col3 = st.columns(3)
+            issue_date_val = datetime.strptime(original_data['mn_issue_date'], "%Y-%m-%d").date()
+            date_ho_val = datetime.strptime(original_data['date_sent_ho'], "%Y-%m-%d").date()
+            
+            with col1:
+                mn_issue_date = st.date_input("MN Issue Date *", value=issue_date_val)
+                st.text_input("Requester Name (Read-Only)", value=original_data['requester'], disabled=True)
+                mn_category = st.selectbox("MN Category *", ["R&M (Repair & Maintenance)", "C&C (Chemicals & Consumables)"], 
+                                           index=["R&M (Repair & Maintenance)", "C&C (Chemicals & Consumables)"].index(original_data['mn_category']))
+            with col2:
+                mn_no_new = st.text_input("MN Number * (e.g., DHK/001/26)", value=original_data['mn_number'])
+                selected_department = st.selectbox("Department *", departments, 
+                                                   index=departments.index(original_data['department']))
+            with col3:
+                cost_areas_filtered = budgets[budgets['department'] == selected_department]['cost_area'].unique().tolist()
+                area = st.selectbox("Cost Area *", sorted(cost_areas_filtered), 
+                                    index=sorted(cost_areas_filtered).index(original_data['cost_area']))
+                location = st.text_input("Location *", value=original_data['location'])
+            
+            mn_particulars = st.text_area("MN Particulars/Detailed Description of Work * (Max 200 chars)", 
+                                          max_chars=200, value=original_data['mn_particulars'])
+
+            st.subheader("2. Financial & Procurement Details")
+            col_supp, col_curr, col_cost1, col_cost2 = st.columns(4)
+            with col_supp:
+                supplier_vendor = st.text_input("Supplier/Vendor *", value=original_data['supplier_vendor'])
+                supplier_type = st.selectbox("Supplier Type *", ["Local", "Foreign"], 
+                                             index=["Local", "Foreign"].index(original_data['supplier_type']))
+            currency_list = list(fx_rates.keys())
+            currency = col_curr.selectbox("Currency *", currency_list, index=currency_list.index(original_data['currency']))
+            col_curr.info(f"Rate: 1 {currency} = **{fx_rates.get(currency):.4f} BDT**")
+            with col_cost1:
+                foreign_spare_cost = st.number_input("Foreign Spare Cost *", min_value=0.0, format="%.2f", 
+                                                     value=original_data['foreign_spare_cost'], key="edit_mn_fsc")
+                freight_fca_charges = st.number_input("Freight & FCA Charges *", min_value=0.0, format="%.2f", 
+                                                      value=original_data['freight_fca_charges'], key="edit_mn_ffc")
+            with col_cost2:
+                local_cost_wo_vat_ait = st.number_input("Local Cost without VAT & AIT *", min_value=0.0, format="%.2f", 
+                                                        value=original_data['local_cost_wo_vat_ait'], key="edit_mn_lcwa")
+                vat_ait = st.number_input("VAT & AIT *", min_value=0.0, format="%.2f", 
+                                          value=original_data['vat_ait'], key="edit_mn_va")
+                exchange_rate = fx_rates.get(currency, 1.0)
+                landed_total_cost_new = (
+                    (foreign_spare_cost * (1 + customs_duty_pct)) + 
+                    freight_fca_charges
+                ) * exchange_rate + local_cost_wo_vat_ait + vat_ait
+                st.markdown(f"**New Landed Total Cost (BDT):**")
+                st.markdown(f"## {landed_total_cost_new:,.2f}")
+                
+            st.subheader("3. Timeline & Remarks")
+            col_date, col_remarks = st.columns([1, 2])
+            with col_date:
+                date_sent_ho = st.date_input("Date of Sending To HO *", value=date_ho_val)
+            with col_remarks:
+                plant_remarks = st.text_area("Plant Remarks/Notes", value=original_data['plant_remarks'])
+
+            st.markdown("---")
+            col_save, col_cancel = st.columns(2)
+            save_button = col_save.form_submit_button("💾 Save Edited Request", type="primary")
+            cancel_button = col_cancel.form_submit_button("❌ Cancel Edit", type="secondary")
+            
+            if cancel_button:
+                st.session_state['show_admin_edit'] = False
+                st.session_state['edit_mn_id'] = None
+                st.rerun()
+
+            if save_button:
+                required_fields = [
+                    (mn_no_new, "MN Number"), (mn_category, "MN Category"), (selected_department, "Department"), (area, "Cost Area"), 
+                    (location, "Location"), (supplier_vendor, "Supplier/Vendor"), (supplier_type, "Supplier Type"), (currency, "Currency"),
+                    (mn_particulars, "MN Particulars"), (date_sent_ho, "Date of Sending To HO")
+                ]
+                missing_fields = [label for value, label in required_fields if value is None or (isinstance(value, str) and not value.strip())]
+                if missing_fields or landed_total_cost_new <= 0:
+                    error_msg = "⚠️ Please fill in all mandatory fields (*)."
+                    if missing_fields: error_msg += f" Missing: {', '.join(missing_fields)}."
+                    if landed_total_cost_new <= 0: error_msg += " Landed Total Cost must be greater than 0."
+                    st.error(error_msg)
+                    st.stop() 
+
+                if mn_no_new != original_data['mn_number']:
+                    if get_connection().execute("SELECT 1 FROM requests WHERE mn_number = ?", (mn_no_new,)).fetchone():
+                        st.error(f"❌ Duplicate MN Error: An MN request with number **{mn_no_new}** already exists.")
+                        st.stop()
+                    # LC/PO rows are keyed (and synced) on the MN number, so it's frozen once one exists
+                    if get_connection().execute("SELECT 1 FROM lc_po_tracker WHERE mn_number = ?", (original_data['mn_number'],)).fetchone():
+                        st.error(f"❌ MN **{original_data['mn_number']}** already has an LC/PO tracker record; its MN number can no longer be changed.")
+                        st.stop()
+                    
+                df_status, _, _, _ = calculate_status()
+                old_area_status = df_status[df_status['cost_area'] == original_cost_area]
+                if area != original_cost_area:
+                    new_area_status = df_status[df_status['cost_area'] == area]
+                    new_area_remaining = new_area_status['Remaining Balance'].iloc[0]
+                    if landed_total_cost_new > new_area_remaining:
+                        st.error(f"⚠️ Budget Exceeded in new Cost Area! '{area}' only has **{new_area_remaining:,.2f} BDT** remaining.")
+                        st.stop()
+                else:
+                    current_remaining = old_area_status['Remaining Balance'].iloc[0]
+                    available_after_removal = current_remaining + original_landed_cost
+                    if landed_total_cost_new > available_after_removal:
+                        st.error(f"⚠️ Budget Exceeded! '{area}' can only support an updated cost of up to **{available_after_removal:,.2f} BDT**.")
+                        st.stop()
+
+                date_issue_str = mn_issue_date.strftime("%Y-%m-%d")
+                date_ho_str = date_sent_ho.strftime("%Y-%m-%d")
+                update_query = '''UPDATE requests SET
+                        mn_number = ?, mn_issue_date = ?, cost_area = ?, estimated_cost = ?,
+                        mn_particulars = ?, mn_category = ?, department = ?, location = ?, 
+                        supplier_vendor = ?, supplier_type = ?, currency = ?, foreign_spare_cost = ?, 
+                        freight_fca_charges = ?, customs_duty_rate = ?, local_cost_wo_vat_ait = ?, 
+                        vat_ait = ?, landed_total_cost = ?, date_sent_ho = ?, plant_remarks = ?
+                    WHERE id = ?'''
+                params = (
+                    mn_no_new, date_issue_str, area, landed_total_cost_new,
+                    mn_particulars, mn_category, selected_department, location,
+                    supplier_vendor, supplier_type, currency, foreign_spare_cost,
+                    freight_fca_charges, customs_duty_pct, local_cost_wo_vat_ait,
+                    vat_ait, landed_total_cost_new, date_ho_str, plant_remarks,
+                    edit_id
+                )
+                with unit_of_work() as uow:
+                    old = read_request_contribution(edit_id, uow)
+                    execute_query(update_query, params, uow=uow)
+                    log_event("MN_ADMIN_EDIT", f"Request ID {edit_id} (MN: {mn_no_new}) was edited by admin.", uow=uow)
+                    requests_version = bump_data_version('requests', uow=uow)
+                if old is not None:
+                    apply_request_delta(old, (area, landed_total_cost_new, old[2]), requests_version)
+                st.success(f"✅ Request ID **{edit_id}** (MN: {mn_no_new}) updated successfully!")
+                st.session_state['show_admin_edit'] = False
+                st.session_state['edit_mn_id'] = None
+                st.rerun()
+
+    request_table()
@@ -0,0 +1,303 @@
+"""Incremental two-way sync between the offline build (SQLite) and the Supabase build (Postgres).
+
+Both apps stamp every insert/update on the synced tables through triggers installed by
+schema migration 3: a per-store increasing `row_version`, the UTC `updated_at` of the edit
+and the `origin` site that made it. A sync run ships, per table and direction, the rows
+above the watermark the receiving store last recorded for the sender, in batches.
+Conflicts are resolved last-writer-wins on (updated_at, origin), so both stores converge
+to the same row whichever direction runs first.
+
+Each store gives a new request its own random sync_key, so an MN number entered in both
+stores before they sync arrives as an unknown row whose mn_number is taken. The two are
+treated as one request: the last writer's row, sync_key included, wins in both stores. A
+row that can't be applied without breaking a UNIQUE column otherwise (an MN number renamed
+onto one the other store uses) is skipped and recorded in sync_conflicts for an admin.
+
+The watermark is (row_xid, row_version). SQLite writers are serialized, so its rows commit
+in row_version order and row_xid is always 0. Postgres hands out row_version when a row is
+written, not when it commits, so a Postgres store also stamps the writing transaction's id
+(row_xid) and only rows of transactions older than every running one are shipped: a
+transaction still open can't add rows below a watermark that has moved on.
+
+Usage:
+    python tracker_sync.py --local sqlite:///tracker_2026.db --remote postgresql+psycopg2://user:pw@host/db
+
+Either URL may point at a SQLite stand-in (e.g. a copy of tracker_2026.db) for testing.
+The remote URL can also come from TRACKER_SYNC_REMOTE_URL. Deletes are not propagated; the
+apps never delete rows from the synced tables.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, create_engine, event, inspect, text
+
+# (table, business key), in dependency order: lc_po_tracker references requests.
+# requests.cost_area references budget_heads, which is not synced; set budgets up in both
+# builds first or the batch carrying the request fails and is retried on the next run.
+# Requests are matched on sync_key because an admin can edit the MN number; lc_po_tracker
+# rows keep mn_number, which the apps don't let change once a tracker row exists.
+SYNC_TABLES = [
+    ('requests', 'sync_key'),
+    ('lc_po_tracker', 'mn_number'),
+    ('standalone_indents', 'sync_key'),
+    ('event_log', 'sync_key'),
+]
+# UNIQUE columns besides the sync key; see _apply_batch
+UNIQUE_COLUMNS = {'requests': 'mn_number'}
+# Store-local columns that must never be copied across
+LOCAL_COLUMNS = {
+    'requests': {'id', 'row_version', 'row_xid'},
+    'lc_po_tracker': {'row_version', 'row_xid'},
+    'standalone_indents': {'indent_id', 'row_version', 'row_xid'},
+    'event_log': {'id', 'row_version', 'row_xid'},
+}
+# Schema version each build needs (the builds number their migrations separately)
+SYNC_MIN_SCHEMA_VERSION = {'postgresql': 14, 'sqlite': 8}
+DEFAULT_BATCH_SIZE = 500
+
+
+class SyncError(Exception):
+    pass
+
+
+def open_store(url):
+    """Engine for one side of the sync. SQLite transactions take the write lock up front."""
+    engine = create_engine(url)
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def _on_connect(dbapi_conn, _record):
+            dbapi_conn.isolation_level = None # let the 'begin' hook below emit BEGIN itself
+            dbapi_conn.execute("PRAGMA busy_timeout = 5000")
+
+        @event.listens_for(engine, 'begin')
+        def _on_begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    return engine
+
+
+def check_store(engine):
+    """Returns the store's site id, or raises SyncError if it hasn't been migrated yet."""
+    with engine.connect() as conn:
+        try:
+            version = conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+        except Exception:
+            version = 0
+        required = SYNC_MIN_SCHEMA_VERSION[engine.dialect.name]
+        if version < required:
+            raise SyncError(f"{engine.url.render_as_string(hide_password=True)} is at schema version {version}; "
+                            f"open the app against it once so migration {required} runs.")
+        return conn.execute(text("SELECT site_id FROM sync_site WHERE id = 1")).scalar()
+
+
+def sync_columns(source, target, table):
+    """Columns present in both stores, minus store-local ones (surrogate ids, row_version)."""
+    target_columns = {c['name'] for c in inspect(target).get_columns(table)}
+    return [c['name'] for c in inspect(source).get_columns(table)
+            if c['name'] in target_columns and c['name'] not in LOCAL_COLUMNS[table]]
+
+
+def _wins(incoming, current):
+    """Last-writer-wins; the origin site id breaks exact timestamp ties deterministically."""
+    return ((incoming['updated_at'] or '', incoming['origin'] or '') >
+            (current['updated_at'] or '', current['origin'] or ''))
+
+
+def _set_applying(conn, flag):
+    # Read by the stamping triggers: rows written while this is set keep the sender's
+    # origin/updated_at. Other connections never see it (it's only set inside this transaction).
+    conn.execute(text("UPDATE sync_site SET applying = :flag WHERE id = 1"),
+                 {"flag": flag if conn.dialect.name == 'postgresql' else int(flag)})
+
+
+def _read_watermark(conn, peer_site, table):
+    """(last_xid, last_version) of the last change from `peer_site` applied here."""
+    row = conn.execute(text("SELECT last_xid, last_version FROM sync_state WHERE peer_site_id = :peer AND table_name = :t"),
+                       {"peer": peer_site, "t": table}).first()
+    return (int(row[0]), int(row[1])) if row else (0, 0)
+
+
+def _changes_sql(source, table, columns):
+    """Next batch of changes after a watermark, in watermark order."""
+    if source.dialect.name == 'postgresql':
+        # Transactions older than the snapshot's xmin have all committed or rolled back
+        return text(f"SELECT CAST(CAST(row_xid AS text) AS bigint) AS row_xid, row_version, {', '.join(columns)} "
+                    f"FROM {table} WHERE row_xid < pg_snapshot_xmin(pg_current_snapshot()) "
+                    f"AND (row_xid, row_version) > (CAST(CAST(:after_xid AS text) AS xid8), :after) "
+                    f"ORDER BY row_xid, row_version LIMIT :n")
+    return text(f"SELECT 0 AS row_xid, row_version, {', '.join(columns)} FROM {table} "
+                f"WHERE row_version > :after ORDER BY row_version LIMIT :n")
+
+
+def _source_keys(source, table, key, keys):
+    """The subset of `keys` that exist in the source store."""
+    if not keys:
+        return set()
+    with source.connect() as conn:
+        return set(conn.execute(text(f"SELECT {key} FROM {table} WHERE {key} IN :keys")
+                                .bindparams(bindparam('keys', expanding=True)), {"keys": list(keys)}).scalars())
+
+
+def _apply_batch(conn, table, key, columns, rows, source):
+    """Inserts unknown rows and overwrites older ones.
+
+    Returns (inserted, updated, kept_local, conflicts); conflicts are the rows skipped because
+    applying them would break the table's UNIQUE_COLUMNS entry.
+    """
+    keys = [row[key] for row in rows]
+    current = {
+        r[key]: r for r in conn.execute(
+            text(f"SELECT {key}, updated_at, origin FROM {table} WHERE {key} IN :keys")
+            .bindparams(bindparam('keys', expanding=True)), {"keys": keys}
+        ).mappings()
+    }
+    inserts = [row for row in rows if row[key] not in current]
+    updates = [row for row in rows if row[key] in current and _wins(row, current[row[key]])]
+    adopts, conflicts = [], []
+
+    unique = UNIQUE_COLUMNS.get(table)
+    if unique and (inserts or updates):
+        holders = {
+            r[unique]: r for r in conn.execute(
+                text(f"SELECT {key}, {unique}, updated_at, origin FROM {table} WHERE {unique} IN :values")
+                .bindparams(bindparam('values', expanding=True)),
+                {"values": [row[unique] for row in inserts + updates if row[unique] is not None]}
+            ).mappings()
+        }
+        # Updates run first, so a row this batch renames has given its old value up by the inserts
+        renamed_to = {row[key]: row[unique] for row in updates}
+
+        def holder(row):
+            h = holders.get(row[unique])
+            if h is None or h[key] == row[key] or renamed_to.get(h[key], row[unique]) != row[unique]:
+                return None
+            return h
+
+        collisions = [row for row in inserts if holder(row)]
+        # A holder the source also has is a different request; merging the two would lose one
+        shared = _source_keys(source, table, key, {holder(row)[key] for row in collisions})
+        for row in collisions:
+            inserts.remove(row)
+            h = holder(row)
+            if h[key] in keys or h[key] in shared:
+                conflicts.append(row)
+            elif _wins(row, h):
+                adopts.append(row) # same MN entered in both stores: the later edit, and its sync_key, win
+        for row in [row for row in updates if holder(row)]:
+            updates.remove(row)
+            conflicts.append(row)
+
+    if updates:
+        assignments = ', '.join(f"{c} = :{c}" for c in columns if c != key)
+        conn.execute(text(f"UPDATE {table} SET {assignments} WHERE {key} = :{key}"), updates)
+    if adopts:
+        assignments = ', '.join(f"{c} = :{c}" for c in columns if c != unique)
+        conn.execute(text(f"UPDATE {table} SET {assignments} WHERE {unique} = :{unique}"), adopts)
+    if inserts:
+        conn.execute(text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"),
+                     inserts)
+    updated = len(updates) + len(adopts)
+    return len(inserts), updated, len(rows) - len(inserts) - updated - len(conflicts), conflicts
+
+
+def sync_table(source, source_site, target, target_site, table, key, batch_size=DEFAULT_BATCH_SIZE):
+    """Ships every change on `table` that `target` hasn't seen from `source` yet."""
+    columns = sync_columns(source, target, table)
+    select_sql = _changes_sql(source, table, columns)
+    stats = {"scanned": 0, "inserted": 0, "updated": 0, "kept_local": 0, "conflicts": 0, "echoes": 0}
+
+    while True:
+        with target.connect() as conn:
+            watermark = _read_watermark(conn, source_site, table)
+        with source.connect() as conn:
+            batch = [dict(r) for r in conn.execute(
+                select_sql, {"after_xid": watermark[0], "after": watermark[1], "n": batch_size}).mappings()]
+        if not batch:
+            break
+
+        # Rows whose last writer is the target itself are the target's own changes coming back
+        changes = [{c: row[c] for c in columns} for row in batch if row['origin'] != target_site]
+        with target.begin() as conn:
+            if _read_watermark(conn, source_site, table) != watermark:
+                continue # another sync run got here first; re-read from its watermark
+            _set_applying(conn, True)
+            inserted, updated, kept, conflicts = _apply_batch(conn, table, key, columns, changes, source) if changes else (0, 0, 0, [])
+            _set_applying(conn, False)
+
+            synced_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            if conflicts:
+                # Skipped so the watermark can move on; the row is kept whole for re-entry by hand
+                conn.execute(text("""
+                    INSERT INTO sync_conflicts (peer_site_id, table_name, row_key, detail, detected_at)
+                    VALUES (:peer, :t, :k, :detail, :ts)
+                    ON CONFLICT (peer_site_id, table_name, row_key) DO UPDATE SET
+                        detail = EXCLUDED.detail, detected_at = EXCLUDED.detected_at
+                """), [{"peer": source_site, "t": table, "k": str(row[key]), "detail": json.dumps(row, default=str),
+                        "ts": synced_at} for row in conflicts])
+            conn.execute(text("""
+                INSERT INTO sync_state (peer_site_id, table_name, last_xid, last_version, synced_at)
+                VALUES (:peer, :t, :xid, :v, :ts)
+                ON CONFLICT (peer_site_id, table_name) DO UPDATE SET
+                    last_xid = EXCLUDED.last_xid, last_version = EXCLUDED.last_version, synced_at = EXCLUDED.synced_at
+            """), {"peer": source_site, "t": table, "xid": batch[-1]['row_xid'], "v": batch[-1]['row_version'],
+                   "ts": synced_at})
+            if inserted or updated:
+                # Same counters the apps key their caches on (see bump_data_version)
+                conn.execute(text("""
+                    INSERT INTO data_versions (table_name, version) VALUES (:t, 1)
+                    ON CONFLICT (table_name) DO UPDATE SET version = data_versions.version + 1
+                """), {"t": table})
+
+        stats["scanned"] += len(batch)
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        stats["kept_local"] += kept
+        stats["conflicts"] += len(conflicts)
+        stats["echoes"] += len(batch) - len(changes)
+        if len(batch) < batch_size:
+            break
+    return stats
+
+
+def sync_stores(local_url, remote_url, tables=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Runs local -> remote, then remote -> local, for each table. Returns per-table stats."""
+    local, remote = open_store(local_url), open_store(remote_url)
+    local_site, remote_site = check_store(local), check_store(remote)
+    if local_site == remote_site:
+        raise SyncError("Both URLs point at the same site (same sync_site.site_id).")
+
+    report = {"local_site": local_site, "remote_site": remote_site, "tables": {}}
+    for table, key in SYNC_TABLES:
+        if tables and table not in tables:
+            continue
+        report["tables"][table] = {
+            "push": sync_table(local, local_site, remote, remote_site, table, key, batch_size),
+            "pull": sync_table(remote, remote_site, local, local_site, table, key, batch_size),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Two-way incremental sync between the offline and Supabase trackers.")
+    parser.add_argument("--local", default="sqlite:///tracker_2026.db", help="SQLAlchemy URL of the offline store")
+    parser.add_argument("--remote", default=os.environ.get("TRACKER_SYNC_REMOTE_URL"),
+                        help="SQLAlchemy URL of the Supabase store (default: $TRACKER_SYNC_REMOTE_URL)")
+    parser.add_argument("--tables", nargs="*", choices=[t for t, _ in SYNC_TABLES], help="Limit the run to these tables")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    if not args.remote:
+        parser.error("--remote (or TRACKER_SYNC_REMOTE_URL) is required")
+
+    try:
+        report = sync_stores(args.local, args.remote, args.tables, args.batch_size)
+    except SyncError as e:
+        print(f"Sync aborted: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())